@@ -0,0 +1,106 @@
+"""
+Micro-batching for Tavily's /extract endpoint.
+
+extract_page asks for one URL at a time, but /extract accepts a list. The
+ExtractBatcher collects requests for a short window (or until a batch is
+full), sends one multi-URL request, and fans the per-URL results — and
+per-URL failures — back to each waiting caller. Requests from concurrent
+tool calls and from concurrent jobs end up in the same batch. A caller that
+is cancelled leaves its batch; a request whose callers have all gone is
+cancelled before it completes.
+"""
+import asyncio
+import os
+from typing import Any
+
+from .cache import normalize_url
+
+EXTRACT_BATCH_WINDOW_MS = float(os.getenv("NEXUS_EXTRACT_BATCH_WINDOW_MS", "50"))  # 0 = no batching
+EXTRACT_BATCH_MAX = int(os.getenv("NEXUS_EXTRACT_BATCH_MAX", "20"))  # Tavily accepts up to 20 URLs
+
+
+class ExtractBatcher:
+    def __init__(
+        self,
+        post,
+        window_ms: float = EXTRACT_BATCH_WINDOW_MS,
+        max_batch: int = EXTRACT_BATCH_MAX,
+    ):
+        """`post(path, payload)` is the coroutine used to call the Tavily API."""
+        self._post = post
+        self._window = max(0.0, window_ms) / 1000
+        self._max_batch = max(1, max_batch)
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+        self.batches_sent = 0
+        self.urls_sent = 0
+        self.batches_abandoned = 0
+
+    async def extract(self, url: str) -> dict[str, Any]:
+        """
+        Return Tavily's result item for `url`, or {"error": ...} if that URL failed.
+        Raises if the whole batch request failed.
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._pending.append((url, future))
+
+        if len(self._pending) >= self._max_batch or self._window == 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self._flush)
+
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Not sent yet: leave the next batch (the sent case is handled in _flush)
+            self._pending = [(u, f) for u, f in self._pending if f is not future]
+            if not self._pending and self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            raise
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+            for _, future in batch:
+                future.add_done_callback(lambda _f: self._abandon_if_unwanted(task, batch))
+
+    def _abandon_if_unwanted(self, task: asyncio.Task, batch: list[tuple[str, asyncio.Future]]) -> None:
+        """Cancel an in-flight request once every caller waiting on it has been cancelled."""
+        if not task.done() and not task.cancelling() and all(f.cancelled() for _, f in batch):
+            task.cancel()
+            self.batches_abandoned += 1
+
+    async def _send(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        urls = list(dict.fromkeys(url for url, _ in batch))
+        self.batches_sent += 1
+        self.urls_sent += len(urls)
+        try:
+            response = await self._post("/extract", {"urls": urls})
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        items = {normalize_url(r.get("url", "")): r for r in response.get("results", [])}
+        failures = {
+            normalize_url(f.get("url", "")): f.get("error") or "Extraction failed"
+            for f in response.get("failed_results", [])
+        }
+        for url, future in batch:
+            if future.done():  # caller was cancelled
+                continue
+            key = normalize_url(url)
+            if key in items:
+                future.set_result(items[key])
+            else:
+                future.set_result({"error": failures.get(key, "No content extracted")})
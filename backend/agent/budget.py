@@ -0,0 +1,124 @@
+"""
+JobBudget — per-job limits on Claude tokens, wall-clock time and loop turns.
+
+The loop used to stop only at a fixed MAX_ITERATIONS, with an error. Now each
+job has three budgets:
+
+  tokens      NEXUS_JOB_TOKEN_BUDGET — all four usage fields of every Claude
+              call, as in usage.job_totals (0 = unlimited)
+  time        NEXUS_JOB_TIME_BUDGET_SECONDS — since the job started running
+              (0 = unlimited)
+  iterations  the agent loop's ceiling, AgentProfile.max_iterations
+              (NEXUS_MAX_ITERATIONS for the single agent)
+
+A request can lower the token and time budgets (token_budget, time_budget_s),
+not raise them. Each budget is checked before every turn:
+
+  wrap_up    what is left would not cover WRAP_UP_TURNS more turns at the
+             job's own average so far (tokens per turn, times the agent loops
+             running; seconds per turn) — the agent is told to stop
+             researching and finish with what it has, and every turn from
+             then on goes to the large model (agent/routing.py)
+  exhausted  the budget is spent — the loop ends at once with a `complete`
+             event; the sections already written were emitted as they came
+
+Every check is reported as a `budget` event. In parallel mode the planner,
+sub-agents and writer draw on one budget.
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+
+JOB_TOKEN_BUDGET = int(os.getenv("NEXUS_JOB_TOKEN_BUDGET", "0"))
+JOB_TIME_BUDGET_SECONDS = float(os.getenv("NEXUS_JOB_TIME_BUDGET_SECONDS", "0"))
+WRAP_UP_TURNS = 2  # turns left for writing up when a budget runs low
+
+_USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+_NOUNS = {"tokens": "token", "time": "time", "iterations": "iteration"}
+
+
+def requested_limits(token_budget: int | None, time_budget_s: float | None) -> tuple[int, float]:
+    """A request's (tokens, seconds) budgets: the server's, lowered where the request asks for less."""
+    def lower(requested, configured):
+        if requested is None:
+            return configured
+        return min(requested, configured) if configured else requested
+
+    return lower(token_budget, JOB_TOKEN_BUDGET), lower(time_budget_s, JOB_TIME_BUDGET_SECONDS)
+
+
+@dataclass(frozen=True)
+class BudgetStatus:
+    state: str = "ok"  # ok | wrap_up | exhausted
+    limit: str | None = None  # the budget that set the state: tokens | time | iterations
+
+
+class JobBudget:
+    def __init__(self, tokens: int = JOB_TOKEN_BUDGET, seconds: float = JOB_TIME_BUDGET_SECONDS):
+        self.tokens = max(0, tokens)
+        self.seconds = max(0.0, seconds)
+        self.started = time.monotonic()
+        self.tokens_used = 0
+        self.turns = 0  # Claude calls, across the job's agent loops
+        self.loops = 0  # agent loops drawing on the budget right now
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def charge(self, usage: dict[str, int]) -> None:
+        """Count one Claude call's usage."""
+        self.turns += 1
+        self.tokens_used += sum(usage.get(f, 0) for f in _USAGE_FIELDS)
+
+    def check(self, iterations: int, max_iterations: int, turn_seconds: float) -> BudgetStatus:
+        """
+        The budget state before a loop's next turn, given the turns it has
+        taken, its ceiling and its average seconds per turn.
+        """
+        elapsed = self.elapsed()
+        if self.tokens and self.tokens_used >= self.tokens:
+            return BudgetStatus("exhausted", "tokens")
+        if self.seconds and elapsed >= self.seconds:
+            return BudgetStatus("exhausted", "time")
+        if iterations >= max_iterations:
+            return BudgetStatus("exhausted", "iterations")
+        if not iterations or not self.turns:
+            return BudgetStatus()  # nothing to project from yet
+        turn_tokens = self.tokens_used / self.turns * max(1, self.loops)
+        if self.tokens and self.tokens - self.tokens_used < WRAP_UP_TURNS * turn_tokens:
+            return BudgetStatus("wrap_up", "tokens")
+        if self.seconds and self.seconds - elapsed < WRAP_UP_TURNS * turn_seconds:
+            return BudgetStatus("wrap_up", "time")
+        if max_iterations - iterations <= WRAP_UP_TURNS:
+            return BudgetStatus("wrap_up", "iterations")
+        return BudgetStatus()
+
+    def event(self, status: BudgetStatus, iterations: int, max_iterations: int) -> dict[str, Any]:
+        return {
+            "type": "budget",
+            "state": status.state,
+            "limit": status.limit,
+            "tokens": self.tokens_used,
+            "token_budget": self.tokens or None,
+            "elapsed_s": round(self.elapsed(), 3),
+            "time_budget_s": self.seconds or None,
+            "iterations": iterations,
+            "max_iterations": max_iterations,
+        }
+
+
+def wrap_up_note(limit: str) -> str:
+    """Appended to the next turn's tool results when a budget runs low."""
+    return (
+        f"Note: this job is close to its {_NOUNS[limit]} budget. Stop gathering information and finish "
+        f"your task now with what you already have, within {WRAP_UP_TURNS} turns."
+    )
+
+
+def stopped_early_summary(limit: str) -> str:
+    """The executive summary of a job a budget ended."""
+    return (
+        f"Research stopped early: the job's {_NOUNS[limit]} budget ran out. "
+        "The report covers what was researched before then."
+    )
@@ -0,0 +1,222 @@
+"""
+Two-tier cache for the I/O tools (web_search, extract_page).
+
+  memory tier — per-process LRU (OrderedDict), checked first
+  disk tier   — SQLite table shared across restarts (and across workers on one host),
+                queried on its own thread (utils/db_thread.py) so a slow disk never
+                stalls the event loop
+
+Entries are keyed on the tool name plus its normalized parameters and expire
+after a per-tool TTL. Concurrent misses for the same key are coalesced
+("single-flight"): the first caller fetches upstream, everyone else awaits
+the same task. Error results are never cached. A fetch whose callers have all
+been cancelled (their jobs were cancelled) is cancelled too.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from utils.db_thread import DbThread
+
+CACHE_PATH = os.getenv("NEXUS_CACHE_PATH", ".cache/tool_cache.sqlite3")  # "" = memory only
+CACHE_MAX_ENTRIES = int(os.getenv("NEXUS_CACHE_MAX_ENTRIES", "1000"))
+SEARCH_TTL_SECONDS = float(os.getenv("NEXUS_SEARCH_CACHE_TTL", "3600"))     # 1 hour
+EXTRACT_TTL_SECONDS = float(os.getenv("NEXUS_EXTRACT_CACHE_TTL", "86400"))  # 1 day
+
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query."""
+    return " ".join(query.lower().split())
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL: lower-case scheme/host, no fragment, no tracking params."""
+    parts = urlsplit(url.strip())
+    params = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(params), ""))
+
+
+class ToolCache:
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES):
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._max_entries = max(1, max_entries)
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._waiters: dict[str, int] = {}  # callers awaiting each in-flight fetch
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expired": 0,
+            "abandoned": 0,
+        }
+        self._db: sqlite3.Connection | None = None
+        self._thread: DbThread | None = None
+        if path:
+            self._thread = DbThread("tool-cache")
+            self._db = self._thread.call(self._open, path)
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            " key TEXT PRIMARY KEY, tool TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, value TEXT NOT NULL)"
+        )
+        db.execute("DELETE FROM tool_cache WHERE expires_at < ?", (time.time(),))
+        return db
+
+    async def get_or_fetch(
+        self,
+        tool: str,
+        params: dict[str, Any],
+        ttl: float,
+        fetch: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        """Return the cached result for (tool, params), calling `fetch` on a miss."""
+        key = _make_key(tool, params)
+
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["misses"] += 1
+            task = asyncio.create_task(self._fetch_and_store(key, tool, ttl, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key) if self._inflight.get(key) is t else None)
+
+        # Shield: one caller being cancelled must not cancel the shared fetch...
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # ...but once the last one is gone, nobody wants the result
+            if self._waiters[key] == 1 and not task.done():
+                task.cancel()
+                self._inflight.pop(key, None)  # a caller arriving while it unwinds starts afresh
+                self._stats["abandoned"] += 1
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    async def get(self, key: str) -> Any | None:
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at >= now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+            self._stats["expired"] += 1
+
+        if self._db is not None:
+            found, expires_at, value = await self._thread.run(self._read, key, now)
+            if found and value is not None:
+                self._remember(key, expires_at, value)
+                self._stats["disk_hits"] += 1
+                return value
+            if found:
+                self._stats["expired"] += 1
+
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+        hits = lookups - self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "inflight": len(self._inflight),
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._thread.call(self._db.close)
+            self._thread.close()
+            self._db = None
+
+    async def _fetch_and_store(
+        self, key: str, tool: str, ttl: float, fetch: Callable[[], Awaitable[dict[str, Any]]]
+    ) -> dict[str, Any]:
+        value = await fetch()
+        if isinstance(value, dict) and "error" not in value:
+            expires_at = time.time() + ttl
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                await self._thread.run(self._write, key, tool, expires_at, value)
+        return value
+
+    # On the disk thread
+
+    def _read(self, key: str, now: float) -> tuple[bool, float, Any | None]:
+        """(found, expires_at, value); an expired row is deleted and has no value."""
+        row = self._db.execute("SELECT expires_at, value FROM tool_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, 0.0, None
+        expires_at, raw = row
+        if expires_at < now:
+            self._db.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+            return True, expires_at, None
+        return True, expires_at, json.loads(raw)
+
+    def _write(self, key: str, tool: str, expires_at: float, value: Any) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO tool_cache (key, tool, expires_at, value) VALUES (?, ?, ?, ?)",
+            (key, tool, expires_at, json.dumps(value)),
+        )
+
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+
+def _make_key(tool: str, params: dict[str, Any]) -> str:
+    raw = json.dumps([tool, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+_cache: ToolCache | None = None
+
+
+def get_tool_cache() -> ToolCache:
+    global _cache
+    if _cache is None:
+        _cache = ToolCache()
+    return _cache
+
+
+def close_tool_cache() -> None:
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
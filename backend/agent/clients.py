@@ -0,0 +1,107 @@
+"""
+Process-wide upstream clients, shared by every research job.
+
+  - one AsyncAnthropic client (Claude Messages API)
+  - one httpx.AsyncClient for the Tavily REST API
+
+Both keep a pooled, keep-alive connection set so jobs don't each pay for a
+cold TLS handshake, and all I/O stays on the event loop (no executor threads).
+main.py creates them in the FastAPI lifespan via `startup()` / `shutdown()`;
+the getters fall back to lazy creation so the agent also works outside the app.
+With NEXUS_UPSTREAM_MODE=record|replay their transports record to / replay
+from a cassette instead (see replay.py).
+"""
+import logging
+import os
+import sys
+
+import anthropic
+import httpx
+
+from . import replay
+
+log = logging.getLogger(__name__)
+
+TAVILY_BASE_URL = "https://api.tavily.com"
+
+# Connection pool tuning (per client)
+HTTP_MAX_CONNECTIONS = int(os.getenv("NEXUS_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("NEXUS_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("NEXUS_HTTP_KEEPALIVE_EXPIRY", "30"))
+TAVILY_TIMEOUT_SECONDS = float(os.getenv("NEXUS_TAVILY_TIMEOUT", "30"))
+
+_anthropic: anthropic.AsyncAnthropic | None = None
+_tavily_http: httpx.AsyncClient | None = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _api_key(name: str) -> str:
+    api_key = os.getenv(name)
+    if not api_key:
+        if replay.UPSTREAM_MODE == "replay":
+            return "replay"  # never sent anywhere
+        raise RuntimeError(f"{name} is not set in .env")
+    return api_key
+
+
+def get_anthropic() -> anthropic.AsyncAnthropic:
+    global _anthropic
+    if _anthropic is None:
+        api_key = _api_key("ANTHROPIC_API_KEY")
+        _anthropic = anthropic.AsyncAnthropic(
+            api_key=api_key,
+            max_retries=0,  # retries are owned by the upstream scheduler
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                limits=_limits(),
+                transport=replay.upstream_transport("anthropic", _limits(), http=_sdk_httpx()),
+            ),
+        )
+    return _anthropic
+
+
+def _sdk_httpx():
+    """The httpx package the Anthropic SDK is built on (httpx, or its httpx2 fork in newer releases)."""
+    base = anthropic.DefaultAsyncHttpxClient.__mro__[1]
+    return sys.modules[base.__module__.partition(".")[0]]
+
+
+def get_tavily_http() -> httpx.AsyncClient:
+    global _tavily_http
+    if _tavily_http is None:
+        api_key = _api_key("TAVILY_API_KEY")
+        _tavily_http = httpx.AsyncClient(
+            base_url=TAVILY_BASE_URL,
+            headers={"Authorization": f"Bearer {api_key}"},
+            limits=_limits(),
+            timeout=TAVILY_TIMEOUT_SECONDS,
+            transport=replay.upstream_transport("tavily", _limits()),
+        )
+    return _tavily_http
+
+
+async def startup() -> None:
+    """Create the shared clients up front. Missing keys are reported per job instead."""
+    for getter in (get_anthropic, get_tavily_http):
+        try:
+            getter()
+        except RuntimeError as exc:
+            log.warning("%s — jobs will fail until it is configured", exc)
+
+
+async def shutdown() -> None:
+    """Close the shared connection pools."""
+    global _anthropic, _tavily_http
+    if _anthropic is not None:
+        await _anthropic.close()
+        _anthropic = None
+    if _tavily_http is not None:
+        await _tavily_http.aclose()
+        _tavily_http = None
+    replay.save_cassette()
@@ -0,0 +1,125 @@
+"""
+Context management for the agent loop's growing `messages` list.
+
+Two parts:
+  1. Prompt caching — cache_control breakpoints on the static system prompt,
+     the tool schemas, and the newest message (so the whole stable prefix is
+     read from cache on the next iteration).
+  2. Compaction — once the estimated context size exceeds a token budget,
+     extract_page results from earlier turns (already read by Claude) are
+     replaced with short digests. The full page stays available through
+     search_notes (or a cached re-extract).
+"""
+import json
+import os
+from typing import Any
+
+from .prompts import SYSTEM_PROMPT
+from .tools import TOOL_SCHEMAS
+
+PROMPT_CACHING = os.getenv("NEXUS_PROMPT_CACHING", "1") != "0"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("NEXUS_CONTEXT_TOKEN_BUDGET", "60000"))
+DIGEST_CHARS = 600  # characters of page text kept in a compacted extract
+
+_CACHE_CONTROL = {"type": "ephemeral"}
+_CHARS_PER_TOKEN = 4  # rough estimate, good enough for a budget trigger
+
+
+class ContextManager:
+    def __init__(
+        self,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        caching: bool = PROMPT_CACHING,
+        system: str = SYSTEM_PROMPT,
+        tools: list[dict] = TOOL_SCHEMAS,
+    ):
+        self._token_budget = token_budget
+        self._caching = caching
+        self._system = system
+        self._tools = tools
+        self._cached_system = [{"type": "text", "text": system, "cache_control": _CACHE_CONTROL}]
+        self._cached_tools = tools[:-1] + [{**tools[-1], "cache_control": _CACHE_CONTROL}] if tools else []
+        # tool_use_id → digest for extract_page results that can still be compacted
+        self._compactable: dict[str, str] = {}
+        self.compacted = 0
+
+    def request_params(self, messages: list[dict]) -> dict[str, Any]:
+        """system / tools / messages parameters for messages.create, with cache breakpoints."""
+        if not self._caching:
+            return {"system": self._system, "tools": self._tools, "messages": list(messages)}
+        return {
+            "system": self._cached_system,
+            "tools": self._cached_tools,
+            "messages": _with_tail_breakpoint(messages),
+        }
+
+    def note_tool_result(self, tool_use_id: str, tool_name: str, result: Any) -> None:
+        """Register a tool result so it can be compacted in a later turn."""
+        if tool_name == "extract_page" and isinstance(result, dict) and "error" not in result:
+            content = result.get("opening", result.get("content", ""))
+            indexed = "opening" in result  # page_view() of an indexed page
+            self._compactable[tool_use_id] = json.dumps({
+                "url": result.get("url", ""),
+                "title": result.get("title", ""),
+                "digest": content[:DIGEST_CHARS] + ("…" if len(content) > DIGEST_CHARS else ""),
+                "note": (
+                    "Page text compacted to save context. Use search_notes to retrieve passages from it."
+                    if indexed else
+                    "Page text compacted to save context. Call extract_page again if you need the full text."
+                ),
+            })
+
+    def compact(self, messages: list[dict]) -> int:
+        """
+        If the context is over budget, replace extract_page results from earlier
+        turns with their digests (in place). The newest turn is never compacted —
+        Claude has not seen it yet. Returns the number of results compacted.
+        """
+        if not self._compactable or estimate_tokens(messages) <= self._token_budget:
+            return 0
+
+        count = 0
+        for message in messages[:-1]:
+            if message["role"] != "user" or not isinstance(message["content"], list):
+                continue
+            for block in message["content"]:
+                digest = self._compactable.pop(block.get("tool_use_id"), None)
+                if digest is not None:
+                    block["content"] = digest
+                    count += 1
+
+        self.compacted += count
+        return count
+
+
+def estimate_tokens(messages: list[dict]) -> int:
+    """Cheap size estimate of a messages list (characters / 4)."""
+    chars = 0
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for block in content:
+            if isinstance(block, dict):
+                chars += len(str(block.get("content", "")))
+            elif block.type == "text":
+                chars += len(block.text)
+            elif block.type == "tool_use":
+                chars += len(json.dumps(block.input))
+    return chars // _CHARS_PER_TOKEN
+
+
+def _with_tail_breakpoint(messages: list[dict]) -> list[dict]:
+    """Copy of `messages` with a cache breakpoint on the newest message's last block."""
+    if not messages:
+        return []
+    last = messages[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content, "cache_control": _CACHE_CONTROL}]
+    elif content and isinstance(content[-1], dict):
+        blocks = content[:-1] + [{**content[-1], "cache_control": _CACHE_CONTROL}]
+    else:
+        return list(messages)
+    return messages[:-1] + [{"role": last["role"], "content": blocks}]
@@ -0,0 +1,356 @@
+"""
+Page extraction backends for extract_page — Tavily's /extract, or fetching
+and cleaning the page here.
+
+NEXUS_EXTRACT_BACKEND selects one:
+
+  tavily  — Tavily /extract, micro-batched (agent/batching.py). The default.
+  local   — LocalFetcher: the page is fetched directly and its HTML cleaned
+            to text in a worker process (agent/html_text.py)
+  hedged  — local first; if it has no good result within
+            NEXUS_EXTRACT_HEDGE_MS, or fails sooner, the Tavily extract is
+            started too. The first good result wins and the other request
+            is cancelled, so one slow or JavaScript-only page costs at most
+            the hedge delay plus a Tavily extract.
+
+The local fetcher:
+
+  - one pooled httpx client (keep-alive connections per host) and at most
+    NEXUS_FETCH_PER_HOST requests in flight to any one host
+  - a deadline per page, NEXUS_FETCH_DEADLINE_MS, covering DNS, redirects,
+    the body and its cleaning; bodies are cut at NEXUS_FETCH_MAX_BYTES
+  - http(s) only, and never a private, loopback or link-local address
+    (NEXUS_FETCH_ALLOW_PRIVATE=1 lifts this, e.g. for the bench's local page
+    server). The check is on the peer address of each new connection, before
+    anything is sent, so a host whose DNS answer changes between a check and
+    the connect (DNS rebinding) cannot slip through; IP literals are refused
+    without connecting. Redirects are followed here so every hop is checked,
+    and proxy settings from the environment are ignored.
+  - HTML → text in a ProcessPoolExecutor of NEXUS_EXTRACT_WORKERS processes,
+    so parsing a large page never blocks the event loop
+  - a page with less than NEXUS_FETCH_MIN_CHARS of text (typically rendered
+    by JavaScript) is reported as an error — in hedged mode, left to Tavily
+
+Both return Tavily-shaped items ({url, title, raw_content} or {error}).
+Every extraction's latency is recorded per backend: extract_stats() has
+count, errors and p50 / p99 over the last NEXUS_EXTRACT_LATENCY_WINDOW
+(GET /api/upstream/stats), and nexus_extract_seconds is in /metrics.
+bench/extract.py compares the backends against a local page server.
+"""
+import asyncio
+import codecs
+import contextlib
+import ipaddress
+import math
+import os
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from .html_text import html_to_text
+from .scheduler import describe_error
+from utils.metrics import EXTRACT_SECONDS
+
+EXTRACT_BACKEND = os.getenv("NEXUS_EXTRACT_BACKEND", "tavily")  # tavily | local | hedged
+EXTRACT_HEDGE_MS = float(os.getenv("NEXUS_EXTRACT_HEDGE_MS", "1500"))
+EXTRACT_WORKERS = int(os.getenv("NEXUS_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACT_LATENCY_WINDOW = int(os.getenv("NEXUS_EXTRACT_LATENCY_WINDOW", "1000"))
+FETCH_PER_HOST = int(os.getenv("NEXUS_FETCH_PER_HOST", "4"))
+FETCH_DEADLINE_MS = float(os.getenv("NEXUS_FETCH_DEADLINE_MS", "10000"))
+FETCH_MAX_BYTES = int(os.getenv("NEXUS_FETCH_MAX_BYTES", str(4 * 1024 * 1024)))
+FETCH_MIN_CHARS = int(os.getenv("NEXUS_FETCH_MIN_CHARS", "200"))
+FETCH_ALLOW_PRIVATE = os.getenv("NEXUS_FETCH_ALLOW_PRIVATE", "0") == "1"
+FETCH_MAX_REDIRECTS = 5
+FETCH_USER_AGENT = os.getenv("NEXUS_FETCH_USER_AGENT", "Mozilla/5.0 (compatible; NexusResearch/1.0)")
+
+BACKENDS = ("tavily", "local", "hedged")
+
+_HTML_TYPES = frozenset({"text/html", "application/xhtml+xml"})
+_TEXT_TYPES = _HTML_TYPES | {"text/plain"}
+
+
+class FetchError(Exception):
+    """A page that could not be fetched or has no usable text."""
+
+
+# ── Latency per backend ──────────────────────────────────────────────────────
+
+class _Latency:
+    def __init__(self, window: int = EXTRACT_LATENCY_WINDOW):
+        self.samples: deque[float] = deque(maxlen=max(1, window))
+        self.count = 0
+        self.errors = 0
+        self.cancelled = 0  # hedged losers, abandoned extracts
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.errors += not ok
+
+    def stats(self) -> dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def rank(p: float) -> float:  # nearest-rank, in ms
+            return round(ordered[max(0, math.ceil(p * len(ordered)) - 1)] * 1000, 1) if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "p50_ms": rank(0.50),
+            "p99_ms": rank(0.99),
+        }
+
+
+_latency = {backend: _Latency() for backend in BACKENDS}
+_hedge = {"hedges": 0, "local_wins": 0, "tavily_wins": 0}
+
+
+def extract_stats() -> dict[str, Any]:
+    """Latency (over the last EXTRACT_LATENCY_WINDOW extracts) and errors per backend."""
+    stats = {backend: latency.stats() for backend, latency in _latency.items()}
+    stats["hedged"].update(_hedge)
+    return stats
+
+
+async def _measure(backend: str, fetch: Callable[[], Awaitable[dict[str, Any]]]) -> dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        item = await fetch()
+    except asyncio.CancelledError:
+        _latency[backend].cancelled += 1
+        raise
+    except Exception:
+        _observe(backend, started, ok=False)
+        raise
+    _observe(backend, started, ok="error" not in item)
+    return item
+
+
+def _observe(backend: str, started: float, ok: bool) -> None:
+    elapsed = time.perf_counter() - started
+    _latency[backend].record(elapsed, ok)
+    EXTRACT_SECONDS.observe(elapsed, backend=backend)
+
+
+# ── Backend selection ────────────────────────────────────────────────────────
+
+async def extract(
+    url: str,
+    tavily: Callable[[str], Awaitable[dict[str, Any]]],
+    backend: str = EXTRACT_BACKEND,
+) -> dict[str, Any]:
+    """
+    Tavily-shaped result item for `url` from the configured backend.
+    `tavily(url)` is the Tavily extract (it may raise, like the batcher).
+    """
+    if backend == "local":
+        return await _measure("local", lambda: get_fetcher().extract(url))
+    if backend == "hedged":
+        return await _measure("hedged", lambda: _hedged(url, tavily))
+    return await _measure("tavily", lambda: tavily(url))
+
+
+async def _hedged(
+    url: str, tavily: Callable[[str], Awaitable[dict[str, Any]]], delay: float = EXTRACT_HEDGE_MS / 1000
+) -> dict[str, Any]:
+    local = asyncio.create_task(_measure("local", lambda: get_fetcher().extract(url)))
+    tasks = {local}
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=delay)
+        if local in done and _good(local):
+            _hedge["local_wins"] += 1
+            return local.result()
+        # Local is slow or has failed: race the Tavily extract against it
+        _hedge["hedges"] += 1
+        remote = asyncio.create_task(_measure("tavily", lambda: tavily(url)))
+        tasks.add(remote)
+        pending.add(remote)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if _good(task):
+                    _hedge["local_wins" if task is local else "tavily_wins"] += 1
+                    return task.result()
+        # Neither has a good result: report Tavily's failure, as the tavily backend would
+        return remote.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _good(task: asyncio.Task) -> bool:
+    return task.exception() is None and "error" not in task.result()
+
+
+# ── Local fetcher ────────────────────────────────────────────────────────────
+
+class _HostSlots:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0
+
+
+class LocalFetcher:
+    def __init__(
+        self,
+        per_host: int = FETCH_PER_HOST,
+        deadline_ms: float = FETCH_DEADLINE_MS,
+        max_bytes: int = FETCH_MAX_BYTES,
+        min_chars: int = FETCH_MIN_CHARS,
+        allow_private: bool = FETCH_ALLOW_PRIVATE,
+        workers: int = EXTRACT_WORKERS,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self._per_host = max(1, per_host)
+        self._deadline = deadline_ms / 1000
+        self._max_bytes = max_bytes
+        self._min_chars = min_chars
+        self._allow_private = allow_private
+        self._workers = max(1, workers)
+        self._hosts: dict[str, _HostSlots] = {}
+        self._pool: ProcessPoolExecutor | None = None
+        self._client = httpx.AsyncClient(
+            headers={"User-Agent": FETCH_USER_AGENT, "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9"},
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30),
+            timeout=None,  # the deadline covers the whole extract
+            follow_redirects=False,  # followed in _fetch, which checks every hop
+            trust_env=False,  # connect directly, so the peer is the page's host
+            transport=transport,
+        )
+        self._extensions = {} if allow_private else {"trace": self._check_peer}
+
+    async def extract(self, url: str) -> dict[str, Any]:
+        """{url, title, raw_content} for the page at `url`, or {"error": ...}."""
+        try:
+            async with asyncio.timeout(self._deadline):
+                final_url, body, encoding, content_type = await self._fetch(url)
+                if content_type in _HTML_TYPES:
+                    loop = asyncio.get_running_loop()
+                    title, text = await loop.run_in_executor(self._get_pool(), html_to_text, body, encoding)
+                else:
+                    title, text = "", body.decode(encoding, errors="replace")
+        except TimeoutError:
+            return {"error": f"Timed out after {self._deadline:g}s"}
+        except FetchError as exc:
+            return {"error": str(exc)}
+        except httpx.HTTPError as exc:
+            return {"error": describe_error(exc)}
+        except BrokenProcessPool:
+            self._pool = None  # a worker died; start a fresh pool next time
+            return {"error": "Page cleaning failed"}
+        if len(text) < self._min_chars:
+            return {"error": "Page has almost no text (it may need JavaScript)"}
+        return {"url": final_url, "title": title, "raw_content": text}
+
+    async def close(self) -> None:
+        await self._client.aclose()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _fetch(self, url: str) -> tuple[str, bytes, str, str]:
+        """(final url, body, charset, content type), following redirects."""
+        for _ in range(FETCH_MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in ("http", "https") or not parts.hostname:
+                raise FetchError(f"Not an http(s) URL: {url[:200]}")
+            self._check_literal(parts.hostname)
+            async with self._host_slot(parts.hostname.lower()):
+                async with self._client.stream("GET", url, extensions=self._extensions) as response:
+                    if response.is_redirect:
+                        url = urljoin(url, response.headers.get("location", ""))
+                        continue
+                    if response.status_code >= 400:
+                        raise FetchError(f"HTTP {response.status_code}")
+                    content_type = response.headers.get("content-type", "").partition(";")[0].strip().lower()
+                    if content_type not in _TEXT_TYPES:
+                        raise FetchError(f"Not a text page ({content_type or 'no content type'})")
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body += chunk
+                        if len(body) >= self._max_bytes:
+                            break  # the rest of a huge page is not worth the wait
+                    return url, bytes(body[: self._max_bytes]), _charset(response.charset_encoding), content_type
+        raise FetchError("Too many redirects")
+
+    def _check_literal(self, host: str) -> None:
+        """Refuse an IP-literal host that is not public without connecting to it."""
+        if self._allow_private:
+            return
+        try:
+            address = ipaddress.ip_address(host.strip("[]"))
+        except ValueError:
+            return  # a name: checked once connected, in _check_peer
+        if not _is_public(address):
+            raise FetchError(f"Refusing to fetch non-public address {address}")
+
+    async def _check_peer(self, event: str, info: dict[str, Any]) -> None:
+        """
+        httpcore trace hook (SSRF guard): refuse a new connection whose peer is
+        not a public address — after the connect, before TLS or the request.
+        """
+        if event != "connection.connect_tcp.complete":
+            return
+        stream = info["return_value"]
+        peer = stream.get_extra_info("server_addr")
+        address = ipaddress.ip_address(str(peer[0]).partition("%")[0]) if peer else None
+        if address is None or not _is_public(address):
+            await stream.aclose()
+            raise FetchError(f"Refusing to fetch non-public address {address or 'unknown'}")
+
+    @contextlib.asynccontextmanager
+    async def _host_slot(self, host: str):
+        slots = self._hosts.get(host)
+        if slots is None:
+            slots = self._hosts[host] = _HostSlots(self._per_host)
+        slots.users += 1
+        try:
+            async with slots.semaphore:
+                yield
+        finally:
+            slots.users -= 1
+            if not slots.users:
+                del self._hosts[host]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self._workers)
+        return self._pool
+
+
+def _charset(declared: str | None) -> str:
+    """The page's declared charset if Python knows it, else utf-8."""
+    try:
+        return codecs.lookup(declared).name if declared else "utf-8"
+    except LookupError:
+        return "utf-8"
+
+
+def _is_public(address: ipaddress.IPv4Address | ipaddress.IPv6Address) -> bool:
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped  # ::ffff:127.0.0.1
+    return address.is_global
+
+
+_fetcher: LocalFetcher | None = None
+
+
+def get_fetcher() -> LocalFetcher:
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = LocalFetcher()
+    return _fetcher
+
+
+async def close_fetcher() -> None:
+    global _fetcher
+    if _fetcher is not None:
+        await _fetcher.close()
+        _fetcher = None
@@ -0,0 +1,104 @@
+"""
+HTML → readable text for the local extract backend (agent/fetch.py).
+
+Runs in the fetcher's worker processes, so it only imports the standard
+library. The output resembles Tavily's raw_content: the page's text with
+one paragraph per line — scripts, styles, navigation, forms and other page
+chrome dropped, entities decoded, whitespace collapsed.
+"""
+import codecs
+import re
+from html.parser import HTMLParser
+
+# Elements whose content is never page text. Not <form>: ASP.NET pages wrap
+# their whole body in one.
+_SKIPPED = frozenset({
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object",
+    "head", "nav", "footer", "aside", "button", "select", "dialog",
+})
+# What may appear in <head>; any other start tag (e.g. <body>) ends a head
+# whose </head> was left out, as HTML5 allows
+_HEAD_CONTENT = frozenset({"title", "meta", "link", "style", "script", "base", "noscript", "template"})
+# Elements that end a line of text
+_BLOCKS = frozenset({
+    "address", "article", "blockquote", "br", "dd", "details", "div", "dl", "dt", "figcaption",
+    "figure", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "li", "main", "ol", "p", "pre", "section",
+    "summary", "table", "td", "th", "tr", "ul",
+})
+_VOID = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source",
+    "track", "wbr",
+})
+_SPACES = re.compile(r"[ \t\r\f\v ]+")
+
+
+class _TextParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines: list[str] = []
+        self.title = ""
+        self._line: list[str] = []
+        self._skip: list[str] = []  # open skipped elements, innermost last
+        self._in_title = False
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        self._end_head(tag)
+        if tag == "title":
+            self._in_title = True
+        elif tag in _SKIPPED:
+            self._skip.append(tag)
+        elif tag in _BLOCKS:
+            self._break()
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        self._end_head(tag)
+        if tag in _BLOCKS:
+            self._break()
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title":
+            self._in_title = False
+        elif tag in _SKIPPED:
+            # Close the innermost matching element (and anything left open inside it)
+            if tag in self._skip:
+                while self._skip.pop() != tag:
+                    pass
+        elif tag in _BLOCKS and tag not in _VOID:
+            self._break()
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self._line.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._break()
+
+    def _end_head(self, tag: str) -> None:
+        if "head" in self._skip and tag not in _HEAD_CONTENT:
+            while self._skip.pop() != "head":
+                pass
+
+    def _break(self) -> None:
+        if self._line:
+            line = _SPACES.sub(" ", "".join(self._line).replace("\n", " ")).strip()
+            if line:
+                self.lines.append(line)
+            self._line = []
+
+
+def html_to_text(body: bytes, encoding: str = "utf-8", max_chars: int = 0) -> tuple[str, str]:
+    """(title, text) of an HTML document; text is cut to max_chars (0 = no limit)."""
+    try:
+        codecs.lookup(encoding)
+    except (LookupError, TypeError):
+        encoding = "utf-8"  # unknown or missing charset
+    parser = _TextParser()
+    parser.feed(body.decode(encoding, errors="replace"))
+    parser.close()
+    text = "\n".join(parser.lines)
+    if max_chars:
+        text = text[:max_chars]
+    return _SPACES.sub(" ", parser.title).strip(), text
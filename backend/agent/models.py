@@ -1,12 +1,52 @@
 """
 Pydantic models for FastAPI request/response bodies.
 """
+import os
+from typing import Annotated, Literal
+
 from pydantic import BaseModel, Field
 
+# Default research mode: one agent loop (serial), or planner + concurrent sub-agents + writer
+RESEARCH_MODE = os.getenv("NEXUS_RESEARCH_MODE", "serial")
+BATCH_MAX_QUERIES = int(os.getenv("NEXUS_BATCH_MAX_QUERIES", "1000"))
+
+QueryText = Annotated[str, Field(min_length=3, max_length=500)]
+# Per-job budgets (agent/budget.py): a request can lower the server's, not raise them
+TokenBudget = Annotated[int | None, Field(ge=1000, description="Claude tokens the job may use")]
+TimeBudget = Annotated[float | None, Field(gt=0, description="Seconds the job may run")]
+
 
 class ResearchRequest(BaseModel):
-    query: str = Field(..., min_length=3, max_length=500, description="The research question")
+    query: QueryText = Field(..., description="The research question")
+    priority: Literal["interactive", "batch"] = Field(
+        "interactive", description="Upstream scheduling class — interactive jobs go first"
+    )
+    bypass_cache: bool = Field(
+        False, description="Always run fresh research, even if a cached report matches"
+    )
+    mode: Literal["serial", "parallel"] = Field(
+        RESEARCH_MODE, description="serial: one agent loop; parallel: sub-questions researched concurrently"
+    )
+    token_budget: TokenBudget = None
+    time_budget_s: TimeBudget = None
 
 
 class ResearchResponse(BaseModel):
     research_id: str = Field(..., description="UUID to use for the SSE stream endpoint")
+    cached: bool = Field(False, description="True if the stream replays a cached report")
+
+
+class BatchRequest(BaseModel):
+    queries: list[QueryText] = Field(
+        ..., min_length=1, max_length=BATCH_MAX_QUERIES, description="The research questions"
+    )
+    concurrency: int | None = Field(
+        None, ge=1, description="Jobs of the batch running at once (default and cap: NEXUS_BATCH_MAX_CONCURRENCY)"
+    )
+    include_events: bool = Field(True, description="Relay each job's events, not just its final report")
+    bypass_cache: bool = Field(
+        False, description="Always run fresh research, even if a cached report matches"
+    )
+    mode: Literal["serial", "parallel"] = Field(RESEARCH_MODE, description="Research mode for every query")
+    token_budget: TokenBudget = None
+    time_budget_s: TimeBudget = None
@@ -0,0 +1,222 @@
+"""
+PassageIndex — a per-job store of the pages the agent has extracted.
+
+Instead of pasting up to 8,000 characters of every page into the context,
+extract_page indexes the full page here and hands Claude a compact view: the
+opening passage plus the few passages that best match the question. The
+search_notes tool then retrieves the top passages across every page read so
+far, so material deep in a long page is still one cheap call away.
+
+  - pages are split into ~PASSAGE_CHARS passages on paragraph / sentence
+    boundaries
+  - passages are ranked with BM25; postings are kept as NumPy arrays so a
+    query costs one vectorized update per query term, not per passage
+  - one index per job, in memory; it dies with the job
+
+NEXUS_PASSAGE_INDEX=0 restores the old behaviour (truncated page text in the
+tool result, no search_notes tool).
+"""
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from .cache import normalize_url
+
+PASSAGE_INDEX = os.getenv("NEXUS_PASSAGE_INDEX", "1") != "0"
+PASSAGE_CHARS = int(os.getenv("NEXUS_PASSAGE_CHARS", "1000"))
+PAGE_EXCERPTS = 3  # best-matching passages returned by extract_page, besides the opening one
+
+# BM25 parameters (the usual defaults)
+_K1 = 1.2
+_B = 0.75
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can could did do does for from had has have how i if in "
+    "into is it its may more most not of on or our should so such than that the their them "
+    "then there these they this those to was we were what when where which while who why "
+    "will with would you your".split()
+)
+_WORD = re.compile(r"[a-z0-9]+")
+_PARAGRAPH = re.compile(r"\n\s*\n|\n(?=[#*\-•] )")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased content words, lightly stemmed (plural s)."""
+    tokens = []
+    for word in _WORD.findall(text.lower()):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def split_passages(text: str, size: int = PASSAGE_CHARS) -> list[str]:
+    """Pack paragraphs into passages of about `size` characters; split long ones by sentence."""
+    pieces: list[str] = []
+    for paragraph in _PARAGRAPH.split(text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if len(paragraph) <= size:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE.split(paragraph):
+            # A "sentence" longer than a passage (tables, lists without punctuation) is cut hard
+            pieces.extend(sentence[i:i + size] for i in range(0, len(sentence), size))
+
+    passages: list[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > size:
+            passages.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        passages.append(current)
+    return passages
+
+
+@dataclass
+class _Page:
+    url: str
+    title: str
+    chars: int
+    first: int  # passage ids first..end-1
+    end: int
+
+
+class PassageIndex:
+    def __init__(self, query: str = "", passage_chars: int = PASSAGE_CHARS):
+        self._query = query  # default focus for extract_page views
+        self._passage_chars = passage_chars
+        self._pages: dict[str, _Page] = {}
+        self._passages: list[str] = []
+        self._page_of: list[_Page] = []
+        self._lengths: list[int] = []
+        self._postings: dict[str, tuple[list[int], list[int]]] = {}  # term → (passage ids, tfs)
+        # NumPy views of the above, rebuilt lazily after pages are added
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._length_array: np.ndarray | None = None
+
+    @property
+    def passage_count(self) -> int:
+        return len(self._passages)
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pages)
+
+    def add_page(self, page: dict[str, Any], focus: str = "") -> dict[str, Any]:
+        """
+        Index an extract_page result (once per URL) and return the compact view
+        Claude sees instead of the full text. Error results pass through.
+        """
+        if "error" in page:
+            return page
+        key = normalize_url(page.get("url", ""))
+        entry = self._pages.get(key)
+        if entry is None:
+            entry = self._index(page.get("url", ""), page.get("title", ""), page.get("content", ""))
+            self._pages[key] = entry
+
+        excerpts = []
+        if entry.end - entry.first > 1:
+            for hit in self._search(focus or self._query, PAGE_EXCERPTS, entry.first + 1, entry.end):
+                excerpts.append(self._passages[hit])
+        return {
+            "url": page.get("url", ""),
+            "title": entry.title,
+            "chars": entry.chars,
+            "passages": entry.end - entry.first,
+            "opening": self._passages[entry.first] if entry.end > entry.first else "",
+            "excerpts": excerpts,
+            "note": "Full text indexed. Use search_notes to retrieve other passages from the pages you have read.",
+        }
+
+    def search(self, query: str, max_results: int = 5, url: str = "") -> list[dict[str, Any]]:
+        """Top passages for `query` across all indexed pages (or just `url`'s)."""
+        first, end = 0, len(self._passages)
+        if url:
+            entry = self._pages.get(normalize_url(url))
+            if entry is None:
+                return []
+            first, end = entry.first, entry.end
+        results = []
+        for passage_id, score in self._search(query, max_results, first, end, with_scores=True):
+            page = self._page_of[passage_id]
+            results.append({
+                "url": page.url,
+                "title": page.title,
+                "passage": self._passages[passage_id],
+                "score": round(score, 2),
+            })
+        return results
+
+    # ── Internals ─────────────────────────────────────────────────────────
+
+    def _index(self, url: str, title: str, text: str) -> _Page:
+        entry = _Page(url, title, len(text), len(self._passages), len(self._passages))
+        for passage in split_passages(text, self._passage_chars):
+            passage_id = len(self._passages)
+            tokens = tokenize(passage)
+            counts: dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, tf in counts.items():
+                ids, tfs = self._postings.setdefault(term, ([], []))
+                ids.append(passage_id)
+                tfs.append(tf)
+            self._passages.append(passage)
+            self._page_of.append(entry)
+            self._lengths.append(len(tokens))
+        entry.end = len(self._passages)
+        self._arrays.clear()
+        self._length_array = None
+        return entry
+
+    def _posting_arrays(self, term: str) -> tuple[np.ndarray, np.ndarray] | None:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if postings is None:
+                return None
+            arrays = self._arrays[term] = (
+                np.asarray(postings[0], dtype=np.int32),
+                np.asarray(postings[1], dtype=np.float32),
+            )
+        return arrays
+
+    def _search(self, query: str, k: int, first: int, end: int, with_scores: bool = False) -> list:
+        """BM25 top-k among passages first..end-1: passage ids (or (id, score) pairs)."""
+        terms = set(tokenize(query))
+        n = len(self._passages)
+        if not terms or k <= 0 or end <= first:
+            return []
+        if self._length_array is None:
+            self._length_array = np.asarray(self._lengths, dtype=np.float32)
+        lengths = self._length_array
+        norm = _K1 * (1 - _B + _B * lengths / max(float(lengths.mean()), 1.0))
+
+        scores = np.zeros(n, dtype=np.float32)
+        for term in terms:
+            arrays = self._posting_arrays(term)
+            if arrays is None:
+                continue
+            ids, tfs = arrays
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tfs * (_K1 + 1) / (tfs + norm[ids])
+
+        window = scores[first:end]
+        k = min(k, len(window))
+        top = np.argpartition(-window, k - 1)[:k]
+        top = top[np.lexsort((top, -window[top]))]  # best first, earlier passage on ties
+        hits = [(first + int(i), float(window[i])) for i in top if window[i] > 0]
+        return hits if with_scores else [passage_id for passage_id, _ in hits]
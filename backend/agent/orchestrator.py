@@ -4,36 +4,168 @@ ResearchOrchestrator — the heart of the Nexus Research agent.
 Runs the agentic loop:
   1. Call Claude with tools defined
   2. Claude returns tool_use blocks
-  3. Execute the tool, intercept write_section / mark_complete to emit SSE events
+  3. Execute the tools (independent I/O tools concurrently), intercept
+     write_section / mark_complete to emit SSE events
   4. Append tool_result to messages
-  5. Repeat until stop_reason == "end_turn"
+  5. Repeat until stop_reason == "end_turn" or a budget runs out
+
+Each turn is routed to a model by step (agent/routing.py) and checked
+against the job's token / time / iteration budgets (agent/budget.py).
 
 Yields dicts (SSE event payloads) for each notable step.
 """
 import asyncio
+import contextlib
 import json
+import logging
 import os
+import time
 from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
 from typing import Any
 
-import anthropic
-
+from .budget import (
+    JOB_TIME_BUDGET_SECONDS,
+    JOB_TOKEN_BUDGET,
+    JobBudget,
+    stopped_early_summary,
+    wrap_up_note,
+)
+from .clients import get_anthropic
+from .context import ContextManager, estimate_tokens
+from .notes import PASSAGE_INDEX, PassageIndex
+from .prefetch import Prefetcher
 from .prompts import SYSTEM_PROMPT
-from .tools import TOOL_SCHEMAS, execute_tool
-
-MAX_ITERATIONS = 40  # hard ceiling on the loop to prevent runaway costs
-
-
-def _get_client() -> anthropic.Anthropic:
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise RuntimeError("ANTHROPIC_API_KEY is not set in .env")
-    return anthropic.Anthropic(api_key=api_key)
+from .routing import ModelRouter, Route
+from .scheduler import bind_job, describe_error, get_scheduler
+from .tools import TOOL_SCHEMAS, execute_tool, page_view
+from utils.metrics import (
+    BUDGET_STOPS,
+    CLAUDE_CALL_SECONDS,
+    CLAUDE_FIRST_DELTA_SECONDS,
+    ITERATION_SECONDS,
+    ITERATIONS,
+    ROUTE_ESCALATIONS,
+    ROUTED_TURNS,
+    TOKENS,
+)
+from utils.partial_json import PartialStringField
+
+log = logging.getLogger(__name__)
+
+# Turns per agent loop; the job winds down two turns before (agent/budget.py)
+MAX_ITERATIONS = int(os.getenv("NEXUS_MAX_ITERATIONS", "40"))
+
+# Max I/O tool calls in flight at once within a single turn (1 = sequential)
+TOOL_CONCURRENCY = int(os.getenv("NEXUS_TOOL_CONCURRENCY", "5"))
+
+# Read-only tools that can safely run side by side. Everything else
+# (write_section, mark_complete) keeps strict sequential, in-order semantics.
+CONCURRENT_TOOLS = frozenset({"web_search", "extract_page"})
+
+# Stream Claude's output token by token (thinking_delta / section_delta events)
+# instead of waiting for the complete response. Set to 0 to disable.
+STREAM_RESPONSES = os.getenv("NEXUS_STREAM_RESPONSES", "1") != "0"
+
+# Attach a per-job timing summary to the `complete` event (see JobTimings)
+TIMING_SUMMARY = os.getenv("NEXUS_TIMING_SUMMARY", "0") == "1"
+
+_USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+
+@dataclass(frozen=True)
+class AgentProfile:
+    """What one agent loop is for: its system prompt, tools, iteration cap and first turn's step."""
+    system: str
+    tools: list[dict]
+    max_iterations: int = MAX_ITERATIONS
+    first_step: str = "plan"  # plan | research | write (agent/routing.py)
+
+
+# The single-agent researcher; agent/parallel.py defines the parallel-mode roles
+RESEARCHER = AgentProfile(SYSTEM_PROMPT, TOOL_SCHEMAS)
+
+# Internal tools that end the loop with a result event for the caller (parallel mode)
+_RESULT_TOOLS = {"submit_plan": "plan", "submit_findings": "findings"}
+
+
+@dataclass
+class JobTimings:
+    """Where one job's time went: Claude calls, tool calls, iterations."""
+    started: float = field(default_factory=time.perf_counter)
+    iteration_started: float = 0.0
+    iterations: int = 0
+    claude_calls: int = 0
+    claude_seconds: float = 0.0
+    first_delta_seconds: list[float] = field(default_factory=list)
+    tool_wall_seconds: float = 0.0  # batches run concurrently, so less than the per-tool sum
+    tools: dict[str, list[float]] = field(default_factory=dict)  # name → [calls, seconds]
+
+    def start_iteration(self) -> None:
+        self.iterations += 1
+        self.iteration_started = time.perf_counter()
+        ITERATIONS.inc()
+
+    def mean_iteration_seconds(self) -> float:
+        if not self.iterations:
+            return 0.0
+        return (time.perf_counter() - self.started) / self.iterations
+
+    def end_iteration(self) -> None:
+        if self.iteration_started:
+            ITERATION_SECONDS.observe(time.perf_counter() - self.iteration_started)
+            self.iteration_started = 0.0
+
+    def tool_call(self, name: str, seconds: float) -> None:
+        calls = self.tools.setdefault(name, [0, 0.0])
+        calls[0] += 1
+        calls[1] += seconds
+
+    def summary(self, usage_totals: dict[str, int]) -> dict[str, Any]:
+        def ms(seconds: float) -> int:
+            return int(seconds * 1000)
+
+        return {
+            "total_ms": ms(time.perf_counter() - self.started),
+            "iterations": self.iterations,
+            "claude_calls": self.claude_calls,
+            "claude_ms": ms(self.claude_seconds),
+            "first_delta_ms": [ms(s) for s in self.first_delta_seconds],
+            "tool_wall_ms": ms(self.tool_wall_seconds),
+            "tools": {name: {"calls": int(c), "ms": ms(sec)} for name, (c, sec) in self.tools.items()},
+            "tokens": dict(usage_totals),
+        }
 
 
 class ResearchOrchestrator:
-    def __init__(self):
-        self._client = _get_client()
+    def __init__(
+        self,
+        tool_concurrency: int = TOOL_CONCURRENCY,
+        stream: bool = STREAM_RESPONSES,
+        priority: str = "interactive",
+        profile: AgentProfile = RESEARCHER,
+        notes: PassageIndex | None = None,
+        token_budget: int = JOB_TOKEN_BUDGET,
+        time_budget: float = JOB_TIME_BUDGET_SECONDS,
+        budget: JobBudget | None = None,
+    ):
+        self._client = get_anthropic()  # process-wide pooled async client
+        self._profile = profile
+        self._tool_semaphore = asyncio.Semaphore(max(1, tool_concurrency))
+        self._stream = stream
+        self._priority = priority  # upstream scheduling class: interactive | batch
+        self._timings = JobTimings()
+        self._prefetch = Prefetcher()
+        self._shared_notes = notes  # a passage index shared with other agents of the job
+        self._notes: PassageIndex | None = None
+        self._limits = (token_budget, time_budget)
+        self._shared_budget = budget  # the job's budget, when other agents draw on it too
+        self._budget = budget or JobBudget(*self._limits)
 
     async def run(self, query: str) -> AsyncGenerator[dict[str, Any], None]:
         """
@@ -41,34 +173,108 @@ class ResearchOrchestrator:
         Yields SSE event dicts as the agent works.
         The caller is responsible for formatting these as SSE and sending them.
         """
+        self._prefetch = Prefetcher()  # speculative extracts after web_search (agent/prefetch.py)
+        self._notes = self._shared_notes  # extracted pages (agent/notes.py)
+        if self._notes is None and PASSAGE_INDEX:
+            self._notes = PassageIndex(query)
+        self._budget = self._shared_budget or JobBudget(*self._limits)  # agent/budget.py
+        # Cancelling the job (registry.cancel, or an unwatched job) raises
+        # CancelledError at whatever the loop is awaiting. aclosing makes the
+        # nested generators unwind with it even when the cancel lands while an
+        # event is out with the consumer: the Claude stream's response is closed,
+        # in-flight tool calls and prefetches are cancelled (tool-cache and
+        # extract-batch fetches nobody else waits for are dropped, agent/cache.py,
+        # agent/batching.py) and the upstream scheduler forgets queued waits.
+        self._budget.loops += 1
+        try:
+            async with contextlib.aclosing(self._run(query)) as events:
+                async for event in events:
+                    yield event
+        finally:
+            self._budget.loops -= 1
+            self._prefetch.close()  # cancel and count unused prefetches
+
+    async def _run(self, query: str) -> AsyncGenerator[dict[str, Any], None]:
         messages: list[dict] = [{"role": "user", "content": query}]
         iterations = 0
+        # Prompt-cache breakpoints + compaction
+        context = ContextManager(system=self._profile.system, tools=self._profile.tools)
+        usage_totals = dict.fromkeys(_USAGE_FIELDS, 0)
+        # Queue waits / retries of this job's upstream calls land here (agent/scheduler.py)
+        upstream = bind_job(self._priority)
+
+        timings = self._timings = JobTimings()
+        budget = self._budget
+        router = ModelRouter(self._profile.first_step)
+        max_iterations = self._profile.max_iterations
+        wrapping_up = False
+
+        while True:
+            # ── Budgets: wind down, or stop with what has been written ─────
+            status = budget.check(iterations, max_iterations, timings.mean_iteration_seconds())
+            if iterations:
+                yield budget.event(status, iterations, max_iterations)
+            if status.state == "exhausted":
+                BUDGET_STOPS.inc(budget=status.limit)
+                yield self._complete("Research Complete", stopped_early_summary(status.limit), usage_totals)
+                return
+            if status.state == "wrap_up" and not wrapping_up:
+                wrapping_up = True
+                messages[-1]["content"].append({"type": "text", "text": wrap_up_note(status.limit)})
 
-        # Run the blocking Anthropic API calls in a thread pool so we don't
-        # block the FastAPI event loop.
-        loop = asyncio.get_running_loop()
-
-        while iterations < MAX_ITERATIONS:
             iterations += 1
+            timings.start_iteration()
+            self._prefetch.next_iteration()
 
             # ── Call Claude ───────────────────────────────────────────────
-            try:
-                # Snapshot messages for the lambda to avoid closure issues
-                msgs_snapshot = list(messages)
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: self._client.messages.create(
-                        model="claude-sonnet-4-6",
-                        max_tokens=8096,
-                        system=SYSTEM_PROMPT,
-                        tools=TOOL_SCHEMAS,
-                        messages=msgs_snapshot,
-                    ),
+            compacted = context.compact(messages)
+            route: Route | None = router.route(wrap_up=wrapping_up)
+            escalated = False
+            while route is not None:
+                ROUTED_TURNS.inc(step=route.step, model=route.model)
+                yield route.event(iterations, escalated)
+                params = _request_params(context, messages, route)
+                estimate = estimate_tokens(params["messages"])
+                try:
+                    # Deltas and scheduler events are forwarded live; the final Message arrives last.
+                    # Research turns stream no section drafts — one would be dropped on escalation.
+                    call = self._call_claude(params, estimate, upstream, section_deltas=route.step != "research")
+                    async with contextlib.aclosing(call) as items:
+                        async for item in items:
+                            if isinstance(item, dict):
+                                yield item
+                            else:
+                                response = item
+                except Exception as exc:
+                    log.warning("Claude call failed (iter %d): %s: %s", iterations, type(exc).__name__, exc)
+                    timings.end_iteration()
+                    yield {"type": "error", "message": f"Claude API error: {describe_error(exc)}"}
+                    return
+
+                # Per-call token accounting (shows the prompt-cache savings)
+                usage = {f: getattr(response.usage, f, None) or 0 for f in _USAGE_FIELDS}
+                get_scheduler().adjust_tokens(
+                    "anthropic", usage["input_tokens"] + usage["cache_creation_input_tokens"] - estimate
                 )
-            except Exception as exc:
-                print(f"[orchestrator] Claude call failed (iter {iterations}): {type(exc).__name__}: {exc}")
-                yield {"type": "error", "message": f"Claude API error: {type(exc).__name__}: {exc}"}
-                return
+                budget.charge(usage)
+                for f in _USAGE_FIELDS:
+                    usage_totals[f] += usage[f]
+                    if usage[f]:
+                        TOKENS.inc(usage[f], type=f.removesuffix("_tokens"), model=route.model)
+                yield {
+                    "type": "usage",
+                    "iteration": iterations,
+                    "model": route.model,
+                    **usage,
+                    "compacted_results": compacted,
+                    "job_totals": dict(usage_totals),
+                }
+
+                # A research turn that wants to write goes to the large model instead
+                route = router.escalation(route, response)
+                if route is not None:
+                    ROUTE_ESCALATIONS.inc()
+                    escalated = True
 
             # ── Process response content blocks ───────────────────────────
             assistant_content = []
@@ -86,72 +292,232 @@ class ResearchOrchestrator:
 
             # Append assistant turn to messages
             messages.append({"role": "assistant", "content": assistant_content})
+            router.observe([block.name for block in tool_use_blocks])
 
             # ── If no tool calls, we're done ──────────────────────────────
             if not tool_use_blocks:
                 # Agent finished without calling mark_complete — emit done anyway
-                yield {"type": "complete", "report_title": "Research Complete", "executive_summary": ""}
+                yield self._complete("Research Complete", "", usage_totals)
                 return
 
-            # ── Execute each tool call ────────────────────────────────────
+            # ── Execute tool calls ────────────────────────────────────────
+            # Contiguous runs of I/O tools execute concurrently; events and
+            # tool_result messages are still emitted in the original block order.
             tool_results = []
 
-            for block in tool_use_blocks:
-                tool_name = block.name
-                tool_input = block.input
+            for batch in _batch_tool_calls(tool_use_blocks):
+                # Emit the tool call events (so the UI shows what the agent is doing)
+                for block in batch:
+                    yield {"type": "tool_call", "tool": block.name, "id": block.id, "input": block.input}
+
+                batch_started = time.perf_counter()
+                results = await self._execute_batch(batch)
+                timings.tool_wall_seconds += time.perf_counter() - batch_started
+                for event in upstream.drain():
+                    yield event
+
+                for block, result in zip(batch, results):
+                    tool_name = block.name
+                    tool_input = block.input
+
+                    # ── Intercept internal tools to emit SSE events ───────
+                    if tool_name == "write_section" and "error" not in result:
+                        yield {
+                            "type": "report_section",
+                            "section_id": block.id,  # same as the tool_call's id / section_delta's section_id
+                            "title": tool_input.get("title", ""),
+                            "content": tool_input.get("content", ""),
+                            "citations": tool_input.get("citations", []),
+                        }
+
+                    elif tool_name == "mark_complete" and "error" not in result:
+                        yield self._complete(
+                            tool_input.get("report_title", ""),
+                            tool_input.get("executive_summary", ""),
+                            usage_totals,
+                        )
+                        return  # Research is done — exit the loop
 
-                # Emit the tool call event (so the UI shows what the agent is doing)
-                yield {"type": "tool_call", "tool": tool_name, "input": tool_input}
+                    elif tool_name in _RESULT_TOOLS and "error" not in result:
+                        timings.end_iteration()
+                        yield {"type": _RESULT_TOOLS[tool_name], **tool_input}
+                        return  # the agent's work is handed back to the caller
 
-                # Execute the tool (may be I/O heavy — run in thread pool)
-                try:
-                    if tool_name in ("web_search", "extract_page"):
-                        result = await loop.run_in_executor(
-                            None, lambda n=tool_name, i=tool_input: execute_tool(n, i)
-                        )
-                    else:
-                        result = execute_tool(tool_name, tool_input)
-                except Exception as exc:
-                    result = {"error": str(exc)}
-
-                # ── Intercept internal tools to emit SSE events ───────────
-                if tool_name == "write_section" and "error" not in result:
-                    yield {
-                        "type": "report_section",
-                        "title": tool_input.get("title", ""),
-                        "content": tool_input.get("content", ""),
-                        "citations": tool_input.get("citations", []),
-                    }
-
-                elif tool_name == "mark_complete" and "error" not in result:
-                    yield {
-                        "type": "complete",
-                        "report_title": tool_input.get("report_title", ""),
-                        "executive_summary": tool_input.get("executive_summary", ""),
-                    }
-                    return  # Research is done — exit the loop
-
-                # Emit a summary of the tool result (not the full content — too large)
-                summary = _summarize_result(tool_name, result)
-                yield {"type": "tool_result", "tool": tool_name, "result_summary": summary}
-
-                # Build the tool_result message
-                tool_results.append({
-                    "type": "tool_result",
-                    "tool_use_id": block.id,
-                    "content": json.dumps(result),
-                })
+                    elif tool_name == "web_search" and "error" not in result:
+                        self._prefetch.after_search(tool_input.get("query", ""), result.get("results", []))
+
+                    # Emit a summary of the tool result (not the full content — too large)
+                    summary = _summarize_result(tool_name, result)
+                    yield {"type": "tool_result", "tool": tool_name, "result_summary": summary}
+
+                    # Build the tool_result message
+                    context.note_tool_result(block.id, tool_name, result)
+                    tool_results.append({
+                        "type": "tool_result",
+                        "tool_use_id": block.id,
+                        "content": json.dumps(result),
+                    })
 
             # Append all tool results as a single user turn
             messages.append({"role": "user", "content": tool_results})
+            timings.end_iteration()
 
             # Check stop reason
             if response.stop_reason == "end_turn":
-                yield {"type": "complete", "report_title": "Research Complete", "executive_summary": ""}
+                yield self._complete("Research Complete", "", usage_totals)
+                return
+
+    def _complete(self, title: str, summary: str, usage_totals: dict[str, int]) -> dict[str, Any]:
+        """The `complete` event, with the job's timing summary if enabled."""
+        self._timings.end_iteration()
+        event = {"type": "complete", "report_title": title, "executive_summary": summary}
+        if TIMING_SUMMARY:
+            event["timings"] = self._timings.summary(usage_totals)
+        return event
+
+    async def _call_claude(
+        self, params: dict[str, Any], estimate: int, upstream, section_deltas: bool = True
+    ) -> AsyncGenerator[Any, None]:
+        """
+        One Claude call through the shared upstream scheduler: waits for rate-limit
+        quota (in priority order) and retries transient failures with backoff.
+        Yields scheduler / streaming events, then the final Message last.
+        """
+        scheduler = get_scheduler()
+        attempt = 0
+        while True:
+            await scheduler.acquire("anthropic", estimate)
+            for event in upstream.drain():
+                yield event
+
+            streamed = False
+            started = time.perf_counter()
+            try:
+                if self._stream:
+                    async with contextlib.aclosing(self._stream_claude(params, section_deltas)) as items:
+                        async for item in items:
+                            if not streamed and isinstance(item, dict):
+                                streamed = True
+                                first_delta = time.perf_counter() - started
+                                CLAUDE_FIRST_DELTA_SECONDS.observe(first_delta)
+                                self._timings.first_delta_seconds.append(first_delta)
+                            if not isinstance(item, dict):
+                                self._record_claude_call(started)
+                            yield item
+                else:
+                    response = await self._client.messages.create(**params)
+                    self._record_claude_call(started)
+                    yield response
                 return
+            except Exception as exc:
+                # A response that was already partly streamed can't be retried invisibly
+                if streamed or not await scheduler.backoff("anthropic", exc, attempt):
+                    raise
+                for event in upstream.drain():
+                    yield event
+                attempt += 1
+
+    def _record_claude_call(self, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        CLAUDE_CALL_SECONDS.observe(elapsed, mode="stream" if self._stream else "create")
+        self._timings.claude_calls += 1
+        self._timings.claude_seconds += elapsed
+
+    async def _stream_claude(self, params: dict[str, Any], section_deltas: bool = True) -> AsyncGenerator[Any, None]:
+        """
+        Call Claude through the streaming Messages API.
+        Yields thinking_delta / section_delta events while the response is being
+        generated, then the final assembled Message (same shape as messages.create).
+        """
+        sections: dict[int, tuple[str, PartialStringField, PartialStringField]] = {}
+
+        async with self._client.messages.stream(**params) as stream:
+            async for event in stream:
+                if event.type == "content_block_start":
+                    block = event.content_block
+                    if section_deltas and block.type == "tool_use" and block.name == "write_section":
+                        sections[event.index] = (
+                            block.id, PartialStringField("title"), PartialStringField("content"),
+                        )
 
-        # Exceeded MAX_ITERATIONS
-        yield {"type": "error", "message": "Research exceeded maximum iteration limit. Partial results may be available."}
+                elif event.type == "content_block_delta":
+                    delta = event.delta
+                    if delta.type == "text_delta" and delta.text:
+                        yield {"type": "thinking_delta", "delta": delta.text}
+
+                    elif delta.type == "input_json_delta" and event.index in sections:
+                        section_id, title, content = sections[event.index]
+                        title.feed(delta.partial_json)
+                        text = content.feed(delta.partial_json)
+                        if text:
+                            yield {
+                                "type": "section_delta",
+                                "section_id": section_id,
+                                "title": title.value,
+                                "delta": text,
+                            }
+
+            yield await stream.get_final_message()
+
+    async def _execute_batch(self, batch: list) -> list[Any]:
+        """Execute a batch of tool_use blocks, returning results in block order."""
+        if len(batch) == 1:
+            return [await self._execute_one(batch[0].name, batch[0].input)]
+        return await asyncio.gather(*(self._execute_one(b.name, b.input) for b in batch))
+
+    async def _execute_one(self, tool_name: str, tool_input: dict[str, Any]) -> Any:
+        """Execute a single tool call. Errors are returned as {"error": ...}, never raised."""
+        try:
+            if tool_name in CONCURRENT_TOOLS:
+                # I/O heavy — bounded by the per-turn concurrency limit
+                async with self._tool_semaphore:
+                    return await self._timed_tool(tool_name, tool_input)
+            return await self._timed_tool(tool_name, tool_input)
+        except Exception as exc:
+            return {"error": describe_error(exc)}
+
+    async def _timed_tool(self, tool_name: str, tool_input: dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            if tool_name == "extract_page":
+                prefetched = self._prefetch.claim(tool_input.get("url", ""))
+                if prefetched is not None:
+                    try:
+                        page = await asyncio.shield(prefetched)
+                        return page_view(page, self._notes, tool_input.get("focus", ""))
+                    except Exception:
+                        pass  # the prefetch failed — fetch it the normal way
+            return await execute_tool(tool_name, tool_input, self._notes)
+        finally:
+            self._timings.tool_call(tool_name, time.perf_counter() - started)
+
+
+def _request_params(context: ContextManager, messages: list[dict], route: Route) -> dict[str, Any]:
+    """Messages API parameters shared by the streaming and non-streaming paths."""
+    return {
+        "model": route.model,
+        "max_tokens": route.max_tokens,
+        **context.request_params(messages),
+    }
+
+
+def _batch_tool_calls(blocks: list) -> list[list]:
+    """
+    Group tool_use blocks into execution batches, preserving order.
+    Contiguous runs of CONCURRENT_TOOLS form one batch; every other tool
+    is a batch of its own so it runs strictly after everything before it.
+    """
+    batches: list[list] = []
+    for block in blocks:
+        if (
+            block.name in CONCURRENT_TOOLS
+            and batches
+            and batches[-1][0].name in CONCURRENT_TOOLS
+        ):
+            batches[-1].append(block)
+        else:
+            batches.append([block])
+    return batches
 
 
 def _summarize_result(tool_name: str, result: Any) -> str:
@@ -167,10 +533,17 @@ def _summarize_result(tool_name: str, result: Any) -> str:
         return f"Found {count} results. Top: {', '.join(titles)}"
 
     if tool_name == "extract_page":
-        content_len = len(result.get("content", ""))
+        content_len = result.get("chars", len(result.get("content", "")))
         title = result.get("title", "Untitled")[:60]
         return f"Extracted {content_len} characters from: {title}"
 
+    if tool_name == "search_notes":
+        results = result.get("results", [])
+        if not results:
+            return "No matching passages."
+        sources = len({r["url"] for r in results})
+        return f"Found {len(results)} passages from {sources} source{'s' if sources != 1 else ''}."
+
     if tool_name == "write_section":
         return f"Section written: {result.get('title', '')}"
 
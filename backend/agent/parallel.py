@@ -0,0 +1,236 @@
+"""
+ParallelOrchestrator — map-reduce research mode.
+
+The serial agent researches its 3-5 angles one after another in a single
+growing context. In parallel mode (NEXUS_RESEARCH_MODE=parallel, or
+"mode": "parallel" on the request):
+
+  1. plan    — a planner call splits the question into sub-questions (submit_plan)
+  2. map     — one sub-agent per sub-question, at most PARALLEL_AGENTS at a
+               time, each a ResearchOrchestrator with its own short context
+               that ends with submit_findings
+  3. reduce  — a writer agent turns the findings into report_section events
+               and mark_complete
+
+All agents share the job's passage index, so the writer can search_notes
+across every page the sub-agents read. Events keep their usual types and are
+tagged with the agent that produced them: "agent": "planner" | "sub-<n>" |
+"writer". Sub-agent failures do not end the job — the writer works with the
+findings that did come back. All agents draw on one job budget
+(agent/budget.py); sub-agents start on the small model (agent/routing.py).
+"""
+import asyncio
+import os
+import time
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+from typing import Any
+
+from .budget import JOB_TIME_BUDGET_SECONDS, JOB_TOKEN_BUDGET, JobBudget
+from .notes import PASSAGE_INDEX, PassageIndex
+from .orchestrator import (
+    STREAM_RESPONSES,
+    TOOL_CONCURRENCY,
+    AgentProfile,
+    ResearchOrchestrator,
+)
+from .prompts import PLANNER_PROMPT, SUBAGENT_PROMPT, WRITER_PROMPT
+from .tools import tool_schemas
+
+PARALLEL_AGENTS = int(os.getenv("NEXUS_PARALLEL_AGENTS", "5"))  # sub-agents running at once
+MAX_SUB_QUESTIONS = 6
+SUBAGENT_MAX_ITERATIONS = int(os.getenv("NEXUS_SUBAGENT_MAX_ITERATIONS", "8"))
+
+PLANNER = AgentProfile(PLANNER_PROMPT, tool_schemas("submit_plan"), max_iterations=2)
+SUBAGENT = AgentProfile(
+    SUBAGENT_PROMPT,
+    tool_schemas("web_search", "extract_page", "search_notes", "submit_findings"),
+    max_iterations=SUBAGENT_MAX_ITERATIONS,
+    first_step="research",  # the brief is the plan; its first turn is a search
+)
+WRITER = AgentProfile(
+    WRITER_PROMPT, tool_schemas("search_notes", "write_section", "mark_complete"), first_step="write"
+)
+
+_USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+
+def planner_brief(query: str) -> str:
+    return f"Research question: {query}"
+
+
+def subagent_brief(query: str, sub_question: dict[str, str]) -> str:
+    return (
+        f"Overall research question: {query}\n\n"
+        f"Your angle: {sub_question['title']}\n"
+        f"Your sub-question: {sub_question['question']}"
+    )
+
+
+def writer_brief(query: str, plan: list[dict[str, str]], findings: list[dict[str, Any] | None]) -> str:
+    """The writer's input: every angle's findings and sources, in plan order."""
+    parts = [f"Research question: {query}\n"]
+    for n, (sub_question, result) in enumerate(zip(plan, findings), start=1):
+        parts.append(f"## Angle {n}: {sub_question['title']}\nSub-question: {sub_question['question']}\n")
+        if result is None:
+            parts.append("(No findings — this agent failed. Cover the angle only as far as other findings allow.)\n")
+            continue
+        parts.append(result.get("findings", "").strip() + "\n")
+        sources = result.get("sources") or []
+        if sources:
+            parts.append("Sources:\n" + "\n".join(f"- {s.get('title', '')}: {s.get('url', '')}" for s in sources) + "\n")
+    return "\n".join(parts)
+
+
+class ParallelOrchestrator:
+    def __init__(
+        self,
+        tool_concurrency: int = TOOL_CONCURRENCY,
+        stream: bool = STREAM_RESPONSES,
+        priority: str = "interactive",
+        max_agents: int = PARALLEL_AGENTS,
+        token_budget: int = JOB_TOKEN_BUDGET,
+        time_budget: float = JOB_TIME_BUDGET_SECONDS,
+    ):
+        self._tool_concurrency = tool_concurrency
+        self._stream = stream
+        self._priority = priority
+        self._max_agents = max(1, max_agents)
+        self._usage_totals = dict.fromkeys(_USAGE_FIELDS, 0)
+        self._limits = (token_budget, time_budget)
+        self._budget = JobBudget(*self._limits)
+
+    def _agent(self, profile: AgentProfile, notes: PassageIndex | None) -> ResearchOrchestrator:
+        return ResearchOrchestrator(
+            tool_concurrency=self._tool_concurrency,
+            stream=self._stream,
+            priority=self._priority,
+            profile=profile,
+            notes=notes,
+            budget=self._budget,
+        )
+
+    async def run(self, query: str) -> AsyncGenerator[dict[str, Any], None]:
+        """Plan, research the sub-questions concurrently, then write. Yields SSE event dicts."""
+        started = time.perf_counter()
+        notes = PassageIndex(query) if PASSAGE_INDEX else None
+        self._budget = JobBudget(*self._limits)
+
+        # ── 1. Plan ───────────────────────────────────────────────────────
+        plan: list[dict[str, str]] = []
+        async with aclosing(self._agent(PLANNER, notes).run(planner_brief(query))) as events:
+            async for event in events:
+                if event["type"] == "plan":
+                    plan = _clean_plan(event.get("sub_questions"))
+                elif event["type"] == "error":
+                    yield self._tag(event, "planner")
+                    return
+                elif event["type"] != "complete":
+                    yield self._tag(event, "planner")
+        if not plan:  # no usable plan — research the question as a single angle
+            plan = [{"title": "Research", "question": query}]
+        yield {
+            "type": "agent_thinking",
+            "agent": "planner",
+            "content": "Researching in parallel:\n" + "\n".join(
+                f"{n}. {sq['title']} — {sq['question']}" for n, sq in enumerate(plan, start=1)
+            ),
+        }
+        planned = time.perf_counter()
+
+        # ── 2. Map: sub-agents, concurrently ──────────────────────────────
+        findings: list[dict[str, Any] | None] = [None] * len(plan)
+        async with aclosing(self._research(query, plan, notes, findings)) as events:
+            async for event in events:  # closing it cancels the sub-agents
+                yield event
+        if not any(findings):
+            yield {"type": "error", "message": "All research agents failed. No findings to write up."}
+            return
+        researched = time.perf_counter()
+
+        # ── 3. Reduce: the writer ─────────────────────────────────────────
+        async with aclosing(self._agent(WRITER, notes).run(writer_brief(query, plan, findings))) as events:
+            async for event in events:
+                if event["type"] == "complete" and "timings" in event:
+                    event["timings"] = {
+                        "total_ms": int((time.perf_counter() - started) * 1000),
+                        "plan_ms": int((planned - started) * 1000),
+                        "research_ms": int((researched - planned) * 1000),
+                        "agents": len(plan),
+                        "tokens": dict(self._usage_totals),
+                        "writer": event["timings"],
+                    }
+                yield self._tag(event, "writer")
+
+    async def _research(
+        self,
+        query: str,
+        plan: list[dict[str, str]],
+        notes: PassageIndex | None,
+        findings: list[dict[str, Any] | None],
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """Run one sub-agent per sub-question (bounded), merging their events as they come."""
+        queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+        slots = asyncio.Semaphore(self._max_agents)
+
+        async def sub_agent(n: int, sub_question: dict[str, str]) -> None:
+            agent = f"sub-{n + 1}"
+            narration = ""
+            try:
+                events = self._agent(SUBAGENT, notes).run(subagent_brief(query, sub_question))
+                async with slots, aclosing(events):
+                    async for event in events:
+                        if event["type"] == "findings":
+                            findings[n] = event
+                        elif event["type"] == "error":
+                            await queue.put(self._tag(_failure_note(sub_question, event["message"]), agent))
+                        elif event["type"] == "complete":
+                            # Finished without submit_findings: its last narration is the best we have
+                            if narration:
+                                findings[n] = {"findings": narration, "sources": []}
+                        else:
+                            if event["type"] == "agent_thinking":
+                                narration = event.get("content", "")
+                            await queue.put(self._tag(event, agent))
+            except Exception as exc:
+                await queue.put(self._tag(_failure_note(sub_question, str(exc)), agent))
+            finally:
+                await queue.put(None)
+
+        tasks = [asyncio.create_task(sub_agent(n, sq)) for n, sq in enumerate(plan)]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event = await queue.get()
+                if event is None:
+                    remaining -= 1
+                else:
+                    yield event
+        finally:
+            for task in tasks:  # the job was cancelled (or a sub-agent outlived the loop)
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _tag(self, event: dict[str, Any], agent: str) -> dict[str, Any]:
+        """Attribute an event to its agent; usage events get job-wide running totals."""
+        if event["type"] == "usage":
+            for f in _USAGE_FIELDS:
+                self._usage_totals[f] += event.get(f, 0)
+            event = {**event, "job_totals": dict(self._usage_totals)}
+        return {**event, "agent": agent}
+
+
+def _clean_plan(sub_questions: Any) -> list[dict[str, str]]:
+    plan = []
+    for item in sub_questions if isinstance(sub_questions, list) else []:
+        if isinstance(item, dict) and str(item.get("question", "")).strip():
+            question = str(item["question"]).strip()
+            plan.append({"title": str(item.get("title") or question[:60]).strip(), "question": question})
+    return plan[:MAX_SUB_QUESTIONS]
+
+
+def _failure_note(sub_question: dict[str, str], message: str) -> dict[str, Any]:
+    return {
+        "type": "agent_thinking",
+        "content": f"Research on \"{sub_question['title']}\" failed: {message}. Continuing with the other angles.",
+    }
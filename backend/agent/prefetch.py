@@ -0,0 +1,166 @@
+"""
+Prefetcher — speculative extract_page calls for the URLs a search just returned.
+
+The agent nearly always extracts a few of the pages `web_search` found, but
+only after another Claude round-trip. When enabled (NEXUS_PREFETCH_TOP_K > 0),
+each search result starts background extraction of its top-K URLs, ranked by
+how well the title/snippet matches the query plus a domain-quality heuristic.
+A later extract_page for one of them awaits the prefetch instead of starting
+from scratch — usually it has already finished.
+
+One Prefetcher per job:
+  - at most PREFETCH_BUDGET prefetches per job
+  - prefetches run at batch priority, so they never delay the job's own calls
+  - prefetches still running PREFETCH_MAX_AGE iterations after their search,
+    and all unused ones at the end of the job, are cancelled and counted as waste
+
+Results also land in the shared tool cache, so finished prefetches stay
+useful to later jobs. Process-wide hit / waste counters: prefetch_stats().
+"""
+import asyncio
+import os
+import re
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+from .cache import normalize_url
+from .scheduler import bind_job
+from .tools import extract_page
+
+PREFETCH_TOP_K = int(os.getenv("NEXUS_PREFETCH_TOP_K", "0"))  # 0 = off
+PREFETCH_BUDGET = int(os.getenv("NEXUS_PREFETCH_BUDGET", "8"))  # per job
+PREFETCH_MAX_AGE = 2  # iterations
+
+# Domain-quality heuristic: reference / primary sources up, social and video down
+_GOOD_SUFFIXES = (".gov", ".edu", ".int", ".ac.uk", ".gov.uk")
+_GOOD_HOSTS = frozenset({
+    "wikipedia.org", "nature.com", "science.org", "nih.gov", "arxiv.org", "who.int",
+    "reuters.com", "apnews.com", "britannica.com", "sciencedirect.com", "acm.org", "ieee.org",
+})
+_POOR_HOSTS = frozenset({
+    "pinterest.com", "facebook.com", "instagram.com", "tiktok.com", "twitter.com", "x.com",
+    "youtube.com", "quora.com", "linkedin.com",
+})
+_WORD = re.compile(r"[a-z0-9]+")
+
+_stats = {"started": 0, "hits": 0, "wasted": 0, "cancelled": 0, "skipped_budget": 0}
+
+
+def prefetch_stats() -> dict[str, Any]:
+    started = _stats["started"]
+    return {
+        **_stats,
+        "hit_rate": round(_stats["hits"] / started, 3) if started else 0.0,
+        "waste_rate": round(_stats["wasted"] / started, 3) if started else 0.0,
+    }
+
+
+def _terms(text: str) -> set[str]:
+    return {w for w in _WORD.findall(text.lower()) if len(w) > 2}
+
+
+def _domain_score(url: str) -> float:
+    host = (urlsplit(url).hostname or "").removeprefix("www.")
+    if any(host == h or host.endswith("." + h) for h in _POOR_HOSTS):
+        return -1.0
+    if host.endswith(_GOOD_SUFFIXES) or any(host == h or host.endswith("." + h) for h in _GOOD_HOSTS):
+        return 0.3
+    return 0.0
+
+
+def rank_results(query: str, results: list[dict[str, Any]]) -> list[str]:
+    """URLs of search results, most likely to be extracted first."""
+    query_terms = _terms(query) or {""}
+    scored = []
+    for position, r in enumerate(results):
+        url = r.get("url", "")
+        if not url:
+            continue
+        overlap = len(query_terms & _terms(f"{r.get('title', '')} {r.get('snippet', '')}")) / len(query_terms)
+        score = overlap + _domain_score(url) + 0.2 / (1 + position)  # keep some of the engine's order
+        scored.append((score, position, url))
+    return [url for score, _, url in sorted(scored, key=lambda s: (-s[0], s[1])) if score > 0]
+
+
+@dataclass
+class _Prefetch:
+    task: asyncio.Task
+    iteration: int
+    used: bool = False
+
+
+class Prefetcher:
+    def __init__(self, top_k: int = PREFETCH_TOP_K, budget: int = PREFETCH_BUDGET):
+        self._top_k = top_k
+        self._budget = budget
+        self._prefetches: dict[str, _Prefetch] = {}
+        self._iteration = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._top_k > 0 and self._budget > 0
+
+    def after_search(self, query: str, results: list[dict[str, Any]]) -> None:
+        """Start prefetching the top-K not-yet-prefetched URLs of a search result."""
+        if not self.enabled:
+            return
+        started = 0
+        for url in rank_results(query, results):
+            if started >= self._top_k:
+                break
+            key = normalize_url(url)
+            if key in self._prefetches:
+                continue
+            if len(self._prefetches) >= self._budget:
+                _stats["skipped_budget"] += 1
+                break
+            task = asyncio.create_task(_prefetch(url))
+            task.add_done_callback(_consume_error)
+            self._prefetches[key] = _Prefetch(task, self._iteration)
+            _stats["started"] += 1
+            started += 1
+
+    def claim(self, url: str) -> asyncio.Task | None:
+        """The prefetch task for `url`, if one was started; marks it as used."""
+        prefetch = self._prefetches.get(normalize_url(url))
+        if prefetch is None or prefetch.task.cancelled():
+            return None
+        if prefetch.task.done() and prefetch.task.exception() is not None:
+            return None  # failed — let the agent's own call retry it
+        if not prefetch.used:
+            prefetch.used = True
+            _stats["hits"] += 1
+        return prefetch.task
+
+    def next_iteration(self) -> None:
+        """Cancel prefetches the agent has not asked for within PREFETCH_MAX_AGE iterations."""
+        self._iteration += 1
+        for prefetch in self._prefetches.values():
+            if not prefetch.used and self._iteration - prefetch.iteration > PREFETCH_MAX_AGE:
+                self._cancel(prefetch)
+
+    def close(self) -> None:
+        """End of job: cancel what is still running and count unused prefetches as waste."""
+        for prefetch in self._prefetches.values():
+            if not prefetch.used:
+                self._cancel(prefetch)
+                _stats["wasted"] += 1
+        self._prefetches.clear()
+
+    @staticmethod
+    def _cancel(prefetch: _Prefetch) -> None:
+        if not prefetch.task.done():
+            prefetch.task.cancel()
+            _stats["cancelled"] += 1
+
+
+def _consume_error(task: asyncio.Task) -> None:
+    # A failed prefetch is just a miss; don't let asyncio report it as unhandled
+    if not task.cancelled():
+        task.exception()
+
+
+async def _prefetch(url: str) -> dict[str, Any]:
+    bind_job("batch")  # this task's upstream calls queue behind the job's own
+    return await extract_page(url)
@@ -0,0 +1,304 @@
+"""
+Record / replay of upstream traffic — run the agent without live API accounts.
+
+NEXUS_UPSTREAM_MODE selects how clients.py talks to Anthropic and Tavily:
+
+  live    — real HTTP (default)
+  record  — real HTTP, and every successful response is saved to the cassette
+  replay  — no network: responses come from the cassette, after an injected
+            latency of NEXUS_REPLAY_<PROVIDER>_LATENCY_MS ± NEXUS_REPLAY_JITTER_MS
+            (NEXUS_REPLAY_SMALL_MODEL_LATENCY_MS for turns routed to the small
+            model, agent/routing.py)
+
+Both directions work at the httpx transport level, so the orchestrator and
+tools run their normal code paths (streaming, batching, caching, retries).
+Entries are keyed so that replays stay valid when timing differs from the
+recording:
+
+  anthropic  — the job's query and the turn number (length of `messages`)
+  /search    — the normalized search query
+  /extract   — each URL separately, so any batching of URLs can be replayed
+
+An Anthropic entry recorded (or written) as a Message JSON is served to
+streaming requests as a synthesized SSE stream, so one cassette drives both
+NEXUS_STREAM_RESPONSES modes. bench/synthetic.py builds cassettes without
+recording anything.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+from typing import Any
+
+import httpx
+
+from .cache import normalize_query, normalize_url
+from .routing import SMALL_MODEL
+
+log = logging.getLogger(__name__)
+
+UPSTREAM_MODE = os.getenv("NEXUS_UPSTREAM_MODE", "live")  # live | record | replay
+CASSETTE_PATH = os.getenv("NEXUS_UPSTREAM_CASSETTE", ".cache/upstream_cassette.json")
+REPLAY_LATENCY_MS = {
+    "anthropic": float(os.getenv("NEXUS_REPLAY_ANTHROPIC_LATENCY_MS", "800")),
+    "tavily": float(os.getenv("NEXUS_REPLAY_TAVILY_LATENCY_MS", "300")),
+}
+REPLAY_SMALL_MODEL_LATENCY_MS = float(
+    os.getenv("NEXUS_REPLAY_SMALL_MODEL_LATENCY_MS", str(REPLAY_LATENCY_MS["anthropic"]))
+)
+REPLAY_JITTER_MS = float(os.getenv("NEXUS_REPLAY_JITTER_MS", "100"))
+
+_STREAM_CHUNK_CHARS = 48  # synthesized text / input_json deltas
+
+
+class Cassette:
+    """Recorded upstream responses, stored as one JSON file."""
+
+    def __init__(self, data: dict[str, Any] | None = None):
+        data = data or {}
+        self.anthropic: dict[str, dict[str, Any]] = data.get("anthropic", {})
+        self.search: dict[str, dict[str, Any]] = data.get("search", {})
+        self.extract: dict[str, dict[str, Any]] = data.get("extract", {})
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": 1, "anthropic": self.anthropic, "search": self.search, "extract": self.extract},
+                f,
+            )
+        os.replace(tmp, path)
+        self.dirty = False
+
+
+def anthropic_key(body: dict[str, Any]) -> str:
+    """Cassette key of a Messages API request: the job's query + turn number."""
+    messages = body.get("messages") or []
+    query = ""
+    if messages:
+        content = messages[0].get("content", "")
+        if isinstance(content, list):  # a cache_control breakpoint turns it into blocks
+            content = next((b.get("text", "") for b in content if b.get("type") == "text"), "")
+        query = content
+    return f"{len(messages)}|{query.strip()}"
+
+
+# ── Transports ───────────────────────────────────────────────────────────────
+
+# The transports are written against the httpx API but not bound to the package:
+# newer Anthropic SDKs run on an httpx fork (httpx2) and reject httpx objects.
+# transport_class() mixes in the AsyncBaseTransport of the package in use.
+
+class RecordingTransport:
+    """Passes requests through to `inner` and records successful responses."""
+
+    def __init__(self, provider: str, cassette: Cassette, inner: Any, http: Any = httpx):
+        self._provider = provider
+        self._cassette = cassette
+        self._inner = inner
+        self._http = http
+
+    async def handle_async_request(self, request: Any) -> Any:
+        body = json.loads(await request.aread() or b"{}")
+        response = await self._inner.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        if response.status_code < 400:
+            self._record(request.url.path, body, response.headers.get("content-type", ""), content)
+        # aread() already decoded the body — drop the headers that describe the wire format
+        headers = [
+            (k, v) for k, v in response.headers.multi_items()
+            if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        ]
+        return self._http.Response(response.status_code, headers=headers, content=content)
+
+    def _record(self, path: str, body: dict[str, Any], content_type: str, content: bytes) -> None:
+        text = content.decode("utf-8")
+        if self._provider == "anthropic":
+            kind = "sse" if content_type.startswith("text/event-stream") else "json"
+            self._cassette.anthropic[anthropic_key(body)] = {"kind": kind, "body": text}
+        elif path.endswith("/search"):
+            self._cassette.search[normalize_query(body.get("query", ""))] = json.loads(text)
+        elif path.endswith("/extract"):
+            data = json.loads(text)
+            for item in data.get("results", []):
+                self._cassette.extract[normalize_url(item.get("url", ""))] = item
+            for item in data.get("failed_results", []):
+                self._cassette.extract[normalize_url(item.get("url", ""))] = {**item, "failed": True}
+        self._cassette.dirty = True
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class ReplayTransport:
+    """Serves requests from the cassette after the configured latency + jitter."""
+
+    def __init__(
+        self,
+        provider: str,
+        cassette: Cassette,
+        latency_ms: float | None = None,
+        jitter_ms: float = REPLAY_JITTER_MS,
+        http: Any = httpx,
+    ):
+        self._provider = provider
+        self._cassette = cassette
+        self._http = http
+        self._latency_ms = REPLAY_LATENCY_MS[provider] if latency_ms is None else latency_ms
+        self._jitter_ms = jitter_ms
+        self.misses = 0
+
+    async def handle_async_request(self, request: Any) -> Any:
+        body = json.loads(await request.aread() or b"{}")
+        latency_ms = self._latency_ms
+        if self._provider == "anthropic" and body.get("model") == SMALL_MODEL:
+            latency_ms = REPLAY_SMALL_MODEL_LATENCY_MS
+        delay_ms = latency_ms + random.uniform(-self._jitter_ms, self._jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+        if self._provider == "anthropic":
+            return self._replay_anthropic(body)
+        if request.url.path.endswith("/search"):
+            query = body.get("query", "")
+            entry = self._cassette.search.get(normalize_query(query))
+            if entry is None:
+                self.misses += 1
+                entry = {"query": query, "results": []}
+            return self._http.Response(200, json=entry)
+        if request.url.path.endswith("/extract"):
+            return self._http.Response(200, json=self._replay_extract(body.get("urls", [])))
+        return self._error(404, f"no replay handler for {request.url.path}")
+
+    def _replay_anthropic(self, body: dict[str, Any]) -> Any:
+        key = anthropic_key(body)
+        entry = self._cassette.anthropic.get(key)
+        if entry is None:
+            self.misses += 1
+            # 400 is not retried, so a cassette miss fails the job at once
+            return self._error(400, f"no cassette entry for request {key[:80]!r}")
+
+        if entry["kind"] == "sse":
+            if not body.get("stream"):
+                return self._error(400, "cassette entry was recorded from a streaming request")
+            return self._http.Response(
+                200, headers={"content-type": "text/event-stream"}, content=entry["body"].encode()
+            )
+        if body.get("stream"):
+            return self._http.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                content=message_to_sse(json.loads(entry["body"])).encode(),
+            )
+        return self._http.Response(200, headers={"content-type": "application/json"}, content=entry["body"].encode())
+
+    def _error(self, status: int, message: str) -> Any:
+        return self._http.Response(
+            status, json={"type": "error", "error": {"type": "replay_error", "message": message}}
+        )
+
+    def _replay_extract(self, urls: list[str]) -> dict[str, Any]:
+        results, failed = [], []
+        for url in urls:
+            item = self._cassette.extract.get(normalize_url(url))
+            if item is None:
+                self.misses += 1
+                failed.append({"url": url, "error": "not in cassette"})
+            elif item.get("failed"):
+                failed.append({"url": url, "error": item.get("error", "Extraction failed")})
+            else:
+                results.append({**item, "url": url})
+        return {"results": results, "failed_results": failed}
+
+
+def message_to_sse(message: dict[str, Any]) -> str:
+    """Render a Messages API response as the equivalent streaming event sequence."""
+    def event(name: str, data: dict[str, Any]) -> str:
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+    usage = message.get("usage", {})
+    frames = [event("message_start", {
+        "type": "message_start",
+        "message": {**message, "content": [], "stop_reason": None, "usage": {**usage, "output_tokens": 0}},
+    })]
+    for index, block in enumerate(message.get("content", [])):
+        if block["type"] == "tool_use":
+            start = {**block, "input": {}}
+            text, delta_type, field = json.dumps(block.get("input", {})), "input_json_delta", "partial_json"
+        else:
+            start = {**block, "text": ""}
+            text, delta_type, field = block.get("text", ""), "text_delta", "text"
+        frames.append(event("content_block_start", {"type": "content_block_start", "index": index, "content_block": start}))
+        for i in range(0, len(text), _STREAM_CHUNK_CHARS):
+            frames.append(event("content_block_delta", {
+                "type": "content_block_delta",
+                "index": index,
+                "delta": {"type": delta_type, field: text[i:i + _STREAM_CHUNK_CHARS]},
+            }))
+        frames.append(event("content_block_stop", {"type": "content_block_stop", "index": index}))
+    frames.append(event("message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": message.get("stop_reason"), "stop_sequence": None},
+        "usage": {"output_tokens": usage.get("output_tokens", 0)},
+    }))
+    frames.append(event("message_stop", {"type": "message_stop"}))
+    return "".join(frames)
+
+
+# ── Wiring (used by clients.py) ──────────────────────────────────────────────
+
+_cassette: Cassette | None = None
+
+
+def _get_cassette() -> Cassette:
+    global _cassette
+    if _cassette is None:
+        _cassette = Cassette.load(CASSETTE_PATH)
+        log.info(
+            "Upstream %s mode, cassette %s (%d Claude turns, %d searches, %d pages)",
+            UPSTREAM_MODE, CASSETTE_PATH,
+            len(_cassette.anthropic), len(_cassette.search), len(_cassette.extract),
+        )
+    return _cassette
+
+
+_transport_classes: dict[tuple[type, Any], type] = {}
+
+
+def transport_class(cls: type, http: Any = httpx) -> type:
+    """`cls` as a transport of the httpx-compatible package `http`."""
+    key = (cls, http)
+    if key not in _transport_classes:
+        _transport_classes[key] = type(cls.__name__, (cls, http.AsyncBaseTransport), {})
+    return _transport_classes[key]
+
+
+def upstream_transport(provider: str, limits: httpx.Limits, http: Any = httpx) -> Any | None:
+    """
+    Transport for `provider`'s client, or None to use the default live transport.
+    `http` is the httpx package the client is built on.
+    """
+    if UPSTREAM_MODE == "replay":
+        return transport_class(ReplayTransport, http)(provider, _get_cassette(), http=http)
+    if UPSTREAM_MODE == "record":
+        inner = http.AsyncHTTPTransport(limits=limits)
+        return transport_class(RecordingTransport, http)(provider, _get_cassette(), inner, http=http)
+    return None
+
+
+def save_cassette() -> None:
+    """Write newly recorded responses to disk (called on shutdown)."""
+    if _cassette is not None and _cassette.dirty:
+        _cassette.save(CASSETTE_PATH)
@@ -0,0 +1,90 @@
+"""
+ModelRouter — which model answers each turn of an agent loop, and with how
+many output tokens.
+
+Most turns of a research loop are decisions: read the search results, pick
+what to search or open next. They need a few hundred output tokens, not the
+best prose, so they go to the small model (NEXUS_SMALL_MODEL). Turns that
+write — report sections, findings, the plan — go to the large model
+(NEXUS_LARGE_MODEL) with room for a full section.
+
+The step is predicted before the call, from the loop's previous turn:
+
+  plan      the loop's first turn (AgentProfile.first_step)       large
+  research  the previous turn only called web_search /            small
+            extract_page
+  write     anything else — a section was written, notes were     large
+            searched, or the job's budget says wrap up
+
+A research prediction can be wrong: the small model may decide it is time to
+write. A research turn that calls any other tool, or a plan / research turn
+that runs out of output tokens, is escalated — the response is dropped
+without running its tools and the same turn is asked of the large model with
+the write step's max_tokens. The dropped call's tokens are spent, but a
+decision turn's are few.
+
+NEXUS_MODEL_ROUTING=0 makes every turn a write turn: the large model with the
+full max_tokens, as before routing.
+"""
+import os
+from dataclasses import dataclass
+from typing import Any
+
+SMALL_MODEL = os.getenv("NEXUS_SMALL_MODEL", "claude-haiku-4-5")
+LARGE_MODEL = os.getenv("NEXUS_LARGE_MODEL", "claude-sonnet-4-6")
+MODEL_ROUTING = os.getenv("NEXUS_MODEL_ROUTING", "1") != "0"
+
+STEP_MAX_TOKENS = {"plan": 4096, "research": 1024, "write": 8096}
+
+# A turn after one that only called these is predicted to be another research turn
+_RESEARCH_TOOLS = frozenset({"web_search", "extract_page"})
+# What a research turn may call without being escalated
+_RESEARCH_TURN_TOOLS = _RESEARCH_TOOLS | {"search_notes"}
+
+
+@dataclass(frozen=True)
+class Route:
+    step: str  # plan | research | write
+    model: str
+    max_tokens: int
+
+    def event(self, iteration: int, escalated: bool = False) -> dict[str, Any]:
+        return {
+            "type": "route",
+            "iteration": iteration,
+            "step": self.step,
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "escalated": escalated,
+        }
+
+
+def _route(step: str) -> Route:
+    return Route(step, SMALL_MODEL if step == "research" else LARGE_MODEL, STEP_MAX_TOKENS[step])
+
+
+class ModelRouter:
+    """The routing policy of one agent loop."""
+
+    def __init__(self, first_step: str = "plan", enabled: bool = MODEL_ROUTING):
+        self._enabled = enabled
+        self._next_step = first_step
+
+    def route(self, wrap_up: bool = False) -> Route:
+        """The route of the next turn. Wrapping up, every turn writes."""
+        return _route(self._next_step if self._enabled and not wrap_up else "write")
+
+    def observe(self, tool_names: list[str]) -> None:
+        """Record which tools the turn just taken called."""
+        research = bool(tool_names) and all(name in _RESEARCH_TOOLS for name in tool_names)
+        self._next_step = "research" if research else "write"
+
+    def escalation(self, route: Route, response: Any) -> Route | None:
+        """The route to ask the turn again with, if `response` is beyond its step; else None."""
+        if route.step == "write":
+            return None
+        truncated = response.stop_reason == "max_tokens"
+        off_step = route.step == "research" and any(
+            block.type == "tool_use" and block.name not in _RESEARCH_TURN_TOOLS for block in response.content
+        )
+        return _route("write") if truncated or off_step else None
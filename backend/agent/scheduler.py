@@ -0,0 +1,279 @@
+"""
+UpstreamScheduler — one shared gate in front of every Anthropic and Tavily call.
+
+  - Token buckets per provider: requests/min and (for Anthropic) input tokens/min.
+    Calls that would exceed the quota wait instead of failing upstream.
+  - Priority classes: waiting calls are granted in priority order, so
+    interactive jobs go ahead of batch jobs.
+  - Retries with full-jitter exponential backoff for rate limits, overload,
+    5xx and connection errors, honoring the server's retry-after header.
+
+Queue waits and retries are recorded on the calling job's UpstreamContext
+(a ContextVar bound by the orchestrator) so they can be surfaced as SSE events.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+import anthropic
+import httpx
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+ANTHROPIC_RPM = float(os.getenv("NEXUS_ANTHROPIC_RPM", "50"))
+ANTHROPIC_TPM = float(os.getenv("NEXUS_ANTHROPIC_TPM", "0"))  # input tokens/min, 0 = unlimited
+TAVILY_RPM = float(os.getenv("NEXUS_TAVILY_RPM", "100"))
+MAX_RETRIES = int(os.getenv("NEXUS_UPSTREAM_MAX_RETRIES", "5"))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 30.0
+REPORT_WAIT_SECONDS = 0.05  # shorter queue waits are not worth an SSE event
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+T = TypeVar("T")
+
+
+# ── Per-job context ──────────────────────────────────────────────────────────
+
+@dataclass
+class UpstreamContext:
+    priority: int = PRIORITIES["interactive"]
+    events: list[dict[str, Any]] = field(default_factory=list)
+
+    def drain(self) -> list[dict[str, Any]]:
+        """queue_wait / upstream_retry events recorded since the last drain."""
+        events, self.events = self.events, []
+        return events
+
+
+_current: ContextVar[UpstreamContext | None] = ContextVar("nexus_upstream", default=None)
+
+
+def bind_job(priority: str = "interactive") -> UpstreamContext:
+    """Bind a fresh UpstreamContext to the current task (one per research job)."""
+    ctx = UpstreamContext(priority=PRIORITIES.get(priority, PRIORITIES["interactive"]))
+    _current.set(ctx)
+    return ctx
+
+
+# ── Rate limiting ────────────────────────────────────────────────────────────
+
+class TokenBucket:
+    """Continuous-refill bucket holding up to one minute of quota."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self._rate = per_minute / 60
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self._tokens) / self._rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self._tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Correct an earlier estimate: positive delta takes more, negative refunds."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - delta)
+
+
+class _ProviderLimiter:
+    def __init__(self, name: str, rpm: float, tpm: float = 0):
+        self.name = name
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._waiters: list[tuple[int, int, float, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._dispatcher: asyncio.Task | None = None
+        self.stats = {"requests": 0, "queued": 0, "wait_ms_total": 0, "wait_ms_max": 0, "retries": 0, "failures": 0}
+
+    async def acquire(self, priority: int, tokens: float) -> float:
+        """Wait for quota (in priority order). Returns the seconds spent waiting."""
+        self.stats["requests"] += 1
+        if not self._waiters and self._wait_time(tokens) == 0:
+            self._take(tokens)
+            return 0.0
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), tokens, future))
+        self.stats["queued"] += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+        waited = time.monotonic() - started
+        wait_ms = int(waited * 1000)
+        self.stats["wait_ms_total"] += wait_ms
+        self.stats["wait_ms_max"] = max(self.stats["wait_ms_max"], wait_ms)
+        return waited
+
+    def adjust_tokens(self, delta: float) -> None:
+        if self._tokens is not None and delta:
+            self._tokens.adjust(delta)
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():  # caller was cancelled
+                heapq.heappop(self._waiters)
+                continue
+            delay = self._wait_time(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue  # re-check: a higher-priority waiter may have arrived
+            heapq.heappop(self._waiters)
+            self._take(tokens)
+            future.set_result(None)
+
+    def _wait_time(self, tokens: float) -> float:
+        wait = self._requests.wait_time(1) if self._requests else 0.0
+        if self._tokens is not None and tokens:
+            wait = max(wait, self._tokens.wait_time(tokens))
+        return wait
+
+    def _take(self, tokens: float) -> None:
+        if self._requests is not None:
+            self._requests.take(1)
+        if self._tokens is not None and tokens:
+            self._tokens.take(tokens)
+
+
+# ── Scheduler ────────────────────────────────────────────────────────────────
+
+class UpstreamScheduler:
+    def __init__(self):
+        self._limiters = {
+            "anthropic": _ProviderLimiter("anthropic", ANTHROPIC_RPM, ANTHROPIC_TPM),
+            "tavily": _ProviderLimiter("tavily", TAVILY_RPM),
+        }
+
+    async def acquire(self, provider: str, tokens: float = 0) -> None:
+        """Wait for quota for one call on behalf of the current job."""
+        ctx = _current.get() or UpstreamContext()
+        waited = await self._limiters[provider].acquire(ctx.priority, tokens)
+        if waited >= REPORT_WAIT_SECONDS:
+            ctx.events.append({"type": "queue_wait", "provider": provider, "wait_ms": int(waited * 1000)})
+
+    def adjust_tokens(self, provider: str, delta: float) -> None:
+        """Correct the token estimate passed to acquire() once actual usage is known."""
+        self._limiters[provider].adjust_tokens(delta)
+
+    async def backoff(self, provider: str, exc: Exception, attempt: int) -> bool:
+        """
+        After a failed call: sleep and return True if it should be retried,
+        return False if the error is permanent or retries are exhausted.
+        """
+        limiter = self._limiters[provider]
+        delay = retry_delay(exc, attempt)
+        if delay is None:
+            limiter.stats["failures"] += 1
+            return False
+        limiter.stats["retries"] += 1
+        ctx = _current.get()
+        if ctx is not None:
+            ctx.events.append({
+                "type": "upstream_retry",
+                "provider": provider,
+                "attempt": attempt + 1,
+                "delay_ms": int(delay * 1000),
+                "reason": describe_error(exc),
+            })
+        await asyncio.sleep(delay)
+        return True
+
+    async def call(
+        self, provider: str, fn: Callable[[], Awaitable[T]], tokens: float = 0
+    ) -> T:
+        """Run `fn()` under the provider's rate limit, retrying transient failures."""
+        attempt = 0
+        while True:
+            await self.acquire(provider, tokens)
+            try:
+                return await fn()
+            except Exception as exc:
+                if not await self.backoff(provider, exc, attempt):
+                    raise
+                attempt += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            name: {**limiter.stats, "waiting": len(limiter._waiters)}
+            for name, limiter in self._limiters.items()
+        }
+
+
+def retry_delay(exc: Exception, attempt: int) -> float | None:
+    """Backoff before retry number `attempt + 1`, or None if `exc` should not be retried."""
+    if attempt >= MAX_RETRIES:
+        return None
+    status = _status_code(exc)
+    transient = (
+        status in _RETRYABLE_STATUS
+        or isinstance(exc, (anthropic.APIConnectionError, httpx.TransportError))
+    )
+    if not transient:
+        return None
+    delay = random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+    return max(delay, _retry_after(exc) or 0.0)
+
+
+def describe_error(exc: Exception) -> str:
+    """Short, user-facing description of an upstream failure."""
+    status = _status_code(exc)
+    if status == 429:
+        return "rate limited (HTTP 429)"
+    if status == 529:
+        return "upstream overloaded (HTTP 529)"
+    if status is not None:
+        return f"HTTP {status}: {exc}"[:300]
+    if isinstance(exc, (anthropic.APIConnectionError, httpx.TransportError)):
+        return f"connection error ({type(exc).__name__})"
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _status_code(exc: Exception) -> int | None:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def _retry_after(exc: Exception) -> float | None:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return min(BACKOFF_CAP_SECONDS * 2, float(headers.get("retry-after", "")))
+    except ValueError:
+        return None
+
+
+_scheduler: UpstreamScheduler | None = None
+
+
+def get_scheduler() -> UpstreamScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = UpstreamScheduler()
+    return _scheduler
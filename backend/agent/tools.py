@@ -1,41 +1,98 @@
 """
-Agent tools — four functions the Claude agent can call, plus their JSON schemas.
+Agent tools — the seven tools the Claude agent can call, plus their JSON schemas.
 
-Tools:
+TOOL_SCHEMAS (the serial researcher):
   1. web_search      — search the live web via Tavily
-  2. extract_page    — fetch full cleaned text of a URL via Tavily
-  3. write_section   — internal: commit a report section (triggers SSE event)
-  4. mark_complete   — internal: signal research is done (closes the stream)
+  2. extract_page    — fetch full cleaned text of a URL via Tavily or the local
+                       fetcher (agent/fetch.py; indexed into the job's
+                       PassageIndex; Claude sees the opening + best passages)
+  3. search_notes    — retrieve the best-matching passages from pages already read
+  4. write_section   — internal: commit a report section (triggers SSE event)
+  5. mark_complete   — internal: signal research is done (closes the stream)
+
+PARALLEL_TOOL_SCHEMAS (parallel mode, agent/parallel.py):
+  6. submit_plan      — internal, planner: the sub-questions to research concurrently
+  7. submit_findings  — internal, sub-agent: its findings on one sub-question
+
+Parallel-mode profiles pick their tools from both lists with tool_schemas().
 """
 import os
+import time
 from typing import Any
 
-from tavily import TavilyClient
+from .batching import ExtractBatcher
+from .cache import (
+    EXTRACT_TTL_SECONDS,
+    SEARCH_TTL_SECONDS,
+    get_tool_cache,
+    normalize_query,
+    normalize_url,
+)
+from .clients import get_tavily_http
+from .fetch import extract as extract_item
+from .notes import PASSAGE_INDEX, PassageIndex
+from .scheduler import get_scheduler
+from utils.metrics import TOOL_CALL_SECONDS, TOOL_ERRORS
+
+# Page text kept per extract (cached in full; see agent/notes.py for what Claude sees)
+EXTRACT_MAX_CHARS = int(os.getenv("NEXUS_EXTRACT_MAX_CHARS", "100000"))
+LEGACY_EXTRACT_CHARS = 8000  # tool result cap with NEXUS_PASSAGE_INDEX=0
+
+
+async def _tavily_post(path: str, payload: dict[str, Any]) -> dict[str, Any]:
+    """
+    POST to the Tavily REST API over the shared connection pool, under the
+    upstream scheduler's rate limit and retry policy.
+    """
+    async def post() -> dict[str, Any]:
+        response = await get_tavily_http().post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    return await get_scheduler().call("tavily", post)
+
 
-_tavily: TavilyClient | None = None
+_batcher: ExtractBatcher | None = None
 
 
-def _get_tavily() -> TavilyClient:
-    global _tavily
-    if _tavily is None:
-        api_key = os.getenv("TAVILY_API_KEY")
-        if not api_key:
-            raise RuntimeError("TAVILY_API_KEY is not set in .env")
-        _tavily = TavilyClient(api_key=api_key)
-    return _tavily
+def _get_batcher() -> ExtractBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = ExtractBatcher(_tavily_post)
+    return _batcher
 
 
 # ── Tool implementations ────────────────────────────────────────────────────
 
-def web_search(query: str, max_results: int = 5) -> dict[str, Any]:
-    """Search the live web and return a list of results."""
-    client = _get_tavily()
-    response = client.search(
-        query=query,
-        max_results=min(max_results, 7),
-        search_depth="basic",
-        include_answer=False,
+async def web_search(query: str, max_results: int = 5) -> dict[str, Any]:
+    """Search the live web and return a list of results (cached, see agent/cache.py)."""
+    max_results = min(max_results, 7)
+    return await get_tool_cache().get_or_fetch(
+        "web_search",
+        {"query": normalize_query(query), "max_results": max_results},
+        SEARCH_TTL_SECONDS,
+        lambda: _search_upstream(query, max_results),
+    )
+
+
+async def extract_page(url: str) -> dict[str, Any]:
+    """Fetch and return the full cleaned text content of a web page (cached)."""
+    result = await get_tool_cache().get_or_fetch(
+        "extract_page",
+        {"url": normalize_url(url)},
+        EXTRACT_TTL_SECONDS,
+        lambda: _extract_upstream(url),
     )
+    return {**result, "url": url}
+
+
+async def _search_upstream(query: str, max_results: int) -> dict[str, Any]:
+    response = await _tavily_post("/search", {
+        "query": query,
+        "max_results": max_results,
+        "search_depth": "basic",
+        "include_answer": False,
+    })
     results = []
     for r in response.get("results", []):
         results.append({
@@ -47,15 +104,12 @@ def web_search(query: str, max_results: int = 5) -> dict[str, Any]:
     return {"results": results, "total": len(results)}
 
 
-def extract_page(url: str) -> dict[str, Any]:
-    """Fetch and return the full cleaned text content of a web page."""
-    client = _get_tavily()
-    response = client.extract(urls=[url])
-    items = response.get("results", [])
-    if not items:
-        return {"url": url, "title": "", "content": "", "error": "No content extracted"}
-    item = items[0]
-    content = item.get("raw_content", "")[:8000]  # cap to avoid context bloat
+async def _extract_upstream(url: str) -> dict[str, Any]:
+    # Tavily's are coalesced with other concurrent extracts into one multi-URL request
+    item = await extract_item(url, lambda u: _get_batcher().extract(u))
+    if "error" in item:
+        return {"url": url, "title": "", "content": "", "error": item["error"]}
+    content = item.get("raw_content", "")[:EXTRACT_MAX_CHARS]
     return {
         "url": url,
         "title": item.get("title", ""),
@@ -63,6 +117,14 @@ def extract_page(url: str) -> dict[str, Any]:
     }
 
 
+def search_notes(notes: PassageIndex | None, query: str, max_results: int = 5, url: str = "") -> dict[str, Any]:
+    """Top passages for `query` from the pages this job has extracted (BM25, agent/notes.py)."""
+    if notes is None:
+        return {"error": "search_notes is not available"}
+    results = notes.search(query, min(max_results, 10), url)
+    return {"results": results, "total_passages": notes.passage_count, "pages": notes.page_count}
+
+
 def write_section(title: str, content: str, citations: list[dict]) -> dict[str, Any]:
     """
     Internal tool: commit a completed section to the report.
@@ -80,8 +142,33 @@ def mark_complete(report_title: str, executive_summary: str) -> dict[str, Any]:
     return {"complete": True, "report_title": report_title}
 
 
+def submit_plan(sub_questions: list[dict]) -> dict[str, Any]:
+    """Internal tool (parallel mode): the planner's sub-questions. Intercepted by the orchestrator."""
+    return {"acknowledged": True, "sub_questions": len(sub_questions)}
+
+
+def submit_findings(findings: str, sources: list[dict]) -> dict[str, Any]:
+    """Internal tool (parallel mode): a sub-agent's findings. Intercepted by the orchestrator."""
+    return {"acknowledged": True}
+
+
 # ── JSON schemas for Claude's tools parameter ────────────────────────────────
 
+if PASSAGE_INDEX:
+    _EXTRACT_RETURNS = (
+        "The full page is indexed for search_notes; the result contains the "
+        "opening passage and the passages that best match `focus`."
+    )
+    _EXTRACT_FOCUS = {
+        "focus": {
+            "type": "string",
+            "description": "What you want from this page. Defaults to the research question.",
+        },
+    }
+else:
+    _EXTRACT_RETURNS = "Returns the full text (up to 8,000 characters)."
+    _EXTRACT_FOCUS = {}
+
 TOOL_SCHEMAS: list[dict] = [
     {
         "name": "web_search",
@@ -112,7 +199,7 @@ TOOL_SCHEMAS: list[dict] = [
             "Fetch the full cleaned text content of a specific web page. "
             "Use this after web_search when a result looks highly relevant — "
             "it gives you much more detail than the snippet. "
-            "Returns the full text (up to 8,000 characters)."
+            + _EXTRACT_RETURNS
         ),
         "input_schema": {
             "type": "object",
@@ -121,10 +208,39 @@ TOOL_SCHEMAS: list[dict] = [
                     "type": "string",
                     "description": "The full URL of the page to extract.",
                 },
+                **_EXTRACT_FOCUS,
             },
             "required": ["url"],
         },
     },
+    {
+        "name": "search_notes",
+        "description": (
+            "Search the full text of every page you have extracted so far. "
+            "Returns the best-matching passages with their source URL and title. "
+            "Use this before writing a section to pull the specific facts and figures you need, "
+            "or to find material further into a long page."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "What to look for, in a few specific words.",
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Number of passages to return (1-10). Default is 5.",
+                    "default": 5,
+                },
+                "url": {
+                    "type": "string",
+                    "description": "Only search this extracted page.",
+                },
+            },
+            "required": ["query"],
+        },
+    },
     {
         "name": "write_section",
         "description": (
@@ -185,18 +301,122 @@ TOOL_SCHEMAS: list[dict] = [
     },
 ]
 
+if not PASSAGE_INDEX:
+    TOOL_SCHEMAS = [schema for schema in TOOL_SCHEMAS if schema["name"] != "search_notes"]
+
+PARALLEL_TOOL_SCHEMAS: list[dict] = [
+    {
+        "name": "submit_plan",
+        "description": (
+            "Submit the research plan: the distinct sub-questions that, answered together, "
+            "cover the user's question. Each one is researched by a separate agent in parallel."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "sub_questions": {
+                    "type": "array",
+                    "description": "3-5 non-overlapping sub-questions.",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "title": {
+                                "type": "string",
+                                "description": "Short name of the angle (e.g. 'Background', 'Key Challenges').",
+                            },
+                            "question": {
+                                "type": "string",
+                                "description": "The specific question to research.",
+                            },
+                        },
+                        "required": ["title", "question"],
+                    },
+                },
+            },
+            "required": ["sub_questions"],
+        },
+    },
+    {
+        "name": "submit_findings",
+        "description": (
+            "Submit your findings on the sub-question and finish. Call this once you have "
+            "read enough sources. Include specific facts, figures, names and dates."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "findings": {
+                    "type": "string",
+                    "description": "Your findings in markdown: dense, specific, with the source of each claim.",
+                },
+                "sources": {
+                    "type": "array",
+                    "description": "Sources the findings are based on.",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "url":   {"type": "string"},
+                            "title": {"type": "string"},
+                        },
+                        "required": ["url", "title"],
+                    },
+                },
+            },
+            "required": ["findings", "sources"],
+        },
+    },
+]
+
+
+def tool_schemas(*names: str) -> list[dict]:
+    """The schemas of the named tools (from either list), in the order given."""
+    by_name = {schema["name"]: schema for schema in TOOL_SCHEMAS + PARALLEL_TOOL_SCHEMAS}
+    return [by_name[name] for name in names if name in by_name]
+
 
 # ── Tool dispatcher ─────────────────────────────────────────────────────────
 
-def execute_tool(name: str, inputs: dict[str, Any]) -> Any:
-    """Dispatch a tool call by name and return its result."""
+async def execute_tool(name: str, inputs: dict[str, Any], notes: PassageIndex | None = None) -> Any:
+    """
+    Dispatch a tool call by name and return its result (timed in /metrics).
+    `notes` is the job's passage index, used by extract_page and search_notes.
+    """
+    started = time.perf_counter()
+    failed = True
+    try:
+        result = await _dispatch(name, inputs, notes)
+        failed = isinstance(result, dict) and "error" in result
+        return result
+    finally:
+        TOOL_CALL_SECONDS.observe(time.perf_counter() - started, tool=name)
+        if failed:
+            TOOL_ERRORS.inc(tool=name)
+
+
+async def _dispatch(name: str, inputs: dict[str, Any], notes: PassageIndex | None) -> Any:
     if name == "web_search":
-        return web_search(**inputs)
+        return await web_search(**inputs)
     elif name == "extract_page":
-        return extract_page(**inputs)
+        page = await extract_page(inputs["url"])
+        return page_view(page, notes, inputs.get("focus", ""))
+    elif name == "search_notes":
+        return search_notes(notes, **inputs)
     elif name == "write_section":
         return write_section(**inputs)
     elif name == "mark_complete":
         return mark_complete(**inputs)
+    elif name == "submit_plan":
+        return submit_plan(**inputs)
+    elif name == "submit_findings":
+        return submit_findings(**inputs)
     else:
         return {"error": f"Unknown tool: {name}"}
+
+
+def page_view(page: dict[str, Any], notes: PassageIndex | None, focus: str = "") -> dict[str, Any]:
+    """What Claude sees of an extracted page: indexed passages, or the truncated text."""
+    if notes is not None:
+        return notes.add_page(page, focus)
+    if "error" in page:
+        return page
+    return {**page, "content": page.get("content", "")[:LEGACY_EXTRACT_CHARS]}
@@ -0,0 +1,199 @@
+"""
+Extraction benchmark: the extract_page backends (agent/fetch.py) against a
+local page server, with Tavily's /extract replayed from a cassette.
+
+    cd backend
+    python -m bench.extract                               # tavily, local and hedged
+    python -m bench.extract --slow-share 0.1 --slow-ms 8000
+    python -m bench.extract --backends local --pages 500 --concurrency 32
+
+The pages are spread over --hosts loopback addresses (127.0.0.1, .2, ...),
+one server each, so the fetcher's per-host limits apply as on the web. A
+page server answers /page/<n> (HTTP/1.1 keep-alive) after --page-latency-ms
+± --jitter-ms. A --slow-share of the pages take --slow-ms instead, and a
+--js-share are JavaScript shells with almost no text. The Tavily extract of
+every page — shells included, since Tavily renders them — is replayed after
+--tavily-latency-ms ± --jitter-ms.
+
+Each backend extracts the same pages, --concurrency at a time, and reports
+p50 / p95 / p99 latency and errors; hedged also reports how often it hedged
+and which side won.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_SHELL = '<html><head><title>App</title></head><body><div id="root"></div><script src="/app.js"></script></body></html>'
+
+
+def build_pages(args: argparse.Namespace, prose) -> list[dict]:
+    """Per page: its HTML, latency and kind, drawn from a fixed seed."""
+    rng = random.Random(7)
+    pages = []
+    for n in range(args.pages):
+        draw = rng.random()
+        if draw < args.js_share:
+            kind, body, latency = "js", _SHELL, args.page_latency_ms
+        else:
+            kind = "slow" if draw < args.js_share + args.slow_share else "ok"
+            latency = args.slow_ms if kind == "slow" else args.page_latency_ms
+            paragraphs = "".join(f"<p>{prose(rng, 700)}</p>" for _ in range(10))
+            body = (
+                f"<html><head><title>Page {n}</title><style>p {{ margin: 0 }}</style></head><body>"
+                f"<nav><a href='/'>Home</a> <a href='/about'>About</a></nav><main><h1>Page {n}</h1>"
+                f"{paragraphs}</main><script>track({n})</script><footer>© Example</footer></body></html>"
+            )
+        latency = max(0.0, latency + rng.uniform(-args.jitter_ms, args.jitter_ms))
+        pages.append({"kind": kind, "html": body.encode(), "latency_s": latency / 1000})
+    return pages
+
+
+def start_page_server(pages: list[dict], host: str) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so the fetcher's pool is exercised
+
+        def do_GET(self):
+            try:
+                page = pages[int(self.path.rsplit("/", 1)[-1])]
+            except (ValueError, IndexError):
+                self.send_error(404)
+                return
+            time.sleep(page["latency_s"])
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page["html"])))
+            self.end_headers()
+            try:
+                self.wfile.write(page["html"])
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the fetcher gave up on the page (deadline, or the hedge won)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_backend(backend: str, urls: list[str], concurrency: int) -> dict:
+    from agent import fetch, tools
+    from bench.run import percentiles
+
+    gate = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(url: str) -> None:
+        nonlocal errors
+        async with gate:
+            started = time.perf_counter()
+            try:
+                item = await fetch.extract(url, lambda u: tools._get_batcher().extract(u), backend)
+                errors += "error" in item
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(url) for url in urls))
+    result = {
+        "backend": backend,
+        "pages": len(urls),
+        "errors": errors,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        "latency_ms": {k: round(v, 1) for k, v in percentiles(latencies).items()},
+    }
+    if backend == "hedged":
+        stats = fetch.extract_stats()["hedged"]
+        result.update({k: stats[k] for k in ("hedges", "local_wins", "tavily_wins")})
+    return result
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    workdir = tempfile.mkdtemp(prefix="nexus-extract-")
+    cassette_path = os.path.join(workdir, "cassette.json")
+    # Before the agent modules are imported: they read their settings at import
+    os.environ.update({
+        "NEXUS_UPSTREAM_MODE": "replay",
+        "NEXUS_UPSTREAM_CASSETTE": cassette_path,
+        "NEXUS_REPLAY_TAVILY_LATENCY_MS": str(args.tavily_latency_ms),
+        "NEXUS_REPLAY_JITTER_MS": str(args.jitter_ms),
+        "NEXUS_TAVILY_RPM": "0",
+        "NEXUS_CACHE_PATH": "",
+        "NEXUS_FETCH_ALLOW_PRIVATE": "1",  # the page servers are on loopback addresses
+        "NEXUS_EXTRACT_HEDGE_MS": str(args.hedge_ms),
+        "NEXUS_FETCH_DEADLINE_MS": str(args.deadline_ms),
+    })
+    from agent import clients, fetch
+    from agent.cache import normalize_url
+    from agent.replay import Cassette
+    from bench.synthetic import _prose
+
+    pages = build_pages(args, _prose)
+    servers = [start_page_server(pages, f"127.0.0.{i + 1}") for i in range(args.hosts)]
+    urls = [
+        f"http://{server.server_address[0]}:{server.server_address[1]}/page/{n}"
+        for n, server in ((n, servers[n % len(servers)]) for n in range(len(pages)))
+    ]
+
+    cassette = Cassette()
+    for n, url in enumerate(urls):
+        text = "\n".join(f"Rendered paragraph {i} of page {n}. " * 12 for i in range(10))
+        cassette.extract[normalize_url(url)] = {"url": url, "title": f"Page {n}", "raw_content": text}
+    cassette.save(cassette_path)
+
+    results = []
+    try:
+        for backend in args.backends:
+            results.append(await run_backend(backend, urls, args.concurrency))
+    finally:
+        await fetch.close_fetcher()
+        await clients.shutdown()
+        for server in servers:
+            server.shutdown()
+    return results
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["tavily", "local", "hedged"],
+                        choices=("tavily", "local", "hedged"))
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16, help="extracts in flight at once")
+    parser.add_argument("--hosts", type=int, default=8, help="page servers, on 127.0.0.1 .. 127.0.0.<hosts>")
+    parser.add_argument("--page-latency-ms", type=float, default=150)
+    parser.add_argument("--slow-share", type=float, default=0.05, help="share of pages answering after --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=6000)
+    parser.add_argument("--js-share", type=float, default=0.05, help="share of pages that need JavaScript")
+    parser.add_argument("--tavily-latency-ms", type=float, default=1200)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--hedge-ms", type=float, default=1500, help="NEXUS_EXTRACT_HEDGE_MS")
+    parser.add_argument("--deadline-ms", type=float, default=10000, help="NEXUS_FETCH_DEADLINE_MS")
+    parser.add_argument("--output", help="also write the results as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(main(args))
+    for r in results:
+        lat = r["latency_ms"]
+        line = (
+            f"{r['backend']:<7} pages={r['pages']} errors={r['errors']} elapsed={r['elapsed_s']}s "
+            f"p50/p95/p99={lat['p50']:.0f}/{lat['p95']:.0f}/{lat['p99']:.0f} ms max={lat['max']:.0f} ms"
+        )
+        if "hedges" in r:
+            line += f" hedges={r['hedges']} local_wins={r['local_wins']} tavily_wins={r['tavily_wins']}"
+        print(line)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results, "python": sys.version.split()[0]}, f, indent=2)
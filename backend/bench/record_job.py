@@ -0,0 +1,71 @@
+"""
+Record one research job's SSE events as a JSON array — the input of the
+frontend's render benchmark (frontend/src/app/bench).
+
+Runs a synthetic session (bench/synthetic.py) through the API server in
+replay mode, exactly as bench/run.py does, and saves every event of the
+stream in order, streaming deltas included:
+
+    cd backend
+    python -m bench.record_job --angles 9 --output ../frontend/public/bench/job-500.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+
+import httpx
+
+from bench.run import _free_port, parse_args, server_env, start_server, wait_ready
+from bench.synthetic import build_cassette, synthetic_queries
+
+
+async def record(query: str, base_url: str, mode: str) -> list[dict]:
+    events: list[dict] = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        response = await client.post("/api/research", json={"query": query, "bypass_cache": True, "mode": mode})
+        response.raise_for_status()
+        research_id = response.json()["research_id"]
+        async with client.stream("GET", f"/api/research/{research_id}/stream") as stream:
+            async for line in stream.aiter_lines():
+                if line.startswith("data: "):
+                    events.append(json.loads(line[6:]))
+                    if events[-1].get("type") == "stream_end":
+                        break
+    return events
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    workdir = tempfile.mkdtemp(prefix="nexus-record-")
+    query = synthetic_queries(1)[0]
+    cassette_path = os.path.join(workdir, "cassette.json")
+    build_cassette([query], angles=args.angles).save(cassette_path)
+
+    run_args = parse_args(["--levels", "1", "--mode", args.mode, "--jitter-ms", "0"])
+    env = server_env(run_args, cassette_path, workdir)
+    env.update({"NEXUS_REPLAY_ANTHROPIC_LATENCY_MS": "0", "NEXUS_REPLAY_TAVILY_LATENCY_MS": "0"})
+    port = _free_port()
+    server = start_server(port, env, None)
+    try:
+        await wait_ready(f"http://127.0.0.1:{port}", server)
+        return await record(query, f"http://127.0.0.1:{port}", args.mode)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--angles", type=int, default=9, help="research angles of the synthetic session")
+    parser.add_argument("--mode", default="serial", choices=("serial", "parallel"))
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+    events = asyncio.run(main(args))
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(events, f, separators=(",", ":"))
+    counts: dict[str, int] = {}
+    for event in events:
+        counts[event.get("type", "")] = counts.get(event.get("type", ""), 0) + 1
+    print(f"{len(events)} events written to {args.output}: {counts}")
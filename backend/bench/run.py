@@ -0,0 +1,460 @@
+"""
+End-to-end benchmark: drives main.py over real HTTP + SSE with replayed upstreams.
+
+Starts the API server (uvicorn, one worker) with NEXUS_UPSTREAM_MODE=replay,
+then for each concurrency level runs that many research jobs at once — each
+one POSTs /api/research and reads its SSE stream to the end — and reports:
+
+  ttfe_ms           POST sent → first event received
+  first_section_ms  POST sent → first report_section received
+  e2e_ms            POST sent → stream_end received
+  events_per_s      events received by all clients / wall time of the level
+  wire_kb_per_job   SSE bytes on the wire per job (after compression)
+  server_cpu_ms_per_job  server process CPU time per job (Linux only)
+  claude_calls_per_job   Claude calls per job (escalated turns count twice)
+  large_token_share      share of the Claude tokens that went to the large model
+
+with p50 / p95 / p99 for the latencies. Results are written as JSON; pass
+--compare with an earlier result file to print the change per metric.
+
+    cd backend
+    python -m bench.run                               # synthetic sessions, levels 1 10 100
+    python -m bench.run --cassette recorded.json      # sessions recorded with NEXUS_UPSTREAM_MODE=record
+    python -m bench.run --compare bench/results/before.json
+    python -m bench.run --protocol 2                  # compact SSE wire protocol (utils/streaming.py)
+    python -m bench.run --angles 5 --mode parallel    # 5-angle sessions, parallel research mode
+    python -m bench.run --batch --levels 4 8          # POST /api/research/batch: reports per hour
+                                                      #   at batch concurrency 4 and 8
+    python -m bench.run --no-routing                  # every turn on the large model (agent/routing.py)
+
+--batch sends all queries as one batch per level (the level is the batch's
+concurrency) and reports reports_per_hour and tokens_per_report instead of
+latencies; add --keep-rate-limits to measure at your real quota.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any
+
+import httpx
+
+from agent.replay import Cassette
+from agent.routing import SMALL_MODEL
+from bench.synthetic import build_cassette, synthetic_queries
+
+_METRICS = ("ttfe_ms", "first_section_ms", "e2e_ms")
+_USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+
+# ── One job ──────────────────────────────────────────────────────────────────
+
+async def run_job(
+    base_url: str, query: str, ssl_context: ssl.SSLContext, protocol: int = 1, mode: str = "serial"
+) -> dict[str, Any]:
+    # One client (connection) per job, like one browser tab per research job.
+    # A single shared AsyncClient stalls at ~100 concurrent streams and would
+    # measure the client's connection pool instead of the server.
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, verify=ssl_context) as client:
+        return await _run_job(client, query, protocol, mode)
+
+
+async def _run_job(client: httpx.AsyncClient, query: str, protocol: int, mode: str) -> dict[str, Any]:
+    started = time.perf_counter()
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    result: dict[str, Any] = {"ok": False, "rejected": False, "events": 0, "claude_calls": 0, "tokens": 0, "large_tokens": 0}
+    response = await client.post("/api/research", json={"query": query, "bypass_cache": True, "mode": mode})
+    if response.status_code == 429:
+        result["rejected"] = True
+        return result
+    response.raise_for_status()
+    research_id = response.json()["research_id"]
+
+    params = {"protocol": protocol} if protocol != 1 else None
+    async with client.stream("GET", f"/api/research/{research_id}/stream", params=params) as stream:
+        async for line in stream.aiter_lines():
+            if not line.startswith("data: "):
+                continue  # id: lines, heartbeats, separators
+            event = json.loads(line[6:])
+            kind = event.get("type")
+            if kind == "stream_end":
+                result["e2e_ms"] = elapsed_ms()
+                break
+            result["events"] += 1
+            result.setdefault("ttfe_ms", elapsed_ms())
+            if kind == "report_section":
+                result.setdefault("first_section_ms", elapsed_ms())
+            elif kind == "usage":
+                tokens = sum(event.get(f, 0) for f in _USAGE_FIELDS)
+                result["claude_calls"] += 1
+                result["tokens"] += tokens
+                if event.get("model") != SMALL_MODEL:
+                    result["large_tokens"] += tokens
+            elif kind == "complete":
+                result["ok"] = "error" not in result
+            elif kind == "error":
+                result["error"] = event.get("message", "")
+                result["ok"] = False
+        result["wire_bytes"] = stream.num_bytes_downloaded
+    return result
+
+
+# ── One concurrency level ────────────────────────────────────────────────────
+
+def percentiles(values: list[float]) -> dict[str, float] | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:  # nearest-rank
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+        "mean": round(sum(ordered) / len(ordered), 1),
+        "max": ordered[-1],
+    }
+
+
+def server_cpu_seconds(server: subprocess.Popen) -> float | None:
+    """User + system CPU time of the server process so far (Linux /proc only)."""
+    try:
+        with open(f"/proc/{server.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+async def run_level(
+    base_url: str,
+    concurrency: int,
+    queries: list[str],
+    protocol: int = 1,
+    server: subprocess.Popen | None = None,
+    mode: str = "serial",
+) -> dict[str, Any]:
+    ssl_context = ssl.create_default_context()  # built once: creating one per client is slow
+    cpu_before = server_cpu_seconds(server) if server else None
+    started = time.perf_counter()
+    jobs = await asyncio.gather(
+        *(run_job(base_url, queries[i % len(queries)], ssl_context, protocol, mode) for i in range(concurrency)),
+        return_exceptions=True,
+    )
+    wall = time.perf_counter() - started
+    cpu_after = server_cpu_seconds(server) if server else None
+
+    results = [j for j in jobs if isinstance(j, dict)]
+    ok = [r for r in results if r["ok"]]
+    errors = [str(j) for j in jobs if isinstance(j, BaseException)]
+    errors += [r["error"] for r in results if r.get("error")]
+    total_events = sum(r["events"] for r in results)
+    tokens = sum(r["tokens"] for r in results)
+    return {
+        "concurrency": concurrency,
+        "jobs": concurrency,
+        "succeeded": len(ok),
+        "failed": concurrency - len(ok) - sum(r["rejected"] for r in results),
+        "rejected": sum(r["rejected"] for r in results),
+        "wall_s": round(wall, 3),
+        "events": total_events,
+        "events_per_s": round(total_events / wall, 1) if wall else 0.0,
+        "wire_kb_per_job": round(sum(r.get("wire_bytes", 0) for r in results) / 1024 / max(1, len(results)), 1),
+        "server_cpu_ms_per_job": (
+            round((cpu_after - cpu_before) * 1000 / concurrency, 1)
+            if cpu_before is not None and cpu_after is not None else None
+        ),
+        "claude_calls_per_job": round(sum(r["claude_calls"] for r in results) / max(1, len(results)), 2),
+        "large_token_share": round(sum(r["large_tokens"] for r in results) / tokens, 3) if tokens else None,
+        **{metric: percentiles([r[metric] for r in ok if metric in r]) for metric in _METRICS},
+        "errors": errors[:5],
+    }
+
+
+async def run_batch(
+    base_url: str,
+    concurrency: int,
+    queries: list[str],
+    server: subprocess.Popen | None = None,
+    mode: str = "serial",
+) -> dict[str, Any]:
+    """All queries as one POST /api/research/batch, read to the end of its NDJSON stream."""
+    cpu_before = server_cpu_seconds(server) if server else None
+    started = time.perf_counter()
+    body = {
+        "queries": queries,
+        "concurrency": concurrency,
+        "include_events": False,
+        "bypass_cache": True,
+        "mode": mode,
+    }
+    reports: list[dict[str, Any]] = []
+    end: dict[str, Any] = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        async with client.stream("POST", "/api/research/batch", json=body) as stream:
+            stream.raise_for_status()
+            async for line in stream.aiter_lines():
+                if not line:
+                    continue
+                item = json.loads(line)
+                if item["type"] == "report":
+                    reports.append(item)
+                elif item["type"] == "batch_end":
+                    end = item
+            wire_bytes = stream.num_bytes_downloaded
+    wall = time.perf_counter() - started
+    cpu_after = server_cpu_seconds(server) if server else None
+
+    ok = [r for r in reports if r["state"] == "done"]
+    return {
+        "concurrency": concurrency,
+        "jobs": len(queries),
+        "succeeded": len(ok),
+        "failed": len(queries) - len(ok),
+        "rejected": 0,
+        "wall_s": round(wall, 3),
+        "reports_per_hour": round(len(ok) * 3600 / wall, 1) if wall else 0.0,
+        "tokens_per_report": round(end.get("tokens", 0) / max(1, len(ok))),
+        "wire_kb_per_job": round(wire_bytes / 1024 / max(1, len(queries)), 1),
+        "server_cpu_ms_per_job": (
+            round((cpu_after - cpu_before) * 1000 / len(queries), 1)
+            if cpu_before is not None and cpu_after is not None else None
+        ),
+        "errors": [r["error"] for r in reports if r.get("error")][:5],
+    }
+
+
+# ── Server ───────────────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, env: dict[str, str], log_path: str | None) -> subprocess.Popen:
+    log = open(log_path, "w") if log_path else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, **env},
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_ready(base_url: str, server: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with code {server.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def server_env(args: argparse.Namespace, cassette_path: str, workdir: str) -> dict[str, str]:
+    env = {
+        "NEXUS_UPSTREAM_MODE": "replay",
+        "NEXUS_UPSTREAM_CASSETTE": cassette_path,
+        "NEXUS_REPLAY_ANTHROPIC_LATENCY_MS": str(args.anthropic_latency_ms),
+        "NEXUS_REPLAY_TAVILY_LATENCY_MS": str(args.tavily_latency_ms),
+        "NEXUS_REPLAY_SMALL_MODEL_LATENCY_MS": str(args.small_model_latency_ms),
+        "NEXUS_MODEL_ROUTING": "1" if args.routing else "0",
+        "NEXUS_REPLAY_JITTER_MS": str(args.jitter_ms),
+        "NEXUS_STREAM_RESPONSES": "1" if args.stream else "0",
+        # Fresh caches per run: the tool cache stays in memory, the report cache is bypassed
+        "NEXUS_CACHE_PATH": "",
+        "NEXUS_REPORT_CACHE_PATH": os.path.join(workdir, "reports.sqlite3"),
+        "NEXUS_ARCHIVE_PATH": os.path.join(workdir, "archive.sqlite3"),
+        # Admit every job of the largest level at once
+        "NEXUS_MAX_RUNNING_JOBS": str(max(args.levels)),
+        "NEXUS_MAX_WAITING_JOBS": str(max(args.levels)),
+        "NEXUS_BATCH_MAX_CONCURRENCY": str(max(args.levels)),
+        # Synthetic page URLs only exist in the cassette (bench/extract.py covers the other backends)
+        "NEXUS_EXTRACT_BACKEND": "tavily",
+    }
+    if not args.keep_rate_limits:
+        env.update({"NEXUS_ANTHROPIC_RPM": "0", "NEXUS_ANTHROPIC_TPM": "0", "NEXUS_TAVILY_RPM": "0"})
+    return env
+
+
+# ── Reporting ────────────────────────────────────────────────────────────────
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_level(level: dict[str, Any]) -> None:
+    if "reports_per_hour" in level:
+        print(
+            f"  batch c={level['concurrency']:<4} ok={level['succeeded']:<4} failed={level['failed']:<3} "
+            f"wall={level['wall_s']}s reports/h={level['reports_per_hour']} "
+            f"tokens/report={level['tokens_per_report']} server_cpu={level['server_cpu_ms_per_job']}ms/job"
+        )
+        return
+
+    def fmt(stats: dict[str, float] | None) -> str:
+        return "-" if stats is None else f"{stats['p50']:.0f}/{stats['p95']:.0f}/{stats['p99']:.0f}"
+
+    print(
+        f"  c={level['concurrency']:<4} ok={level['succeeded']:<4} failed={level['failed']:<3} "
+        f"rejected={level['rejected']:<3} ttfe={fmt(level['ttfe_ms'])} "
+        f"first_section={fmt(level['first_section_ms'])} e2e={fmt(level['e2e_ms'])} ms (p50/p95/p99) "
+        f"events/s={level['events_per_s']} wire={level['wire_kb_per_job']}KB/job "
+        f"server_cpu={level['server_cpu_ms_per_job']}ms/job "
+        f"claude_calls={level['claude_calls_per_job']}/job large_tokens={level['large_token_share']}"
+    )
+
+
+def print_comparison(current: dict[str, Any], baseline: dict[str, Any]) -> None:
+    base_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    print(f"\nChange vs {baseline.get('meta', {}).get('git_commit') or 'baseline'}:")
+    for level in current["levels"]:
+        before = base_levels.get(level["concurrency"])
+        if before is None:
+            continue
+        parts = []
+        for metric in _METRICS:
+            for p in ("p50", "p95", "p99"):
+                new, old = (level.get(metric) or {}).get(p), (before.get(metric) or {}).get(p)
+                if new is not None and old:
+                    parts.append(f"{metric}.{p} {100 * (new - old) / old:+.1f}%")
+        for metric in (
+            "events_per_s", "reports_per_hour", "tokens_per_report", "wire_kb_per_job", "server_cpu_ms_per_job",
+            "claude_calls_per_job", "large_token_share",
+        ):
+            new, old = level.get(metric), before.get(metric)
+            if new is not None and old:
+                parts.append(f"{metric} {100 * (new - old) / old:+.1f}%")
+        print(f"  c={level['concurrency']}: " + ", ".join(parts))
+
+
+# ── Main ─────────────────────────────────────────────────────────────────────
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="nexus-bench-")
+    if args.cassette:
+        cassette_path = args.cassette
+        cassette = Cassette.load(cassette_path)
+        # Turn-1 keys are "1|<query>" (agent.replay.anthropic_key)
+        queries = [key.split("|", 1)[1] for key in cassette.anthropic if key.startswith("1|")]
+        if not queries:
+            raise SystemExit(f"{cassette_path} has no recorded research sessions")
+    else:
+        queries = synthetic_queries(args.queries or max(args.levels))
+        cassette_path = os.path.join(workdir, "cassette.json")
+        build_cassette(queries, angles=args.angles).save(cassette_path)
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(port, server_env(args, cassette_path, workdir), args.server_log)
+    try:
+        await wait_ready(base_url, server)
+        if args.warmup:
+            await run_level(base_url, 1, queries, args.protocol, mode=args.mode)
+        levels = []
+        print(f"Benchmarking {base_url} with {len(queries)} queries")
+        for concurrency in args.levels:
+            if args.batch:
+                level = await run_batch(base_url, concurrency, queries, server, args.mode)
+            else:
+                level = await run_level(base_url, concurrency, queries, args.protocol, server, args.mode)
+            print_level(level)
+            levels.append(level)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cassette": args.cassette or "synthetic",
+            "queries": len(queries),
+            "anthropic_latency_ms": args.anthropic_latency_ms,
+            "tavily_latency_ms": args.tavily_latency_ms,
+            "small_model_latency_ms": args.small_model_latency_ms,
+            "routing": args.routing,
+            "jitter_ms": args.jitter_ms,
+            "stream": args.stream,
+            "protocol": args.protocol,
+            "mode": args.mode,
+            "angles": args.angles,
+            "rate_limits": args.keep_rate_limits,
+            "batch": args.batch,
+        },
+        "levels": levels,
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 100], help="concurrent jobs per level")
+    parser.add_argument("--cassette", help="recorded cassette to replay (default: synthetic sessions)")
+    parser.add_argument("--queries", type=int, help="synthetic sessions to generate (default: largest level)")
+    parser.add_argument("--anthropic-latency-ms", type=float, default=800)
+    parser.add_argument("--tavily-latency-ms", type=float, default=300)
+    parser.add_argument(
+        "--small-model-latency-ms", type=float, default=350, help="latency of turns routed to the small model"
+    )
+    parser.add_argument("--no-routing", dest="routing", action="store_false", help="every turn on the large model")
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--no-stream", dest="stream", action="store_false", help="use messages.create instead of streaming")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="keep the NEXUS_*_RPM/TPM limits from the environment")
+    parser.add_argument("--protocol", type=int, default=1, choices=(1, 2), help="SSE wire protocol to request")
+    parser.add_argument("--mode", default="serial", choices=("serial", "parallel"), help="research mode to request")
+    parser.add_argument(
+        "--angles", type=int, default=0,
+        help="synthetic sessions with N research angles, scripted for both modes (default: the 4-turn session)",
+    )
+    parser.add_argument("--batch", action="store_true", help="one POST /api/research/batch per level (level = concurrency)")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false")
+    parser.add_argument("--output", default=None, help="result file (default: bench/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--server-log", help="write the server's output to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.mode == "parallel" and not args.angles and not args.cassette:
+        args.angles = 5  # the 4-turn synthetic session has no parallel script
+    results = asyncio.run(main(args))
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", time.strftime("%Y%m%d-%H%M%S.json")
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(results, json.load(f))
@@ -0,0 +1,216 @@
+"""
+Synthetic cassettes — a scripted research session per query, no recording needed.
+
+Each session is four Claude turns, mirroring what a real run looks like:
+  1. narration + web_search
+  2. narration + three extract_page calls (run concurrently, batched)
+  3. two write_section calls
+  4. one write_section + mark_complete
+
+With `angles` > 0 the session researches that many sub-questions instead,
+scripted for both research modes over the same searches and pages, so serial
+and parallel runs of one cassette do the same upstream work:
+
+  serial    per angle: web_search, then two extract_page calls; then two
+            writing turns (sections, then sections + mark_complete)
+  parallel  planner: submit_plan; per angle, a sub-agent: web_search, two
+            extract_page calls, submit_findings; writer: the same two
+            writing turns
+
+Search results and page extracts are generated with fixed sizes, so runs are
+comparable between versions. See agent/replay.py for the cassette format.
+"""
+import json
+import random
+
+from agent.cache import normalize_query, normalize_url
+from agent.parallel import planner_brief, subagent_brief, writer_brief
+from agent.replay import Cassette
+
+PAGE_CHARS = 7000
+SECTION_CHARS = 1800
+FINDINGS_CHARS = 1500
+
+_WORDS = (
+    "research evidence analysis method result study data model system process "
+    "effect source review trial signal measure outcome approach factor sample "
+    "report finding context impact risk benefit mechanism structure growth"
+).split()
+
+
+def _prose(rng: random.Random, chars: int) -> str:
+    words: list[str] = []
+    length = 0
+    while length < chars:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    sentences = [" ".join(words[i:i + 14]).capitalize() + "." for i in range(0, len(words), 14)]
+    return " ".join(sentences)[:chars]
+
+
+def _message(turn: int, query_id: int, content: list[dict], input_tokens: int) -> str:
+    output_tokens = sum(len(json.dumps(block)) for block in content) // 4
+    return json.dumps({
+        "id": f"msg_bench_{query_id}_{turn}",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-sonnet-4-6",
+        "content": content,
+        "stop_reason": "tool_use",
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        },
+    })
+
+
+def _tool(turn: int, index: int, name: str, tool_input: dict, agent: str = "") -> dict:
+    return {"type": "tool_use", "id": f"toolu_bench_{agent}{turn}_{index}", "name": name, "input": tool_input}
+
+
+def _add_turns(cassette: Cassette, first_message: str, query_id: int, turns: list[list[dict]]) -> None:
+    """One agent loop: turn t is answered for a request with 2t-1 messages (agent.replay.anthropic_key)."""
+    for turn, content in enumerate(turns, start=1):
+        cassette.anthropic[f"{2 * turn - 1}|{first_message.strip()}"] = {
+            "kind": "json",
+            "body": _message(turn, query_id, content, input_tokens=3000 + 2500 * turn),
+        }
+
+
+def _add_sources(cassette: Cassette, rng: random.Random, query: str, slug: str, count: int) -> list[str]:
+    """Search results for `query` and their pages; returns the URLs."""
+    urls = [f"https://example.com/{slug}/source-{i}" for i in range(count)]
+    cassette.search[normalize_query(query)] = {
+        "query": query,
+        "results": [
+            {"title": f"Source {i}", "url": url, "content": _prose(rng, 600), "published_date": "2025-01-01"}
+            for i, url in enumerate(urls)
+        ],
+    }
+    for i, url in enumerate(urls):
+        cassette.extract[normalize_url(url)] = {"url": url, "title": f"Source {i}", "raw_content": _prose(rng, PAGE_CHARS)}
+    return urls
+
+
+def add_session(cassette: Cassette, query: str, query_id: int, seed: int = 0, angles: int = 0) -> None:
+    """Script one research session for `query` into `cassette`."""
+    if angles > 0:
+        _add_angled_sessions(cassette, query, query_id, seed, angles)
+        return
+    rng = random.Random(f"{seed}:{query}")
+    slug = normalize_query(query).replace(" ", "-")[:40]
+    urls = [f"https://example.com/{slug}/source-{i}" for i in range(5)]
+    citations = [{"url": url, "title": f"Source {i}"} for i, url in enumerate(urls[:3])]
+
+    cassette.search[normalize_query(query)] = {
+        "query": query,
+        "results": [
+            {"title": f"Source {i}", "url": url, "content": _prose(rng, 600), "published_date": "2025-01-01"}
+            for i, url in enumerate(urls)
+        ],
+    }
+    for i, url in enumerate(urls):
+        cassette.extract[normalize_url(url)] = {"url": url, "title": f"Source {i}", "raw_content": _prose(rng, PAGE_CHARS)}
+
+    def section(turn: int, index: int, title: str) -> dict:
+        return _tool(turn, index, "write_section", {
+            "title": title, "content": _prose(rng, SECTION_CHARS), "citations": citations,
+        })
+
+    turns = [
+        [
+            {"type": "text", "text": f"I'll start with a broad search on {query}."},
+            _tool(1, 0, "web_search", {"query": query, "max_results": 5}),
+        ],
+        [
+            {"type": "text", "text": "Reading the three most relevant sources."},
+            *(_tool(2, i, "extract_page", {"url": url}) for i, url in enumerate(urls[:3])),
+        ],
+        [section(3, 0, "Background"), section(3, 1, "Key Findings")],
+        [
+            section(4, 0, "Implications"),
+            _tool(4, 1, "mark_complete", {
+                "report_title": query[:80], "executive_summary": _prose(rng, 400),
+            }),
+        ],
+    ]
+    _add_turns(cassette, query, query_id, turns)
+
+
+def _add_angled_sessions(cassette: Cassette, query: str, query_id: int, seed: int, angles: int) -> None:
+    """Serial and parallel sessions researching `angles` sub-questions of `query`."""
+    rng = random.Random(f"{seed}:{query}:{angles}")
+    slug = normalize_query(query).replace(" ", "-")[:40]
+    plan = [
+        {"title": f"Angle {n}", "question": f"{query} — aspect {n}"}
+        for n in range(1, angles + 1)
+    ]
+    sources = [_add_sources(cassette, rng, sq["question"], f"{slug}/angle-{n}", 4) for n, sq in enumerate(plan)]
+
+    def writing_turns(agent: str) -> list[list[dict]]:
+        def section(turn: int, index: int, n: int) -> dict:
+            citations = [{"url": url, "title": f"Source {i}"} for i, url in enumerate(sources[n][:2])]
+            return _tool(turn, index, "write_section", {
+                "title": plan[n]["title"], "content": _prose(rng, SECTION_CHARS), "citations": citations,
+            }, agent)
+
+        first = (angles + 1) // 2
+        return [
+            [section(1, i, n) for i, n in enumerate(range(first))],
+            [
+                *(section(2, i, n) for i, n in enumerate(range(first, angles))),
+                _tool(2, angles, "mark_complete", {
+                    "report_title": query[:80], "executive_summary": _prose(rng, 400),
+                }, agent),
+            ],
+        ]
+
+    def research_turns(n: int, turn: int, agent: str) -> list[list[dict]]:
+        return [
+            [
+                {"type": "text", "text": f"Searching for {plan[n]['title']}."},
+                _tool(turn, 0, "web_search", {"query": plan[n]["question"], "max_results": 4}, agent),
+            ],
+            [
+                {"type": "text", "text": "Reading the two most relevant sources."},
+                *(_tool(turn + 1, i, "extract_page", {"url": url}, agent) for i, url in enumerate(sources[n][:2])),
+            ],
+        ]
+
+    # Serial: one agent does every angle, then writes
+    serial: list[list[dict]] = []
+    for n in range(angles):
+        serial += research_turns(n, len(serial) + 1, "")
+    _add_turns(cassette, query, query_id, serial + writing_turns("w"))
+
+    # Parallel: planner, one sub-agent per angle, writer
+    _add_turns(cassette, planner_brief(query), query_id, [
+        [_tool(1, 0, "submit_plan", {"sub_questions": plan}, "p")],
+    ])
+    findings = []
+    for n, sq in enumerate(plan):
+        result = {
+            "findings": _prose(rng, FINDINGS_CHARS),
+            "sources": [{"url": url, "title": f"Source {i}"} for i, url in enumerate(sources[n][:2])],
+        }
+        findings.append(result)
+        agent = f"s{n}-"
+        _add_turns(cassette, subagent_brief(query, sq), query_id, research_turns(n, 1, agent) + [
+            [_tool(3, 0, "submit_findings", result, agent)],
+        ])
+    _add_turns(cassette, writer_brief(query, plan, findings), query_id, writing_turns("pw"))
+
+
+def build_cassette(queries: list[str], seed: int = 0, angles: int = 0) -> Cassette:
+    cassette = Cassette()
+    for query_id, query in enumerate(queries):
+        add_session(cassette, query, query_id, seed, angles)
+    return cassette
+
+
+def synthetic_queries(count: int) -> list[str]:
+    return [f"Benchmark topic {i}: how does subject {i} affect outcome {i}?" for i in range(count)]
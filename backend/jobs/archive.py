@@ -0,0 +1,302 @@
+"""
+ReportArchive — every report the agent writes, kept for good and searchable.
+
+The report cache (report_cache.py) replays a recent job's events for repeated
+questions and forgets them after a day; the job registry forgets a job ten
+minutes after its last viewer. The archive keeps the reports themselves:
+
+  - _run_research writes each report_section as it arrives and the title /
+    executive summary from the `complete` event, keyed on the research_id,
+    so a report survives its job (and a crash mid-job leaves what was written)
+  - SQLite, local to the host, with an FTS5 index over titles, summaries and
+    section bodies (porter-stemmed, BM25-ranked)
+  - list / search return one LIMIT / OFFSET page at a time, and export()
+    walks the archive one page of reports at a time, so an export never holds
+    more than a page in memory
+  - every query runs on the archive's own thread (utils/db_thread.py); the
+    public methods are coroutines, so the event loop only awaits results
+
+Reports whose job ended without a `complete` event (failed, cancelled) are
+kept with state "incomplete".
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from utils.db_thread import DbThread
+
+ARCHIVE_PATH = os.getenv("NEXUS_ARCHIVE_PATH", ".cache/report_archive.sqlite3")
+EXPORT_PAGE_SIZE = 50  # reports read per query while exporting
+
+_WORD = re.compile(r"\w+")
+_REPORT_COLUMNS = "id, query, title, summary, state, section_count, created_at, completed_at"
+
+
+def fts_query(text: str) -> str:
+    """User search text as an FTS5 query: any of its words (no operator syntax), BM25 ranks the rest."""
+    return " OR ".join(f'"{word}"' for word in _WORD.findall(text))
+
+
+def render_markdown(report: dict[str, Any]) -> str:
+    """A fetched report (with sections) as a Markdown document."""
+    parts = [f"# {report['title'] or report['query']}\n", f"> {report['query']}\n"]
+    if report["summary"]:
+        parts.append(report["summary"].strip() + "\n")
+    for section in report["sections"]:
+        parts.append(f"## {section['title']}\n\n{section['content'].strip()}\n")
+        if section["citations"]:
+            parts.append("Sources:\n" + "".join(
+                f"- [{c.get('title') or c.get('url', '')}]({c.get('url', '')})\n" for c in section["citations"]
+            ))
+    return "\n".join(parts)
+
+
+class ReportArchive:
+    def __init__(self, path: str = ARCHIVE_PATH):
+        self.fetches = 0
+        self.searches = 0
+        self._thread = DbThread("report-archive")
+        self._db = self._thread.call(self._open, path)
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; one fsync per checkpoint, not per section
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " id TEXT PRIMARY KEY, query TEXT NOT NULL,"
+            " title TEXT NOT NULL DEFAULT '', summary TEXT NOT NULL DEFAULT '',"
+            " state TEXT NOT NULL, section_count INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL, completed_at REAL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS reports_by_time ON reports (created_at, id)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS report_sections ("
+            " report_id TEXT NOT NULL, position INTEGER NOT NULL, section_id TEXT NOT NULL,"
+            " title TEXT NOT NULL, content TEXT NOT NULL, citations TEXT NOT NULL,"
+            " PRIMARY KEY (report_id, position)) WITHOUT ROWID"
+        )
+        # One row per section, plus one (position -1) for the report's title and summary
+        db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS report_text USING fts5("
+            " report_id UNINDEXED, position UNINDEXED, title, body, tokenize = 'porter unicode61')"
+        )
+        return db
+
+    # ── Writes (from the job runner) ──────────────────────────────────────
+
+    async def add_section(self, report_id: str, query: str, event: dict[str, Any]) -> None:
+        """Archive a report_section event; the report's row is created with its first section."""
+        await self._thread.run(self._add_section, report_id, query, event)
+
+    async def complete(self, report_id: str, event: dict[str, Any]) -> None:
+        """Record a `complete` event's title and summary. Reports without sections are not archived."""
+        await self._thread.run(self._complete, report_id, event)
+
+    async def finish(self, report_id: str) -> None:
+        """The job is over: a report that never got its `complete` event stays, as incomplete."""
+        await self._thread.run(self._finish, report_id)
+
+    # ── Reads ─────────────────────────────────────────────────────────────
+
+    async def get(self, report_id: str) -> dict[str, Any] | None:
+        """One report with its sections, or None."""
+        report = await self._thread.run(self._get, report_id)
+        if report is not None:
+            self.fetches += 1
+        return report
+
+    async def latest(self, limit: int = 20, offset: int = 0) -> dict[str, Any]:
+        """Newest reports first (no section bodies)."""
+        return await self._thread.run(self._latest, limit, offset)
+
+    async def search(self, text: str, limit: int = 20, offset: int = 0) -> dict[str, Any]:
+        """
+        Reports matching `text`, best first, each with a snippet of its
+        best-matching section (or summary). Titles weigh 4x body text.
+        """
+        query = fts_query(text)
+        if not query:
+            return _page([], 0, limit, offset)
+        self.searches += 1
+        return await self._thread.run(self._search, query, limit, offset)
+
+    async def export(self, text: str = "") -> AsyncIterator[dict[str, Any]]:
+        """
+        Every report (or those matching `text`), oldest first, with sections.
+        Reads EXPORT_PAGE_SIZE reports per query, resuming after the last one
+        read, so memory stays flat however large the archive is.
+        """
+        match = fts_query(text) if text else ""
+        if text and not match:
+            return
+        after: tuple[float, str] | None = (-1.0, "")
+        while after is not None:
+            reports, after = await self._thread.run(self._export_page, match, after)
+            self.fetches += len(reports)
+            for report in reports:
+                yield report
+
+    async def stats(self) -> dict[str, Any]:
+        (reports,) = await self._thread.run(lambda: self._db.execute("SELECT COUNT(*) FROM reports").fetchone())
+        return {"reports": reports, "fetches": self.fetches, "searches": self.searches}
+
+    def close(self) -> None:
+        self._thread.call(self._db.close)
+        self._thread.close()
+
+    # ── On the archive's thread ───────────────────────────────────────────
+
+    def _add_section(self, report_id: str, query: str, event: dict[str, Any]) -> None:
+        title, content = event.get("title", ""), event.get("content", "")
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.execute(
+                "INSERT OR IGNORE INTO reports (id, query, state, created_at) VALUES (?, ?, 'running', ?)",
+                (report_id, query, time.time()),
+            )
+            (position,) = self._db.execute(
+                "SELECT section_count FROM reports WHERE id = ?", (report_id,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT INTO report_sections VALUES (?, ?, ?, ?, ?, ?)",
+                (report_id, position, event.get("section_id", ""), title, content,
+                 json.dumps(event.get("citations", []))),
+            )
+            self._db.execute("INSERT INTO report_text VALUES (?, ?, ?, ?)", (report_id, position, title, content))
+            self._db.execute("UPDATE reports SET section_count = ? WHERE id = ?", (position + 1, report_id))
+
+    def _complete(self, report_id: str, event: dict[str, Any]) -> None:
+        title, summary = event.get("report_title", ""), event.get("executive_summary", "")
+        with self._db:
+            self._db.execute("BEGIN")
+            updated = self._db.execute(
+                "UPDATE reports SET title = ?, summary = ?, state = 'complete', completed_at = ?"
+                " WHERE id = ? AND state = 'running'",
+                (title, summary, time.time(), report_id),
+            ).rowcount
+            if updated:
+                self._db.execute("INSERT INTO report_text VALUES (?, -1, ?, ?)", (report_id, title, summary))
+
+    def _finish(self, report_id: str) -> None:
+        self._db.execute(
+            "UPDATE reports SET state = 'incomplete', completed_at = ? WHERE id = ? AND state = 'running'",
+            (time.time(), report_id),
+        )
+
+    def _get(self, report_id: str) -> dict[str, Any] | None:
+        row = self._db.execute(f"SELECT {_REPORT_COLUMNS} FROM reports WHERE id = ?", (report_id,)).fetchone()
+        if row is None:
+            return None
+        report = _report(row)
+        report["sections"] = [
+            {"section_id": section_id, "title": title, "content": content, "citations": json.loads(citations)}
+            for section_id, title, content, citations in self._db.execute(
+                "SELECT section_id, title, content, citations FROM report_sections"
+                " WHERE report_id = ? ORDER BY position",
+                (report_id,),
+            )
+        ]
+        return report
+
+    def _latest(self, limit: int, offset: int) -> dict[str, Any]:
+        rows = self._db.execute(
+            f"SELECT {_REPORT_COLUMNS} FROM reports ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            (limit, offset),
+        ).fetchall()
+        (total,) = self._db.execute("SELECT COUNT(*) FROM reports").fetchone()
+        return _page([_report(row) for row in rows], total, limit, offset)
+
+    def _search(self, query: str, limit: int, offset: int) -> dict[str, Any]:
+        # Rank reports by their best-scoring row. MATERIALIZED: bm25() only
+        # works in a query directly on the FTS table.
+        rows = self._db.execute(
+            "WITH hits AS MATERIALIZED ("
+            "  SELECT rowid AS hit, report_id, bm25(report_text, 0, 0, 4.0, 1.0) AS score"
+            "  FROM report_text WHERE report_text MATCH ?),"
+            " best AS ("  # the bare `hit` column comes from the MIN(score) row
+            "  SELECT report_id, MIN(score) AS score, hit, COUNT(*) OVER () AS total"
+            "  FROM hits GROUP BY report_id)"
+            f" SELECT {', '.join('r.' + c for c in _REPORT_COLUMNS.split(', '))}, best.score, best.hit, best.total"
+            " FROM best JOIN reports r ON r.id = best.report_id"
+            " ORDER BY best.score, r.created_at DESC LIMIT ? OFFSET ?",
+            (query, limit, offset),
+        ).fetchall()
+        total = rows[0][-1] if rows else self._count_matches(query)
+        # Snippets only for the rows on this page — they cost far more than ranking
+        hits = [row[9] for row in rows]
+        snippets = dict(self._db.execute(
+            "SELECT rowid, snippet(report_text, -1, '**', '**', '…', 16) FROM report_text"
+            f" WHERE report_text MATCH ? AND rowid IN ({','.join('?' * len(hits))})",
+            (query, *hits),
+        ).fetchall()) if hits else {}
+        results = []
+        for row in rows:
+            report = _report(row[:8])
+            report["score"] = round(-row[8], 3)  # bm25() is lower-is-better
+            report["snippet"] = snippets.get(row[9], "")
+            results.append(report)
+        return _page(results, total, limit, offset)
+
+    def _export_page(
+        self, match: str, after: tuple[float, str]
+    ) -> tuple[list[dict[str, Any]], tuple[float, str] | None]:
+        """Up to EXPORT_PAGE_SIZE reports after `after`, and where the next page starts (None: done)."""
+        sql = "SELECT id, created_at FROM reports WHERE (created_at, id) > (?, ?)"
+        params: list[Any] = [*after]
+        if match:
+            sql += " AND id IN (SELECT report_id FROM report_text WHERE report_text MATCH ?)"
+            params.append(match)
+        page = self._db.execute(sql + " ORDER BY created_at, id LIMIT ?", (*params, EXPORT_PAGE_SIZE)).fetchall()
+        reports = [report for report_id, _ in page if (report := self._get(report_id)) is not None]
+        if len(page) < EXPORT_PAGE_SIZE:
+            return reports, None
+        return reports, (page[-1][1], page[-1][0])
+
+    def _count_matches(self, query: str) -> int:
+        (total,) = self._db.execute(
+            "SELECT COUNT(DISTINCT report_id) FROM report_text WHERE report_text MATCH ?", (query,)
+        ).fetchone()
+        return total
+
+
+def _report(row: tuple) -> dict[str, Any]:
+    report_id, query, title, summary, state, section_count, created_at, completed_at = row
+    return {
+        "id": report_id,
+        "query": query,
+        "title": title,
+        "summary": summary,
+        "state": state,
+        "section_count": section_count,
+        "created_at": created_at,
+        "completed_at": completed_at,
+    }
+
+
+def _page(items: list[dict[str, Any]], total: int, limit: int, offset: int) -> dict[str, Any]:
+    next_offset = offset + len(items)
+    return {"reports": items, "total": total, "next_offset": next_offset if next_offset < total else None}
+
+
+_archive: ReportArchive | None = None
+
+
+def get_report_archive() -> ReportArchive:
+    global _archive
+    if _archive is None:
+        _archive = ReportArchive()
+    return _archive
+
+
+def close_report_archive() -> None:
+    global _archive
+    if _archive is not None:
+        _archive.close()
+        _archive = None
@@ -0,0 +1,208 @@
+"""
+BatchRun — many research questions in one request, results as one NDJSON stream.
+
+POST /api/research/batch submits its queries as ordinary jobs (each is also
+visible to GET /api/research/{id}, streamable, cancellable and archived), at
+most `concurrency` at a time, and merges them into one stream, one JSON
+object per line:
+
+  {"type": "batch_start", "batch_id", "queries", "unique", "concurrency"}
+  {"type": "event", "index", "research_id", "event": {...}}     (include_events)
+  {"type": "report", "index", "research_id", "query", "state", "title",
+   "summary", "sections", "tokens", "error"?, "duplicate_of"?}   (as each job ends)
+  {"type": "batch_end", "batch_id", "reports", "failed", "elapsed_s",
+   "reports_per_hour", "tokens"}
+
+Built for throughput at a fixed quota rather than latency:
+
+  - batch jobs run with priority "batch": the upstream scheduler grants
+    interactive calls first, so a batch uses the quota interactive traffic
+    leaves over
+  - at most BATCH_MAX_CONCURRENCY batch jobs run at once (default: half the
+    run slots), leaving slots for interactive jobs; a full job queue is
+    waited out, not reported as a failure
+  - Claude responses are not streamed — nobody watches the deltas
+  - a question asked twice in a batch (same normalized query) runs once;
+    every copy gets the report. Questions answered recently replay from the
+    report cache. Tool results and upstream connections are process-wide,
+    so every page a job fetched is free for the rest of the batch
+  - streaming deltas are never relayed; per-job events can be left out
+    entirely (include_events=false)
+
+If the client goes away, the batch's unfinished jobs are cancelled.
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from typing import Any
+
+from .registry import MAX_RUNNING_JOBS, Job, JobRegistry, JobState, RegistryFull
+from .report_cache import normalize_query
+from utils.streaming import dumps
+
+BATCH_MAX_CONCURRENCY = int(os.getenv("NEXUS_BATCH_MAX_CONCURRENCY", str(max(1, MAX_RUNNING_JOBS // 2))))
+ADMIT_RETRY_SECONDS = 5.0  # poll interval while the job queue is full
+OUT_QUEUE_MAX_LINES = 256  # lines buffered for a slow client before the workers wait for it
+
+_UNRELAYED_EVENTS = frozenset({"thinking_delta", "section_delta"})
+_cleanups: set[asyncio.Task] = set()  # keeps cleanup tasks alive until they finish
+
+
+class BatchRun:
+    def __init__(
+        self,
+        queries: list[str],
+        submit: Callable[[str], Awaitable[Job]],
+        registry: JobRegistry,
+        concurrency: int | None = None,
+        include_events: bool = True,
+    ):
+        """`submit(query)` registers one job (raising RegistryFull when the queue is full)."""
+        self.batch_id = str(uuid.uuid4())
+        self._queries = queries
+        self._submit = submit
+        self._registry = registry
+        self._concurrency = max(1, min(concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+        self._include_events = include_events
+        self._out: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(OUT_QUEUE_MAX_LINES)
+        self._running: dict[str, Job] = {}
+
+    async def stream(self) -> AsyncGenerator[bytes, None]:
+        """Run the batch, yielding NDJSON lines."""
+        started = time.perf_counter()
+        groups: dict[str, list[int]] = {}
+        for index, query in enumerate(self._queries):
+            groups.setdefault(normalize_query(query), []).append(index)
+        todo: asyncio.Queue[list[int]] = asyncio.Queue()
+        for indexes in groups.values():
+            todo.put_nowait(indexes)
+
+        yield _line({
+            "type": "batch_start",
+            "batch_id": self.batch_id,
+            "queries": len(self._queries),
+            "unique": len(groups),
+            "concurrency": self._concurrency,
+        })
+        workers = [asyncio.create_task(self._worker(todo)) for _ in range(min(self._concurrency, len(groups)))]
+        reports = failed = tokens = 0
+        try:
+            remaining = len(workers)
+            while remaining:
+                item = await self._out.get()
+                if item is None:
+                    remaining -= 1
+                    continue
+                if item["type"] == "report":
+                    reports += 1
+                    failed += item["state"] != "done"
+                    if "duplicate_of" not in item:
+                        tokens += item["tokens"]
+                yield _line(item)
+
+            elapsed = time.perf_counter() - started
+            done = reports - failed
+            yield _line({
+                "type": "batch_end",
+                "batch_id": self.batch_id,
+                "reports": done,
+                "failed": failed,
+                "elapsed_s": round(elapsed, 3),
+                "reports_per_hour": round(done * 3600 / elapsed, 1) if elapsed else 0.0,
+                "tokens": tokens,
+            })
+        finally:
+            # Client gone (or done): stop the workers and the jobs they started.
+            # In a task of its own — when the client disconnects, the server
+            # keeps cancelling the response's task, so awaits here would not return.
+            cleanup = asyncio.create_task(self._stop(workers))
+            _cleanups.add(cleanup)
+            cleanup.add_done_callback(_cleanups.discard)
+            await asyncio.shield(cleanup)
+
+    async def _stop(self, workers: list[asyncio.Task]) -> None:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for job in list(self._running.values()):
+            await self._registry.cancel(job.research_id, "client")
+
+    async def _worker(self, todo: asyncio.Queue[list[int]]) -> None:
+        try:
+            while not todo.empty():
+                await self._research(todo.get_nowait())
+        finally:
+            # Stopped by _stop, nobody reads the queue any more: a put could wait forever
+            if not asyncio.current_task().cancelling():
+                await self._out.put(None)
+
+    async def _research(self, indexes: list[int]) -> None:
+        """Run one unique question; report it for each index that asked it."""
+        first = indexes[0]
+        job = await self._admit(self._queries[first])
+        self._running[job.research_id] = job
+        title = summary = ""
+        error: str | None = None
+        complete = False
+        sections: list[dict[str, Any]] = []
+
+        # None if the job was evicted already: reported as failed below
+        subscription = self._registry.bus.subscribe(job.research_id, 0)
+        try:
+            while subscription is not None and (batch := await subscription.next_batch(timeout=15.0)) is not None:
+                for _, event in batch:
+                    kind = event.get("type")
+                    if kind == "report_section":
+                        sections.append({
+                            "title": event.get("title", ""),
+                            "content": event.get("content", ""),
+                            "citations": event.get("citations", []),
+                        })
+                    elif kind == "complete":
+                        complete = True
+                        title, summary = event.get("report_title", ""), event.get("executive_summary", "")
+                    elif kind == "error":
+                        error = event.get("message", "")
+                    if self._include_events and kind not in _UNRELAYED_EVENTS:
+                        await self._out.put({
+                            "type": "event", "index": first, "research_id": job.research_id, "event": event,
+                        })
+        finally:
+            if subscription is not None:
+                subscription.close()
+        self._running.pop(job.research_id, None)
+
+        if complete and error is None:
+            state = "done"
+        else:
+            state = "cancelled" if job.state is JobState.CANCELLED else "failed"
+        for index in indexes:
+            report: dict[str, Any] = {
+                "type": "report",
+                "index": index,
+                "research_id": job.research_id,
+                "query": self._queries[index],
+                "state": state,
+                "title": title,
+                "summary": summary,
+                "sections": sections,
+                "tokens": job.tokens,
+            }
+            if error is not None:
+                report["error"] = error
+            if index != first:
+                report["duplicate_of"] = first
+            await self._out.put(report)
+
+    async def _admit(self, query: str) -> Job:
+        while True:
+            try:
+                return await self._submit(query)
+            except RegistryFull as exc:
+                await asyncio.sleep(min(exc.retry_after, ADMIT_RETRY_SECONDS))
+
+
+def _line(item: dict[str, Any]) -> bytes:
+    return dumps(item) + b"\n"
@@ -0,0 +1,444 @@
+"""
+EventBus — where job events live, so producers and streamers can sit in
+different processes.
+
+The job registry publishes every event of a job to the bus; SSE streams
+subscribe to it by research_id. Three backends, chosen with NEXUS_EVENT_BUS:
+
+  memory  — EventHub per job, in this process only (default; single worker)
+  sqlite  — one SQLite file shared by all workers on a host (WAL, polling readers;
+            queries run on the bus's own thread, off the event loop)
+  redis   — Redis streams; works across hosts. Any server speaking the Redis
+            protocol (with EVAL) will do, and a client (e.g. a local stand-in)
+            can be injected for testing.
+
+All backends keep the same semantics as EventLog: sequence numbers start at 1,
+a bounded window of recent events is retained, and report_section events are
+always retained so a late subscriber still gets the whole report.
+
+Subscriptions expose `await next_batch(timeout)` (→ list of (seq, event),
+[] on timeout, None when the job is finished and fully read, or has been
+discarded) and `close()`.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Any
+
+from .event_log import EVENT_LOG_MAX_EVENTS
+from .hub import EventHub
+from utils.db_thread import DbThread
+
+EVENT_BUS = os.getenv("NEXUS_EVENT_BUS", "memory")
+EVENT_BUS_PATH = os.getenv("NEXUS_EVENT_BUS_PATH", ".cache/events.sqlite3")
+EVENT_BUS_URL = os.getenv("NEXUS_EVENT_BUS_URL", "redis://localhost:6379/0")
+EVENT_BUS_POLL_SECONDS = float(os.getenv("NEXUS_EVENT_BUS_POLL_SECONDS", "0.1"))
+EVENT_BUS_RETENTION_SECONDS = int(os.getenv("NEXUS_EVENT_BUS_RETENTION_SECONDS", "3600"))
+
+
+class EventBus(ABC):
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def create(self, research_id: str) -> None:
+        """Start an empty event stream for a new job."""
+
+    @abstractmethod
+    async def publish(self, research_id: str, event: dict[str, Any]) -> int:
+        """Append an event; returns its sequence number. Never waits for readers."""
+
+    @abstractmethod
+    async def close(self, research_id: str) -> None:
+        """No more events — subscribers finish once they have caught up."""
+
+    @abstractmethod
+    async def status(self, research_id: str) -> dict[str, Any] | None:
+        """{last_event_id, done, subscribers, last_access} or None if unknown."""
+
+    @abstractmethod
+    def subscribe(self, research_id: str, after: int = 0):
+        """
+        Independent reader of the job's events after sequence number `after` —
+        or None when the bus already knows the job is gone (callers end the
+        stream). A job discarded later ends its readers' next_batch with None.
+        """
+
+    @abstractmethod
+    async def discard(self, research_id: str) -> None:
+        """Drop everything stored for the job."""
+
+
+# ── In-process ───────────────────────────────────────────────────────────────
+
+class MemoryEventBus(EventBus):
+    def __init__(self):
+        self._hubs: dict[str, EventHub] = {}
+
+    async def stop(self) -> None:
+        for hub in self._hubs.values():
+            hub.discard()
+        self._hubs.clear()
+
+    async def create(self, research_id: str) -> None:
+        self._hubs[research_id] = EventHub()
+
+    async def publish(self, research_id: str, event: dict[str, Any]) -> int:
+        return self._hubs[research_id].publish(event)
+
+    async def close(self, research_id: str) -> None:
+        hub = self._hubs.get(research_id)
+        if hub is not None:
+            hub.close()
+
+    async def status(self, research_id: str) -> dict[str, Any] | None:
+        hub = self._hubs.get(research_id)
+        if hub is None:
+            return None
+        return {
+            "last_event_id": hub.log.last_seq,
+            "done": hub.closed,
+            "subscribers": hub.subscriber_count,
+            "last_access": None,  # only local subscribers exist; the registry tracks access
+        }
+
+    def subscribe(self, research_id: str, after: int = 0):
+        hub = self._hubs.get(research_id)
+        return hub.subscribe(after) if hub is not None else None
+
+    async def discard(self, research_id: str) -> None:
+        hub = self._hubs.pop(research_id, None)
+        if hub is not None:
+            hub.discard()
+
+
+# ── Single host, many workers ────────────────────────────────────────────────
+
+class SqliteEventBus(EventBus):
+    """
+    Events in a shared SQLite file. Writers are the worker running the job;
+    readers in any worker poll for rows past their cursor. Subscribers refresh
+    `touched_at` so the producing worker knows the job is still being watched.
+    """
+
+    def __init__(
+        self,
+        path: str = EVENT_BUS_PATH,
+        max_events: int = EVENT_LOG_MAX_EVENTS,
+        poll_seconds: float = EVENT_BUS_POLL_SECONDS,
+    ):
+        self._path = path
+        self._max_events = max(1, max_events)
+        self._poll_seconds = poll_seconds
+        self._seqs: dict[str, int] = {}  # jobs produced by this process
+        self._local_subscribers: dict[str, int] = {}
+        self._db: sqlite3.Connection | None = None
+        self._thread = DbThread("event-bus")
+
+    async def start(self) -> None:
+        self._db = await self._thread.run(self._open)
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        db = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA busy_timeout=5000")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS bus_jobs ("
+            " research_id TEXT PRIMARY KEY, last_seq INTEGER NOT NULL,"
+            " closed INTEGER NOT NULL, created_at REAL NOT NULL, touched_at REAL NOT NULL)"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS bus_events ("
+            " research_id TEXT NOT NULL, seq INTEGER NOT NULL, kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL, PRIMARY KEY (research_id, seq)) WITHOUT ROWID"
+        )
+        # Forget streams nobody has touched for a while (crashed workers, old runs)
+        stale = time.time() - EVENT_BUS_RETENTION_SECONDS
+        db.execute(
+            "DELETE FROM bus_events WHERE research_id IN"
+            " (SELECT research_id FROM bus_jobs WHERE touched_at < ?)", (stale,)
+        )
+        db.execute("DELETE FROM bus_jobs WHERE touched_at < ?", (stale,))
+        return db
+
+    async def stop(self) -> None:
+        if self._db is not None:
+            await self._thread.run(self._db.close)
+            self._db = None
+        self._thread.close()
+
+    async def create(self, research_id: str) -> None:
+        now = time.time()
+        self._seqs[research_id] = 0
+        await self._execute("INSERT OR REPLACE INTO bus_jobs VALUES (?, 0, 0, ?, ?)", (research_id, now, now))
+
+    async def publish(self, research_id: str, event: dict[str, Any]) -> int:
+        seq = self._seqs[research_id] + 1
+        self._seqs[research_id] = seq
+        await self._thread.run(self._append, research_id, seq, event)
+        return seq
+
+    def _append(self, research_id: str, seq: int, event: dict[str, Any]) -> None:
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.execute(
+                "INSERT INTO bus_events VALUES (?, ?, ?, ?)",
+                (research_id, seq, event.get("type", ""), json.dumps(event)),
+            )
+            self._db.execute(
+                "UPDATE bus_jobs SET last_seq = ? WHERE research_id = ?", (seq, research_id)
+            )
+        if seq % 100 == 0:
+            # Trim to the retention window, keeping every report section
+            self._db.execute(
+                "DELETE FROM bus_events WHERE research_id = ? AND seq <= ? AND kind != 'report_section'",
+                (research_id, seq - self._max_events),
+            )
+
+    async def close(self, research_id: str) -> None:
+        self._seqs.pop(research_id, None)
+        await self._execute("UPDATE bus_jobs SET closed = 1 WHERE research_id = ?", (research_id,))
+
+    async def status(self, research_id: str) -> dict[str, Any] | None:
+        row = await self._thread.run(
+            lambda: self._db.execute(
+                "SELECT last_seq, closed, touched_at FROM bus_jobs WHERE research_id = ?", (research_id,)
+            ).fetchone()
+        )
+        if row is None:
+            return None
+        return {
+            "last_event_id": row[0],
+            "done": bool(row[1]),
+            "subscribers": self._local_subscribers.get(research_id, 0),
+            "last_access": row[2],
+        }
+
+    def subscribe(self, research_id: str, after: int = 0):
+        return _SqliteSubscription(self, research_id, after)
+
+    async def discard(self, research_id: str) -> None:
+        self._seqs.pop(research_id, None)
+        await self._thread.run(self._delete, research_id)
+
+    def _delete(self, research_id: str) -> None:
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM bus_events WHERE research_id = ?", (research_id,))
+            self._db.execute("DELETE FROM bus_jobs WHERE research_id = ?", (research_id,))
+
+    async def _execute(self, sql: str, params: tuple) -> None:
+        await self._thread.run(self._db.execute, sql, params)
+
+
+class _SqliteSubscription:
+    def __init__(self, bus: SqliteEventBus, research_id: str, after: int):
+        self._bus = bus
+        self._research_id = research_id
+        self.cursor = after
+        bus._local_subscribers[research_id] = bus._local_subscribers.get(research_id, 0) + 1
+
+    async def next_batch(self, timeout: float) -> list[tuple[int, dict[str, Any]]] | None:
+        deadline = time.monotonic() + timeout
+        touch = True
+        while True:
+            rows, job = await self._bus._thread.run(self._poll, self.cursor, touch)
+            touch = False
+            if rows:
+                self.cursor = rows[-1][0]
+                return rows
+            if job is None or (job[1] and self.cursor >= job[0]):
+                return None
+            if time.monotonic() >= deadline:
+                return []
+            await asyncio.sleep(self._bus._poll_seconds)
+
+    def _poll(self, cursor: int, touch: bool) -> tuple[list[tuple[int, dict[str, Any]]], tuple | None]:
+        """On the bus thread: (events after `cursor`, and if there are none, (last_seq, closed) or None)."""
+        db = self._bus._db
+        if touch:
+            db.execute(
+                "UPDATE bus_jobs SET touched_at = ? WHERE research_id = ?", (time.time(), self._research_id)
+            )
+        rows = db.execute(
+            "SELECT seq, payload FROM bus_events WHERE research_id = ? AND seq > ? ORDER BY seq",
+            (self._research_id, cursor),
+        ).fetchall()
+        if rows:
+            return [(seq, json.loads(payload)) for seq, payload in rows], None
+        job = db.execute(
+            "SELECT last_seq, closed FROM bus_jobs WHERE research_id = ?", (self._research_id,)
+        ).fetchone()
+        return [], job
+
+    def close(self) -> None:
+        counts = self._bus._local_subscribers
+        counts[self._research_id] = counts.get(self._research_id, 1) - 1
+        if counts[self._research_id] <= 0:
+            counts.pop(self._research_id, None)
+
+
+# ── Many hosts ───────────────────────────────────────────────────────────────
+
+class RedisEventBus(EventBus):
+    """
+    Events in Redis streams. Stream entry IDs are "0-<seq>", so the SSE event ID
+    maps directly onto XRANGE / XREAD positions. The stream is trimmed to the
+    retention window; report sections are also kept in a side list.
+
+    Keys (all expire after NEXUS_EVENT_BUS_RETENTION_SECONDS):
+      nexus:job:<id>:events    stream of {"e": <event json>}
+      nexus:job:<id>:sections  list of [seq, event json] for report_section events
+      nexus:job:<id>:meta      hash: last_seq, closed, touched_at
+
+    Every write after `create` runs as a script that first checks the meta
+    hash still exists, so a publish or a reader's touch after the job was
+    discarded or expired never recreates its keys without a TTL; each one
+    also refreshes the TTL on all three keys.
+    """
+
+    # KEYS: events, sections, meta; ARGV: retention seconds, …
+    _REFRESH = "for i = 1, 3 do redis.call('EXPIRE', KEYS[i], ARGV[1]) end\n"
+    # ARGV: …, payload, is_section ("1" | "0"), max_events → seq, or 0 if the job is gone
+    _PUBLISH = (
+        "if redis.call('EXISTS', KEYS[3]) == 0 then return 0 end\n"
+        "local seq = redis.call('HINCRBY', KEYS[3], 'last_seq', 1)\n"
+        "redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[4], '0-' .. seq, 'e', ARGV[2])\n"
+        "if ARGV[3] == '1' then redis.call('RPUSH', KEYS[2], cjson.encode({seq, ARGV[2]})) end\n"
+        + _REFRESH
+        + "return seq"
+    )
+    # ARGV: …, field, value → 1, or 0 if the job is gone
+    _SET = (
+        "if redis.call('EXISTS', KEYS[3]) == 0 then return 0 end\n"
+        "redis.call('HSET', KEYS[3], ARGV[2], ARGV[3])\n"
+        + _REFRESH
+        + "return 1"
+    )
+
+    def __init__(self, url: str = EVENT_BUS_URL, client=None, max_events: int = EVENT_LOG_MAX_EVENTS):
+        if client is None:
+            try:
+                import redis.asyncio as aioredis
+            except ImportError as exc:
+                raise RuntimeError(
+                    "NEXUS_EVENT_BUS=redis requires the 'redis' package (pip install redis)"
+                ) from exc
+            client = aioredis.from_url(url, decode_responses=True)
+        self._redis = client
+        self._max_events = max(1, max_events)
+        self._local_subscribers: dict[str, int] = {}
+
+    async def stop(self) -> None:
+        await self._redis.aclose()
+
+    @staticmethod
+    def _keys(research_id: str) -> tuple[str, str, str]:
+        base = f"nexus:job:{research_id}"
+        return f"{base}:events", f"{base}:sections", f"{base}:meta"
+
+    async def _set(self, research_id: str, field: str, value: Any) -> bool:
+        """Set a meta field and refresh the TTLs — unless the job is gone."""
+        keys = self._keys(research_id)
+        return bool(await self._redis.eval(self._SET, len(keys), *keys, EVENT_BUS_RETENTION_SECONDS, field, value))
+
+    async def create(self, research_id: str) -> None:
+        _, _, meta = self._keys(research_id)
+        await self._redis.hset(meta, mapping={"last_seq": 0, "closed": 0, "touched_at": time.time()})
+        await self._redis.expire(meta, EVENT_BUS_RETENTION_SECONDS)
+
+    async def publish(self, research_id: str, event: dict[str, Any]) -> int:
+        keys = self._keys(research_id)
+        is_section = "1" if event.get("type") == "report_section" else "0"
+        seq = await self._redis.eval(
+            self._PUBLISH, len(keys), *keys,
+            EVENT_BUS_RETENTION_SECONDS, json.dumps(event), is_section, self._max_events,
+        )
+        if not seq:
+            raise KeyError(research_id)  # discarded or expired, like the other backends
+        return int(seq)
+
+    async def close(self, research_id: str) -> None:
+        await self._set(research_id, "closed", 1)
+
+    async def status(self, research_id: str) -> dict[str, Any] | None:
+        _, _, meta = self._keys(research_id)
+        fields = await self._redis.hgetall(meta)
+        if not fields:
+            return None
+        return {
+            "last_event_id": int(fields.get("last_seq", 0)),
+            "done": fields.get("closed") == "1",
+            "subscribers": self._local_subscribers.get(research_id, 0),
+            "last_access": float(fields.get("touched_at", 0)),
+        }
+
+    def subscribe(self, research_id: str, after: int = 0):
+        return _RedisSubscription(self, research_id, after)
+
+    async def discard(self, research_id: str) -> None:
+        await self._redis.delete(*self._keys(research_id))
+
+
+class _RedisSubscription:
+    _BLOCK_MS = 1000  # upper bound on how late a reader notices the job closing
+
+    def __init__(self, bus: RedisEventBus, research_id: str, after: int):
+        self._bus = bus
+        self._research_id = research_id
+        self._keys = bus._keys(research_id)
+        self.cursor = after
+        bus._local_subscribers[research_id] = bus._local_subscribers.get(research_id, 0) + 1
+
+    async def next_batch(self, timeout: float) -> list[tuple[int, dict[str, Any]]] | None:
+        redis = self._bus._redis
+        events, sections, meta = self._keys
+        deadline = time.monotonic() + timeout
+        if not await self._bus._set(self._research_id, "touched_at", time.time()):
+            return None  # discarded or expired
+
+        while True:
+            entries = await redis.xrange(events, min=f"0-{self.cursor + 1}", max="+")
+            batch = [(int(entry_id.split("-")[1]), json.loads(fields["e"])) for entry_id, fields in entries]
+
+            # Trimmed past our cursor: fill the gap with the retained sections
+            first = batch[0][0] if batch else None
+            if first is not None and first > self.cursor + 1:
+                gap = [json.loads(item) for item in await redis.lrange(sections, 0, -1)]
+                batch = [(seq, json.loads(p)) for seq, p in gap if self.cursor < seq < first] + batch
+
+            if batch:
+                self.cursor = batch[-1][0]
+                return batch
+
+            last_seq, closed = await redis.hmget(meta, "last_seq", "closed")
+            if last_seq is None or (closed == "1" and self.cursor >= int(last_seq)):
+                return None
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            if remaining_ms <= 0:
+                return []
+            await redis.xread({events: f"0-{self.cursor}"}, block=min(remaining_ms, self._BLOCK_MS), count=1)
+
+    def close(self) -> None:
+        counts = self._bus._local_subscribers
+        counts[self._research_id] = counts.get(self._research_id, 1) - 1
+        if counts[self._research_id] <= 0:
+            counts.pop(self._research_id, None)
+
+
+def create_event_bus(kind: str = EVENT_BUS) -> EventBus:
+    """Event bus backend selected by NEXUS_EVENT_BUS (memory | sqlite | redis)."""
+    if kind == "memory":
+        return MemoryEventBus()
+    if kind == "sqlite":
+        return SqliteEventBus()
+    if kind == "redis":
+        return RedisEventBus()
+    raise RuntimeError(f"Unknown NEXUS_EVENT_BUS backend: {kind!r}")
@@ -0,0 +1,90 @@
+"""
+EventLog — the sequence-numbered, memory-capped event history of one research job.
+
+Every event the agent emits gets a monotonically increasing sequence number,
+which the SSE stream sends as the `id:` field. A client that reconnects with
+`Last-Event-ID: N` is replayed everything after N that is still retained,
+then continues live (see hub.py) — without touching Claude or Tavily again.
+
+Memory is bounded:
+  - a ring buffer keeps the most recent EVENT_LOG_MAX_EVENTS events
+  - report_section events are always retained (the report must survive a
+    reconnect), and large ones are spilled to a temp file on disk
+"""
+import json
+import os
+import shutil
+import tempfile
+from collections import deque
+from typing import Any
+
+EVENT_LOG_MAX_EVENTS = int(os.getenv("NEXUS_EVENT_LOG_MAX_EVENTS", "1000"))
+EVENT_SPILL_BYTES = int(os.getenv("NEXUS_EVENT_SPILL_BYTES", "16384"))
+
+
+class _Spilled:
+    """Placeholder for an event whose JSON lives in a file."""
+    __slots__ = ("path",)
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> dict[str, Any]:
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+class EventLog:
+    def __init__(self, max_events: int = EVENT_LOG_MAX_EVENTS, spill_bytes: int = EVENT_SPILL_BYTES):
+        self._ring: deque[tuple[int, Any]] = deque(maxlen=max(1, max_events))
+        self._sections: list[tuple[int, Any]] = []
+        self._spill_bytes = spill_bytes
+        self._spill_dir: str | None = None
+        self.last_seq = 0
+        self.closed = False
+
+    def append(self, event: dict[str, Any]) -> int:
+        """Record an event. Returns its sequence number."""
+        self.last_seq += 1
+        stored: Any = event
+        if event.get("type") == "report_section":
+            stored = self._maybe_spill(self.last_seq, event)
+            self._sections.append((self.last_seq, stored))
+        self._ring.append((self.last_seq, stored))
+        return self.last_seq
+
+    def close(self) -> None:
+        """Mark the log complete — no more events will be appended."""
+        self.closed = True
+
+    def replay(self, after: int = 0) -> list[tuple[int, dict[str, Any]]]:
+        """
+        All retained events with a sequence number greater than `after`, in order.
+        If `after` is older than the ring buffer, retained report sections from
+        the gap are included so the client still ends up with the full report.
+        """
+        ring_start = self._ring[0][0] if self._ring else self.last_seq + 1
+        entries: list[tuple[int, Any]] = []
+        if after + 1 < ring_start:
+            entries.extend((seq, ev) for seq, ev in self._sections if after < seq < ring_start)
+        entries.extend((seq, ev) for seq, ev in self._ring if seq > after)
+        return [(seq, ev.load() if isinstance(ev, _Spilled) else ev) for seq, ev in entries]
+
+    def discard(self) -> None:
+        """Drop everything, including spill files."""
+        self._ring.clear()
+        self._sections.clear()
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def _maybe_spill(self, seq: int, event: dict[str, Any]) -> Any:
+        payload = json.dumps(event)
+        if len(payload) < self._spill_bytes:
+            return event
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="nexus-job-")
+        path = os.path.join(self._spill_dir, f"{seq}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        return _Spilled(path)
@@ -0,0 +1,122 @@
+"""
+EventHub — broadcast of one job's events to any number of subscribers.
+
+The agent publishes each event once; the hub records it in the job's EventLog
+and pushes it into every subscriber's bounded buffer. Each subscriber has its
+own cursor, so N viewers of one job cost one agent run rather than N.
+
+Slow consumers never block the producer: when a subscriber's buffer is full it
+is marked as lagging and its buffer is dropped. On its next read it resyncs
+from the EventLog — a snapshot of what it missed (see EventLog.replay) —
+and then continues live.
+"""
+import asyncio
+import os
+from collections import deque
+from typing import Any
+
+from .event_log import EventLog
+
+SUBSCRIBER_BUFFER = int(os.getenv("NEXUS_SUBSCRIBER_BUFFER", "256"))
+
+
+class Subscription:
+    def __init__(self, hub: "EventHub", after: int, buffer_size: int):
+        self._hub = hub
+        self._buffer: deque[tuple[int, dict[str, Any]]] = deque()
+        self._buffer_size = buffer_size
+        self._wake = asyncio.Event()
+        self._lagged = False
+        self._snapshot_pending = True  # first read replays the log after `after`
+        self.cursor = after
+        self.resyncs = 0
+
+    async def next_batch(self, timeout: float) -> list[tuple[int, dict[str, Any]]] | None:
+        """
+        Next events for this subscriber, in order.
+        Returns [] on timeout (caller sends a heartbeat) and None once the job
+        is finished and this subscriber has seen everything.
+        """
+        while True:
+            batch = self._take()
+            if batch:
+                self.cursor = batch[-1][0]
+                return batch
+            if self._hub.closed and (self.cursor >= self._hub.log.last_seq or self._hub.discarded):
+                return None
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+
+    def close(self) -> None:
+        self._hub._unsubscribe(self)
+
+    def _take(self) -> list[tuple[int, dict[str, Any]]]:
+        if self._lagged or self._snapshot_pending:
+            if self._lagged:
+                self.resyncs += 1
+            self._lagged = self._snapshot_pending = False
+            self._buffer.clear()
+            return self._hub.log.replay(self.cursor)
+        batch = [(seq, ev) for seq, ev in self._buffer if seq > self.cursor]
+        self._buffer.clear()
+        return batch
+
+    def _push(self, seq: int, event: dict[str, Any]) -> None:
+        if not self._lagged:
+            if len(self._buffer) >= self._buffer_size:
+                # Too slow — drop the buffer, resync from the log on the next read
+                self._lagged = True
+                self._buffer.clear()
+            else:
+                self._buffer.append((seq, event))
+        self._wake.set()
+
+
+class EventHub:
+    def __init__(self, log: EventLog | None = None, buffer_size: int = SUBSCRIBER_BUFFER):
+        self.log = log or EventLog()
+        self._buffer_size = max(1, buffer_size)
+        self._subscribers: set[Subscription] = set()
+        self.peak_subscribers = 0
+        self.discarded = False
+
+    @property
+    def closed(self) -> bool:
+        return self.log.closed
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: dict[str, Any]) -> int:
+        """Record an event and fan it out. Never blocks. Returns its sequence number."""
+        seq = self.log.append(event)
+        for sub in self._subscribers:
+            sub._push(seq, event)
+        return seq
+
+    def close(self) -> None:
+        """No more events — subscribers finish once they have caught up."""
+        self.log.close()
+        for sub in self._subscribers:
+            sub._wake.set()
+
+    def subscribe(self, after: int = 0) -> Subscription:
+        """New independent reader starting after sequence number `after`."""
+        sub = Subscription(self, after, self._buffer_size)
+        self._subscribers.add(sub)
+        self.peak_subscribers = max(self.peak_subscribers, len(self._subscribers))
+        return sub
+
+    def discard(self) -> None:
+        """Drop the job's events; waiting subscribers wake up and finish."""
+        self.discarded = True
+        self.close()
+        self._subscribers.clear()
+        self.log.discard()
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        self._subscribers.discard(sub)
@@ -0,0 +1,271 @@
+"""
+MuxSession — many research jobs over one WebSocket (GET /api/research/ws).
+
+A dashboard following dozens of jobs would otherwise hold one EventSource
+per job and run into the browser's per-host connection limit. One socket
+carries them all; every message is a JSON object with an `op`. Client
+messages may carry a `ref`, echoed on the reply.
+
+  client → server
+    {"op": "start", "query", ...ResearchRequest fields, "credit"?}
+    {"op": "subscribe", "research_id", "after"?, "credit"?}
+    {"op": "credit", "research_id", "n"}
+    {"op": "unsubscribe", "research_id"}
+    {"op": "cancel", "research_id"}
+
+  server → client
+    {"op": "started", "research_id", "cached"}         (then subscribed from 0)
+    {"op": "subscribed", "research_id", "after"}
+    {"op": "events", "research_id", "events": [[seq, event], ...]}
+    {"op": "end", "research_id"}                        (the job's stream_end)
+    {"op": "unsubscribed", "research_id"}
+    {"op": "status", ...GET /api/research/{id}}         (reply to cancel)
+    {"op": "error", "status", "detail", "research_id"?, "retry_after"?}
+
+Streams are the same bus subscriptions the SSE endpoint reads, with the same
+event ids: `after` resumes like Last-Event-ID, and `?protocol=2` selects the
+compact payloads and delta coalescing of utils/streaming.py.
+
+Flow control is per job. A stream may send as many events as the client has
+granted it credit (`credit` on subscribe, WS_INITIAL_CREDIT by default;
+`{"op": "credit", "n"}` grants more as the client catches up). A job out of
+credit stops reading its subscription, so one slow panel never holds back the
+others on the socket — and the hub treats it as any slow SSE subscriber: its
+buffer is dropped and it resyncs from the event log once credit arrives.
+Control messages need no credit. Below that, all streams share a bounded
+send queue, so a socket the client stops reading stops every stream.
+
+Closing the socket drops its subscriptions; the jobs keep running until the
+registry's TTL (or NEXUS_CANCEL_UNWATCHED_SECONDS) catches up with them.
+"""
+import asyncio
+import json
+import os
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .registry import Job, JobRegistry, RegistryFull
+from utils.metrics import WS_EVENTS
+from utils.streaming import SSEEncoder, compact_event, dumps
+
+WS_INITIAL_CREDIT = int(os.getenv("NEXUS_WS_INITIAL_CREDIT", "256"))    # events per job before a grant
+WS_MAX_STREAMS = int(os.getenv("NEXUS_WS_MAX_STREAMS", "100"))          # jobs subscribed per socket
+WS_SEND_QUEUE = int(os.getenv("NEXUS_WS_SEND_QUEUE", "64"))             # messages waiting for the socket
+
+_stats = {"connections": 0, "streams": 0}
+
+
+def mux_stats() -> dict[str, Any]:
+    return dict(_stats)
+
+
+class _MuxError(Exception):
+    def __init__(self, status: int, detail: str, **extra: Any):
+        super().__init__(detail)
+        self.status = status
+        self.extra = extra
+
+
+class _Stream:
+    """One subscribed job: its bus subscription, credit and pump task."""
+
+    def __init__(self, research_id: str, job: Job | None, subscription: Any, credit: int):
+        self.research_id = research_id
+        self.job = job  # None when the job runs in another worker
+        self.subscription = subscription
+        self.credit = credit
+        self.granted = asyncio.Event()
+        if credit > 0:
+            self.granted.set()
+        self.task: asyncio.Task | None = None
+
+    def grant(self, n: int) -> None:
+        self.credit += n
+        if self.credit > 0:
+            self.granted.set()
+
+    def spend(self, n: int) -> None:
+        self.credit -= n
+        if self.credit <= 0:
+            self.granted.clear()
+
+
+class MuxSession:
+    def __init__(
+        self,
+        registry: JobRegistry,
+        start: Callable[[dict[str, Any]], Awaitable[tuple[Job, bool]]],
+        version: int = 1,
+    ):
+        """
+        `start(message)` registers a job from a start message (raising ValueError
+        for an invalid request, RegistryFull when the queue is full).
+        """
+        self._registry = registry
+        self._bus = registry.bus
+        self._start = start
+        self._version = version
+        self._encoder = SSEEncoder(version)  # the SSE path's coalescing policy
+        self._streams: dict[str, _Stream] = {}
+        self._out: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=max(1, WS_SEND_QUEUE))
+
+    async def run(self, receive: Callable[[], Awaitable[str]], send: Callable[[str], Awaitable[None]]) -> None:
+        """Serve the socket until `receive` raises (the client went away)."""
+        _stats["connections"] += 1
+        writer = asyncio.create_task(self._write(send))
+        try:
+            while True:
+                await self._handle(await receive())
+        finally:
+            _stats["connections"] -= 1
+            for research_id in list(self._streams):
+                self._drop(research_id)
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+
+    # ── Client messages ───────────────────────────────────────────────────
+
+    async def _handle(self, text: str) -> None:
+        try:
+            message = json.loads(text)
+        except ValueError:
+            await self._send({"op": "error", "status": 400, "detail": "Messages must be JSON objects."})
+            return
+        if not isinstance(message, dict):
+            await self._send({"op": "error", "status": 400, "detail": "Messages must be JSON objects."})
+            return
+        ref = message.get("ref")
+        research_id = message.get("research_id")
+        try:
+            reply = await self._dispatch(message)
+        except _MuxError as exc:
+            reply = {"op": "error", "status": exc.status, "detail": str(exc), **exc.extra}
+            if isinstance(research_id, str):
+                reply["research_id"] = research_id
+        if reply is not None:
+            if ref is not None:
+                reply["ref"] = ref
+            await self._send(reply)
+        # New streams start after the reply, so it precedes their first events
+        for stream in self._streams.values():
+            if stream.task is None:
+                stream.task = asyncio.create_task(self._pump(stream))
+
+    async def _dispatch(self, message: dict[str, Any]) -> dict[str, Any] | None:
+        op = message.get("op")
+        if op == "start":
+            return await self._op_start(message)
+        research_id = message.get("research_id")
+        if op not in ("subscribe", "credit", "unsubscribe", "cancel"):
+            raise _MuxError(400, f"Unknown op {op!r}.")
+        if not isinstance(research_id, str):
+            raise _MuxError(400, f"{op} needs a research_id.")
+        if op == "subscribe":
+            after = _count(message, "after", 0)
+            await self._subscribe(research_id, after, _count(message, "credit", WS_INITIAL_CREDIT))
+            return {"op": "subscribed", "research_id": research_id, "after": after}
+        if op == "credit":
+            n = _count(message, "n", 0)
+            stream = self._streams.get(research_id)
+            if stream is not None:  # a grant may cross the stream's end on the wire
+                stream.grant(n)
+            return None
+        if op == "unsubscribe":
+            if research_id not in self._streams:
+                raise _MuxError(404, "Not subscribed to this research job.")
+            self._drop(research_id)
+            return {"op": "unsubscribed", "research_id": research_id}
+        return await self._op_cancel(research_id)
+
+    async def _op_start(self, message: dict[str, Any]) -> dict[str, Any]:
+        if len(self._streams) >= WS_MAX_STREAMS:
+            raise _MuxError(429, f"At most {WS_MAX_STREAMS} research jobs per connection.")
+        credit = _count(message, "credit", WS_INITIAL_CREDIT)
+        try:
+            job, cached = await self._start(message)
+        except ValueError as exc:
+            raise _MuxError(422, str(exc)) from None
+        except RegistryFull as exc:
+            raise _MuxError(429, str(exc), retry_after=exc.retry_after) from None
+        await self._subscribe(job.research_id, 0, credit)
+        return {"op": "started", "research_id": job.research_id, "cached": cached}
+
+    async def _op_cancel(self, research_id: str) -> dict[str, Any]:
+        job = await self._registry.cancel(research_id, "client")
+        if job is None:
+            if await self._bus.status(research_id) is not None:
+                # Only the process running a job can stop it
+                raise _MuxError(409, "Research job is running in another worker.")
+            raise _MuxError(404, "Research job not found or expired.")
+        return {"op": "status", **await job.status()}
+
+    # ── Streams ───────────────────────────────────────────────────────────
+
+    async def _subscribe(self, research_id: str, after: int, credit: int) -> None:
+        if research_id in self._streams:
+            raise _MuxError(409, "Already subscribed to this research job.")
+        if len(self._streams) >= WS_MAX_STREAMS:
+            raise _MuxError(429, f"At most {WS_MAX_STREAMS} research jobs per connection.")
+        # The job may run in this process or (with a shared bus) in another worker
+        job = self._registry.get(research_id)
+        if job is None and await self._bus.status(research_id) is None:
+            raise _MuxError(404, "Research job not found or expired.")
+        subscription = self._bus.subscribe(research_id, after)
+        if subscription is None:
+            raise _MuxError(404, "Research job not found or expired.")
+        self._streams[research_id] = _Stream(research_id, job, subscription, credit)
+        _stats["streams"] += 1
+
+    def _drop(self, research_id: str) -> None:
+        stream = self._streams.pop(research_id, None)
+        if stream is None:
+            return
+        _stats["streams"] -= 1
+        if stream.task is not None and stream.task is not asyncio.current_task():
+            stream.task.cancel()
+        stream.subscription.close()
+        if stream.job is not None:
+            self._registry.subscriber_left(stream.job)  # the TTL (and unwatched grace period) count from here
+
+    async def _pump(self, stream: _Stream) -> None:
+        """Relay one job's events while it has credit; then its end."""
+        pending: list[tuple[int, dict[str, Any]]] = []
+        while True:
+            if not pending:
+                batch = await stream.subscription.next_batch(timeout=60.0)
+                if batch is None:
+                    # Research is done and this client has everything
+                    break
+                if batch and self._encoder.should_coalesce(batch):
+                    # Let a burst of streaming deltas go out as one message
+                    await asyncio.sleep(self._encoder.coalesce_seconds)
+                    batch += await stream.subscription.next_batch(timeout=0) or []
+                pending = batch
+                continue
+            await stream.granted.wait()
+            n = min(stream.credit, len(pending))
+            chunk, pending = pending[:n], pending[n:]
+            stream.spend(n)
+            if self._version >= 2:
+                chunk = [(seq, compact_event(event)) for seq, event in chunk]
+            await self._send({"op": "events", "research_id": stream.research_id, "events": chunk})
+            WS_EVENTS.inc(n)
+        await self._send({"op": "end", "research_id": stream.research_id})
+        self._drop(stream.research_id)
+
+    # ── Socket ────────────────────────────────────────────────────────────
+
+    async def _send(self, message: dict[str, Any]) -> None:
+        await self._out.put(message)
+
+    async def _write(self, send: Callable[[str], Awaitable[None]]) -> None:
+        while True:
+            message = await self._out.get()
+            await send(dumps(message).decode())
+
+
+def _count(message: dict[str, Any], key: str, default: int) -> int:
+    value = message.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise _MuxError(400, f"{key} must be a non-negative integer.")
+    return value
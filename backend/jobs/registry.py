@@ -0,0 +1,386 @@
+"""
+JobRegistry — lifecycle, admission control and expiry for research jobs.
+
+  - Every job has a state (queued → running → done / failed / cancelled /
+    expired) and creation / last-access timestamps.
+  - At most MAX_RUNNING_JOBS orchestrators run at once; further jobs wait in
+    a queue of at most MAX_WAITING_JOBS. Beyond that, submit() raises
+    RegistryFull and the API answers 429 with a Retry-After estimate. Free
+    slots go to waiting jobs in priority order (interactive before batch),
+    FIFO within a priority — as the upstream scheduler grants calls.
+  - A background sweeper evicts jobs nobody is watching: finished jobs
+    JOB_TTL_SECONDS after their last access, and queued/running jobs that have
+    had no subscriber for the same period (their task is cancelled).
+  - cancel() stops a queued or running job on request (DELETE
+    /api/research/{id}). With CANCEL_UNWATCHED_SECONDS set, a job is also
+    cancelled once it has had no subscriber for that long — long before the
+    TTL. Cancelling the task aborts the agent's in-flight upstream calls; the
+    tokens the job would still have used are estimated from the average
+    finished job and reported in stats().
+
+Events go through an EventBus (see bus.py), so the registry only tracks the
+jobs *this* process runs; streams may be served by any process. Per-job
+memory is bounded by the bus backend; the registry bounds the number of jobs.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any
+
+from .bus import EventBus, MemoryEventBus
+from utils.metrics import JOB_SECONDS, JOBS_FINISHED
+
+log = logging.getLogger(__name__)
+
+MAX_RUNNING_JOBS = int(os.getenv("NEXUS_MAX_RUNNING_JOBS", "8"))
+MAX_WAITING_JOBS = int(os.getenv("NEXUS_MAX_WAITING_JOBS", "32"))
+JOB_TTL_SECONDS = float(os.getenv("NEXUS_JOB_TTL_SECONDS", "600"))
+SWEEP_INTERVAL_SECONDS = float(os.getenv("NEXUS_SWEEP_INTERVAL_SECONDS", "30"))
+CANCEL_UNWATCHED_SECONDS = float(os.getenv("NEXUS_CANCEL_UNWATCHED_SECONDS", "0"))  # 0 = off
+
+_PRIORITY_RANK = {"interactive": 0, "batch": 1}  # as agent/scheduler.py's PRIORITIES
+_USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+
+class JobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    EXPIRED = "expired"
+
+
+_FINISHED = (JobState.DONE, JobState.FAILED, JobState.CANCELLED, JobState.EXPIRED)
+
+
+@dataclass
+class Job:
+    research_id: str
+    query: str
+    bus: EventBus = field(repr=False)
+    priority: str = "interactive"
+    state: JobState = JobState.QUEUED
+    created_at: float = field(default_factory=time.time)
+    last_access: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    task: asyncio.Task | None = None
+    cancel_reason: str | None = None
+    tokens: int = 0  # Claude tokens used so far (all usage fields)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in _FINISHED
+
+    def touch(self) -> None:
+        self.last_access = time.time()
+
+    def record_usage(self, event: dict[str, Any]) -> None:
+        """Count a `usage` event's tokens towards the job's spend."""
+        self.tokens += sum(event.get(f) or 0 for f in _USAGE_FIELDS)
+
+    async def publish(self, event: dict[str, Any]) -> int:
+        """Append an event to this job's stream on the bus."""
+        return await self.bus.publish(self.research_id, event)
+
+    async def status(self) -> dict[str, Any]:
+        stream = await self.bus.status(self.research_id) or {}
+        return {
+            "research_id": self.research_id,
+            "state": self.state.value,
+            "done": stream.get("done", self.finished),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "last_event_id": stream.get("last_event_id", 0),
+            "subscribers": stream.get("subscribers", 0),
+            "cancel_reason": self.cancel_reason,
+        }
+
+
+class RegistryFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Too many research jobs in progress. Try again later.")
+        self.retry_after = retry_after
+
+
+class _RunSlots:
+    """Run slots, granted in priority order and FIFO within a priority."""
+
+    def __init__(self, limit: int):
+        self._free = limit
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    def request(self, rank: int) -> asyncio.Future:
+        """A ticket that resolves once the job holds a slot (at once if one is free)."""
+        ticket = asyncio.get_running_loop().create_future()
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            ticket.set_result(None)
+        else:
+            heapq.heappush(self._waiters, (rank, next(self._order), ticket))
+        return ticket
+
+    def position(self, ticket: asyncio.Future) -> int:
+        """1-based place of a waiting ticket in the queue."""
+        mine = next(entry[:2] for entry in self._waiters if entry[2] is ticket)
+        return 1 + sum(1 for rank, order, waiter in self._waiters if not waiter.done() and (rank, order) < mine)
+
+    def release(self, ticket: asyncio.Future) -> None:
+        """The ticket's job is done: hand its slot on, or give up its place in the queue."""
+        if not ticket.done():
+            ticket.cancel()  # left while waiting; dropped from the heap when it reaches the top
+            return
+        if ticket.cancelled():
+            return
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._free += 1
+
+
+class JobRegistry:
+    def __init__(
+        self,
+        bus: EventBus | None = None,
+        max_running: int = MAX_RUNNING_JOBS,
+        max_waiting: int = MAX_WAITING_JOBS,
+        ttl: float = JOB_TTL_SECONDS,
+        sweep_interval: float = SWEEP_INTERVAL_SECONDS,
+        cancel_unwatched: float = CANCEL_UNWATCHED_SECONDS,
+    ):
+        self.bus = bus or MemoryEventBus()
+        self._jobs: dict[str, Job] = {}
+        self._max_running = max(1, max_running)
+        self._max_waiting = max(0, max_waiting)
+        self._slots = _RunSlots(self._max_running)
+        self._admitted = 0  # slot-needing jobs submitted and not finished (queued + running)
+        self._ttl = ttl
+        self._sweep_interval = sweep_interval
+        self._sweeper: asyncio.Task | None = None
+        self._cancel_unwatched = max(0.0, cancel_unwatched)
+        self._watchdogs: set[asyncio.Task] = set()
+        self._avg_run_seconds = 60.0  # moving average, used for Retry-After
+        self._avg_job_tokens: float | None = None  # moving average of finished jobs, for tokens_saved
+        self.expired_total = 0
+        self.rejected_total = 0
+        self.cancelled: dict[str, int] = {}  # reason → count
+        self.cancelled_tokens_spent = 0
+        self.cancelled_tokens_saved = 0
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        for job in list(self._jobs.values()):
+            await self._evict(job)
+
+    # ── Jobs ──────────────────────────────────────────────────────────────
+
+    async def submit(
+        self,
+        query: str,
+        runner: Callable[[Job], Awaitable[None]],
+        priority: str = "interactive",
+        needs_slot: bool = True,
+    ) -> Job:
+        """
+        Register a job and schedule `runner(job)` once a run slot is free —
+        waiting jobs get slots in `priority` order. Cheap runners (e.g. cache
+        replays) pass needs_slot=False to start at once.
+        """
+        # Counted here, not from the slots: a burst of submits all run before
+        # any job's task has taken its slot
+        waiting = self._admitted - self._max_running  # jobs queued ahead of this one; < 0: a slot is free
+        if needs_slot and waiting >= self._max_waiting:
+            self.rejected_total += 1
+            raise RegistryFull(self._retry_after(waiting))
+
+        job = Job(research_id=str(uuid.uuid4()), query=query, bus=self.bus, priority=priority)
+        ticket = None
+        if needs_slot:
+            self._admitted += 1
+            # Taken now, so a burst of submits queues in order of arrival
+            ticket = self._slots.request(_PRIORITY_RANK.get(priority, 0))
+        try:
+            self._jobs[job.research_id] = job
+            await self.bus.create(job.research_id)
+            if ticket is not None and not ticket.done():
+                await job.publish({"type": "queued", "position": self._slots.position(ticket)})
+        except BaseException:
+            self._jobs.pop(job.research_id, None)
+            if ticket is not None:
+                self._left_admission(ticket)
+            raise
+        job.task = asyncio.create_task(self._run(job, runner, ticket))
+        if ticket is not None:
+            # Also when the task is cancelled before it ever ran
+            job.task.add_done_callback(lambda _: self._left_admission(ticket))
+        self._watch(job, self._cancel_unwatched)  # in case nobody ever subscribes
+        return job
+
+    def get(self, research_id: str) -> Job | None:
+        job = self._jobs.get(research_id)
+        if job is not None:
+            job.touch()
+        return job
+
+    async def cancel(self, research_id: str, reason: str = "client") -> Job | None:
+        """
+        Cancel a queued or running job and wait for it to stop. Returns the job
+        (whatever its state — finished jobs are left alone), or None if unknown.
+        """
+        job = self._jobs.get(research_id)
+        if job is None:
+            return None
+        if job.task is not None and not job.task.done():
+            job.cancel_reason = reason
+            job.task.cancel()
+            await asyncio.wait({job.task})
+        return job
+
+    def subscriber_left(self, job: Job) -> None:
+        """A subscriber went away: the job's TTL and unwatched grace period start now."""
+        job.touch()
+        self._watch(job, self._cancel_unwatched)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": self._count(JobState.QUEUED),
+            "running": self._count(JobState.RUNNING),
+            "retained": len(self._jobs),
+            "max_running": self._max_running,
+            "max_waiting": self._max_waiting,
+            "expired_total": self.expired_total,
+            "rejected_total": self.rejected_total,
+            "cancelled_total": sum(self.cancelled.values()),
+            "cancelled_unwatched_total": self.cancelled.get("unwatched", 0),
+            "cancelled_tokens_spent": self.cancelled_tokens_spent,
+            "cancelled_tokens_saved": self.cancelled_tokens_saved,
+        }
+
+    async def _run(
+        self, job: Job, runner: Callable[[Job], Awaitable[None]], ticket: asyncio.Future | None = None
+    ) -> None:
+        needs_slot = ticket is not None
+        try:
+            if ticket is not None:
+                await asyncio.shield(ticket)  # released by _left_admission once the task is done
+            job.state = JobState.RUNNING
+            job.started_at = time.time()
+            await runner(job)
+            job.state = JobState.DONE
+        except asyncio.CancelledError:
+            job.state = JobState.CANCELLED if job.cancel_reason else JobState.EXPIRED
+            raise
+        except Exception:
+            job.state = JobState.FAILED
+            raise
+        finally:
+            job.finished_at = time.time()
+            JOBS_FINISHED.inc(state=job.state.value)
+            if needs_slot and job.started_at is not None:
+                elapsed = job.finished_at - job.started_at
+                JOB_SECONDS.observe(elapsed)
+                self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * elapsed
+            if job.state is JobState.CANCELLED:
+                self._count_cancelled(job)
+                await job.publish({"type": "cancelled", "reason": job.cancel_reason})
+            elif job.state is JobState.DONE and needs_slot and job.tokens:
+                avg = self._avg_job_tokens
+                self._avg_job_tokens = job.tokens if avg is None else 0.8 * avg + 0.2 * job.tokens
+            await self.bus.close(job.research_id)
+
+    def _left_admission(self, ticket: asyncio.Future) -> None:
+        self._admitted -= 1
+        self._slots.release(ticket)
+
+    def _count_cancelled(self, job: Job) -> None:
+        reason = job.cancel_reason or "client"
+        self.cancelled[reason] = self.cancelled.get(reason, 0) + 1
+        self.cancelled_tokens_spent += job.tokens
+        # What the job would still have used, had it run as long as the average one
+        saved = max(0, int((self._avg_job_tokens or 0) - job.tokens))
+        self.cancelled_tokens_saved += saved
+
+    # ── Unwatched jobs ────────────────────────────────────────────────────
+
+    def _watch(self, job: Job, delay: float) -> None:
+        """Check `delay` seconds from now whether anyone still watches the job."""
+        if delay <= 0 or job.finished:
+            return
+        asyncio.get_running_loop().call_later(delay, self._spawn_watchdog, job)
+
+    def _spawn_watchdog(self, job: Job) -> None:
+        task = asyncio.create_task(self._check_unwatched(job))
+        self._watchdogs.add(task)
+        task.add_done_callback(self._watchdogs.discard)
+
+    async def _check_unwatched(self, job: Job) -> None:
+        if job.finished or self._jobs.get(job.research_id) is not job:
+            return
+        stream = await self.bus.status(job.research_id) or {}
+        if stream.get("subscribers"):
+            return  # checked again when they leave
+        idle = time.time() - max(job.last_access, stream.get("last_access") or 0)
+        if idle < self._cancel_unwatched:
+            self._watch(job, self._cancel_unwatched - idle)  # someone came and went since
+            return
+        log.info("Cancelling %s: no subscriber for %.0fs", job.research_id[:8], idle)
+        await self.cancel(job.research_id, "unwatched")
+
+    # ── Expiry ────────────────────────────────────────────────────────────
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_interval)
+            await self.sweep()
+
+    async def sweep(self) -> int:
+        """Evict jobs nobody has looked at for `ttl` seconds. Returns the count."""
+        now = time.time()
+        expired = []
+        for job in list(self._jobs.values()):
+            stream = await self.bus.status(job.research_id) or {}
+            if stream.get("subscribers"):
+                continue
+            # Subscribers in other processes refresh the stream's last_access
+            last_access = max(job.last_access, stream.get("last_access") or 0)
+            if now - last_access > self._ttl:
+                expired.append(job)
+            elif self._cancel_unwatched and not job.finished and now - last_access > self._cancel_unwatched:
+                # Its last subscriber was in another process — no local watchdog was armed
+                await self.cancel(job.research_id, "unwatched")
+        for job in expired:
+            await self._evict(job)
+        self.expired_total += len(expired)
+        return len(expired)
+
+    async def _evict(self, job: Job) -> None:
+        self._jobs.pop(job.research_id, None)
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+        await self.bus.discard(job.research_id)
+
+    def _count(self, state: JobState) -> int:
+        return sum(1 for job in self._jobs.values() if job.state is state)
+
+    def _retry_after(self, waiting: int) -> int:
+        estimate = self._avg_run_seconds * (waiting + 1) / self._max_running
+        return int(min(600, max(1, estimate)))
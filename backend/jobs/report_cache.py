@@ -0,0 +1,243 @@
+"""
+ReportCache — finished research jobs, replayable for repeated questions.
+
+When a job completes successfully its recorded event sequence is stored under
+the normalized query. A later request for the same — or nearly the same —
+question ("how does CRISPR work" / "Explain how CRISPR works?") is
+answered by replaying those events over SSE instead of running the agent.
+
+Each query is reduced to its set of content words (stopwords dropped, plurals
+stemmed). Two queries are near-duplicates when every content word of the
+shorter one is in the longer one, they share at least `_MIN_SHARED_TERMS`
+words, and the Jaccard similarity of the two sets reaches
+REPORT_CACHE_SIMILARITY — "how does CRISPR work" / "How does CRISPR gene
+editing work?", but never "…for homes" / "…for businesses", where one
+distinctive word changes the question. Matching is fully local: the term sets
+are summarized as MinHash signatures and indexed with LSH bands in SQLite,
+which finds the candidates; each candidate's terms are then compared exactly.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Any
+
+from utils.db_thread import DbThread
+
+REPORT_CACHE_PATH = os.getenv("NEXUS_REPORT_CACHE_PATH", ".cache/report_cache.sqlite3")
+REPORT_CACHE_TTL_SECONDS = float(os.getenv("NEXUS_REPORT_CACHE_TTL", "86400"))  # freshness window
+REPORT_CACHE_SIMILARITY = float(os.getenv("NEXUS_REPORT_CACHE_SIMILARITY", "0.5"))
+
+_MIN_SHARED_TERMS = 2  # a one-word query only matches the same word
+
+_NUM_PERM = 64
+_BAND_ROWS = 2  # 32 bands of 2 rows: sets with Jaccard 0.5 share a band with p > 0.9999
+_MERSENNE = (1 << 61) - 1
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE | 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE,
+    )
+    for i in range(_NUM_PERM)
+]
+
+# Events not worth storing: streaming deltas are superseded by the final events
+_SKIP_EVENTS = {"thinking_delta", "section_delta", "queued", "queue_wait", "upstream_retry"}
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can could did do does for from has have how i in is it its "
+    "me my of on or should the their them there these this to was what when where which "
+    "who why will with would you your about into explain tell please".split()
+)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_query(query: str) -> str:
+    """Exact-match key: lower-case words only, single-spaced."""
+    return " ".join(_WORD.findall(query.lower()))
+
+
+def query_terms(query: str) -> set[str]:
+    """Content words of a query, plurals stemmed — the near-duplicate key."""
+    return {_stem(word) for word in _WORD.findall(query.lower()) if word not in _STOPWORDS}
+
+
+def _stem(word: str) -> str:
+    """Plural → singular for the common English endings; anything else is left alone."""
+    if len(word) <= 4:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"                  # studies → study
+    if word.endswith(("sses", "ches", "shes", "xes", "zes")):
+        return word[:-2]                        # businesses → business, taxes → tax
+    if word.endswith(("ss", "us", "is")):
+        return word                             # business, virus, analysis
+    if word.endswith("s"):
+        return word[:-1]                        # homes → home
+    return word
+
+
+def minhash(terms: set[str]) -> list[int]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), "big") for t in terms
+    ] or [0]
+    return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def _bands(signature: list[int]) -> list[str]:
+    return [
+        f"{i}:" + ",".join(map(str, signature[i:i + _BAND_ROWS]))
+        for i in range(0, _NUM_PERM, _BAND_ROWS)
+    ]
+
+
+def _jaccard(a: set[str], b: set[str]) -> float:
+    return len(a & b) / max(1, len(a | b))
+
+
+def is_near_duplicate(a: set[str], b: set[str], threshold: float = REPORT_CACHE_SIMILARITY) -> bool:
+    """Whether two queries' term sets ask the same question, only one perhaps in more detail."""
+    if a == b:
+        return bool(a)
+    shorter, longer = sorted((a, b), key=len)
+    return (
+        shorter <= longer  # no distinctive word of the shorter query is missing
+        and len(shorter) >= _MIN_SHARED_TERMS
+        and _jaccard(a, b) >= threshold
+    )
+
+
+class ReportCache:
+    def __init__(
+        self,
+        path: str = REPORT_CACHE_PATH,
+        ttl: float = REPORT_CACHE_TTL_SECONDS,
+        similarity: float = REPORT_CACHE_SIMILARITY,
+    ):
+        self._ttl = ttl
+        self._similarity = similarity
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._thread = DbThread("report-cache")
+        self._db = self._thread.call(self._open, path)
+
+    def _open(self, path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " key TEXT PRIMARY KEY, query TEXT NOT NULL, signature TEXT NOT NULL,"
+            " events TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS report_bands ("
+            " band TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (band, key)) WITHOUT ROWID"
+        )
+        stale = time.time() - self._ttl
+        with db:
+            db.execute("BEGIN")
+            db.execute("DELETE FROM report_bands WHERE key IN (SELECT key FROM reports WHERE created_at < ?)", (stale,))
+            db.execute("DELETE FROM reports WHERE created_at < ?", (stale,))
+        return db
+
+    async def lookup(self, query: str) -> dict[str, Any] | None:
+        """
+        Freshest cached report for `query` or a near-duplicate of it:
+        {"query", "similarity", "created_at", "events"} — or None.
+        """
+        found = await self._thread.run(self._find, query, time.time() - self._ttl)
+        if found is None:
+            self.misses += 1
+            return None
+        cached_query, events, created_at = found
+        if normalize_query(cached_query) == normalize_query(query):
+            self.hits += 1
+            similarity = 1.0
+        else:
+            self.near_hits += 1
+            similarity = round(_jaccard(query_terms(query), query_terms(cached_query)), 3)
+        return {"query": cached_query, "similarity": similarity, "created_at": created_at, "events": events}
+
+    async def store(self, query: str, events: list[dict[str, Any]]) -> None:
+        """Record the event sequence of a successfully finished job."""
+        recorded = [e for e in events if e.get("type") not in _SKIP_EVENTS]
+        await self._thread.run(self._insert, query, recorded)
+
+    async def stats(self) -> dict[str, Any]:
+        (entries,) = await self._thread.run(lambda: self._db.execute("SELECT COUNT(*) FROM reports").fetchone())
+        return {"entries": entries, "hits": self.hits, "near_hits": self.near_hits, "misses": self.misses}
+
+    def close(self) -> None:
+        self._thread.call(self._db.close)
+        self._thread.close()
+
+    # On the cache's thread
+
+    def _find(self, query: str, fresh_after: float) -> tuple[str, list[dict[str, Any]], float] | None:
+        """(query, events, created_at) of the exact match, else of the freshest near-duplicate."""
+        row = self._db.execute(
+            "SELECT query, events, created_at FROM reports WHERE key = ? AND created_at >= ?",
+            (normalize_query(query), fresh_after),
+        ).fetchone()
+        if row is not None:
+            return row[0], json.loads(row[1]), row[2]
+
+        terms = query_terms(query)
+        if not terms:
+            return None  # nothing but stopwords: only an exact match says what was asked
+        bands = _bands(minhash(terms))
+        candidates = self._db.execute(
+            "SELECT DISTINCT r.query, r.events, r.created_at"
+            " FROM report_bands b JOIN reports r ON r.key = b.key"
+            f" WHERE b.band IN ({','.join('?' * len(bands))}) AND r.created_at >= ?"
+            " ORDER BY r.created_at DESC",
+            (*bands, fresh_after),
+        ).fetchall()
+        for cached_query, events, created_at in candidates:
+            if is_near_duplicate(query_terms(cached_query), terms, self._similarity):
+                return cached_query, json.loads(events), created_at
+        return None
+
+    def _insert(self, query: str, recorded: list[dict[str, Any]]) -> None:
+        key = normalize_query(query)
+        signature = minhash(query_terms(query))
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM report_bands WHERE key = ?", (key,))
+            self._db.execute(
+                "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?)",
+                (key, query, json.dumps(signature), json.dumps(recorded), time.time()),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO report_bands VALUES (?, ?)",
+                [(band, key) for band in _bands(signature)],
+            )
+
+
+def is_cacheable(events: list[dict[str, Any]]) -> bool:
+    """Only complete, error-free jobs that produced a report are worth replaying — not one a budget cut short."""
+    types = {e.get("type") for e in events}
+    if any(e.get("type") == "budget" and e.get("state") == "exhausted" for e in events):
+        return False
+    return "complete" in types and "report_section" in types and "error" not in types
+
+
+_cache: ReportCache | None = None
+
+
+def get_report_cache() -> ReportCache:
+    global _cache
+    if _cache is None:
+        _cache = ReportCache()
+    return _cache
+
+
+def close_report_cache() -> None:
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
@@ -1,37 +1,102 @@
 """
 Nexus Research — FastAPI backend
 
-Two endpoints:
-  POST /api/research               → accept query, start research, return research_id
-  GET  /api/research/{id}/stream   → SSE stream of agent events for that research_id
+Main endpoints:
+  POST   /api/research               → accept query, start research, return research_id
+  POST   /api/research/batch         → run many queries, one NDJSON stream of events + reports
+  GET    /api/research/{id}/stream   → SSE stream of agent events for that research_id
+  WS     /api/research/ws            → start / follow / cancel many jobs over one WebSocket
+  DELETE /api/research/{id}          → cancel a queued or running research job
+  GET    /api/reports[/search|/{id}|/export]  → archived reports (jobs/archive.py)
 """
 import asyncio
-import uuid
-from contextlib import asynccontextmanager
-from typing import Any
+import logging
+import os
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, Literal
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-
-from agent.models import ResearchRequest, ResearchResponse
-from agent.orchestrator import ResearchOrchestrator
-from utils.streaming import format_sse, sse_error, sse_heartbeat
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
 
+# Load .env before importing the agent — its tuning constants read os.environ at import
 load_dotenv()
 
-# ── In-memory store: research_id → asyncio.Queue ────────────────────────────
-# Each queue holds dicts (SSE event payloads). Sentinel value None signals done.
-_queues: dict[str, asyncio.Queue] = {}
-_QUEUE_TTL_SECONDS = 600  # drop queues older than 10 minutes (enough for any research job)
+logging.basicConfig(
+    level=os.getenv("NEXUS_LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+# The HTTP clients log every request at INFO — keep that for NEXUS_LOG_LEVEL=DEBUG
+if not logging.getLogger().isEnabledFor(logging.DEBUG):
+    for name in ("httpx", "httpx2"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+log = logging.getLogger("nexus.research")
+
+from agent import clients
+from agent.budget import requested_limits
+from agent.cache import close_tool_cache, get_tool_cache
+from agent.fetch import close_fetcher, extract_stats
+from agent.models import BatchRequest, ResearchRequest, ResearchResponse
+from agent.orchestrator import STREAM_RESPONSES, ResearchOrchestrator
+from agent.parallel import ParallelOrchestrator
+from agent.prefetch import prefetch_stats
+from agent.scheduler import get_scheduler
+from jobs.archive import ReportArchive, close_report_archive, get_report_archive, render_markdown
+from jobs.batch import BatchRun
+from jobs.bus import create_event_bus
+from jobs.mux import MuxSession, mux_stats
+from jobs.registry import Job, JobRegistry, RegistryFull
+from jobs.report_cache import close_report_cache, get_report_cache, is_cacheable
+from utils.metrics import REGISTRY, SSE_EVENTS, render_metrics, stats_samples
+from utils.streaming import PROTOCOL_VERSIONS, SSEEncoder, dumps
+
+# ── Job registry + event bus ────────────────────────────────────────────────
+# The registry runs this process's jobs: it bounds how many run and wait, and
+# sweeps jobs nobody is watching (jobs/registry.py). Their events go to the
+# event bus, which any process can stream from — in-memory by default, or
+# SQLite / Redis to run several workers (jobs/bus.py, NEXUS_EVENT_BUS).
+bus = create_event_bus()
+registry = JobRegistry(bus)
+_sse_subscribers = 0  # SSE streams open on this process
+
+# Gauges read at scrape time from the components that own them (utils/metrics.py)
+REGISTRY.gauge_collector(
+    "Job registry state in this process (queued = queue depth).",
+    lambda: stats_samples("nexus_jobs", registry.stats()),
+)
+REGISTRY.gauge_collector("SSE streams open on this process.", lambda: [("nexus_sse_subscribers", {}, _sse_subscribers)])
+REGISTRY.gauge_collector("WebSocket connections and job streams open on this process.", lambda: stats_samples("nexus_ws", mux_stats()))
+REGISTRY.gauge_collector("Upstream scheduler state per provider.", lambda: [
+    sample
+    for provider, stats in get_scheduler().stats().items()
+    for sample in stats_samples("nexus_upstream", stats, provider=provider)
+])
+REGISTRY.gauge_collector("Tool result cache counters.", lambda: stats_samples("nexus_tool_cache", get_tool_cache().stats()))
+REGISTRY.gauge_collector("Speculative extract_page prefetch counters.", lambda: stats_samples("nexus_prefetch", prefetch_stats()))
+REGISTRY.gauge_collector("Page extraction latency and outcomes per backend.", lambda: [
+    sample
+    for backend, stats in extract_stats().items()
+    for sample in stats_samples("nexus_extract", stats, backend=backend)
+])
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Process-wide pooled Anthropic / Tavily clients, shared by every job
+    await clients.startup()
+    await bus.start()
+    await registry.start()  # background sweeper for expired jobs
     yield
-    # Cleanup: drain all queues on shutdown
-    _queues.clear()
+    # Cleanup: cancel running jobs, drop their events
+    await registry.stop()
+    await bus.stop()
+    await clients.shutdown()
+    await close_fetcher()
+    close_tool_cache()
+    close_report_cache()
+    close_report_archive()
 
 
 app = FastAPI(
@@ -41,9 +106,11 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+ALLOWED_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000"]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -54,96 +121,383 @@ app.add_middleware(
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "service": "nexus-research"}
+    return {"status": "ok", "service": "nexus-research", "jobs": registry.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text format: spans, token counts, jobs, queue depth, subscribers."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit / miss / eviction counters for the tool cache, report cache, prefetcher and report archive."""
+    return {
+        **get_tool_cache().stats(),
+        "reports": await get_report_cache().stats(),
+        "prefetch": prefetch_stats(),
+        "archive": await get_report_archive().stats(),
+    }
 
-@app.post("/api/research", response_model=ResearchResponse)
+
+@app.get("/api/upstream/stats")
+async def upstream_stats():
+    """
+    Rate-limiter queue, wait and retry counters per upstream provider, and
+    page extraction latency (p50 / p99) per extract backend.
+    """
+    return {**get_scheduler().stats(), "extract": extract_stats()}
+
+
+@app.post("/api/research", response_model=ResearchResponse, responses={429: {}})
 async def start_research(body: ResearchRequest):
     """
-    Accept a research query, create a queue, kick off the agent in the background,
-    and return the research_id so the client can open the SSE stream.
+    Accept a research query, register a job, kick off the agent in the background
+    (or queue it if all run slots are busy), and return the research_id so the
+    client can open the SSE stream. Answers 429 + Retry-After when the queue is full.
+
+    If a fresh report for the same (or a near-duplicate) query is cached, the
+    job replays it instead — unless the request sets bypass_cache.
     """
-    research_id = str(uuid.uuid4())
-    queue: asyncio.Queue[dict | None] = asyncio.Queue()
-    _queues[research_id] = queue
+    try:
+        job, cached = await _submit_research(
+            body.query, body.priority, body.mode, body.bypass_cache,
+            limits=requested_limits(body.token_budget, body.time_budget_s),
+        )
+    except RegistryFull as exc:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(exc)},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    return ResearchResponse(research_id=job.research_id, cached=cached)
 
-    # Run the agent in the background — it will push events into the queue
-    asyncio.create_task(_run_research(research_id, body.query, queue))
 
-    return ResearchResponse(research_id=research_id)
+@app.post("/api/research/batch")
+async def start_batch(body: BatchRequest):
+    """
+    Run many research queries as one batch and stream the results as NDJSON:
+    batch_start, each job's events (unless include_events is false), a report
+    line per query as its job finishes, then batch_end with reports per hour.
+    Batch jobs run at batch priority, without response streaming, at most
+    `concurrency` at a time (jobs/batch.py). Closing the connection cancels
+    the batch's unfinished jobs.
+    """
+    limits = requested_limits(body.token_budget, body.time_budget_s)
+
+    async def submit(query: str) -> Job:
+        job, _ = await _submit_research(query, "batch", body.mode, body.bypass_cache, stream=False, limits=limits)
+        return job
+
+    run = BatchRun(body.queries, submit, registry, body.concurrency, body.include_events)
+    return StreamingResponse(
+        run.stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Nexus-Batch-Id": run.batch_id, "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/research/{research_id}")
+async def research_status(research_id: str):
+    """Lightweight status of a research job (no events)."""
+    job = registry.get(research_id)
+    if job is not None:
+        return await job.status()
+    # Running in another worker — only the bus knows about it
+    stream = await bus.status(research_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="Research job not found or expired.")
+    return {"research_id": research_id, **stream}
+
+
+@app.delete("/api/research/{research_id}")
+async def cancel_research(research_id: str):
+    """
+    Cancel a research job: stop the agent, abort its in-flight Claude / Tavily
+    calls and free its run slot. Subscribers get a `cancelled` event, then the
+    usual stream_end. Finished jobs are left as they are.
+    """
+    job = await registry.cancel(research_id, "client")
+    if job is None:
+        if await bus.status(research_id) is not None:
+            # Only the process running a job can stop it
+            raise HTTPException(status_code=409, detail="Research job is running in another worker.")
+        raise HTTPException(status_code=404, detail="Research job not found or expired.")
+    return await job.status()
 
 
 @app.get("/api/research/{research_id}/stream")
-async def stream_research(research_id: str):
+async def stream_research(
+    research_id: str,
+    last_event_id: int | None = None,
+    protocol: int | None = None,
+    last_event_id_header: int | None = Header(None, alias="Last-Event-ID"),
+    protocol_header: int | None = Header(None, alias="X-Nexus-Protocol"),
+    accept_encoding: str = Header("", alias="Accept-Encoding"),
+):
     """
     SSE endpoint — streams all agent events for a research job.
     The client should open this immediately after receiving the research_id.
+    Any number of clients may stream the same job; each gets every event.
+    Every event carries an `id:`; reconnecting with `Last-Event-ID` (header, as
+    EventSource does automatically, or `?last_event_id=`) replays what was missed.
+    `?protocol=2` (or X-Nexus-Protocol: 2) selects the compact wire format
+    described in utils/streaming.py; protocol 1 is the default.
     """
-    queue = _queues.get(research_id)
-    if queue is None:
+    version = protocol_header or protocol or 1
+    if version not in PROTOCOL_VERSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported protocol version {version}.")
+
+    # The job may run in this process or (with a shared bus) in another worker
+    job = registry.get(research_id)
+    if job is None and await bus.status(research_id) is None:
         raise HTTPException(status_code=404, detail="Research job not found or expired.")
 
+    after = last_event_id_header if last_event_id_header is not None else last_event_id
+    encoder = SSEEncoder.negotiate(version, accept_encoding)
     return StreamingResponse(
-        _event_generator(research_id, queue),
+        _event_generator(research_id, job, after or 0, encoder),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "X-Accel-Buffering": "no",  # disable nginx buffering if behind a proxy
+            **encoder.headers,
         },
     )
 
 
+@app.websocket("/api/research/ws")
+async def research_socket(websocket: WebSocket, protocol: int = 1):
+    """
+    Many research jobs over one WebSocket: start, subscribe, unsubscribe and
+    cancel by research_id, each job's events flow-controlled by the credit the
+    client grants it. The message protocol is described in jobs/mux.py; the
+    events and their ids are those of the SSE stream, which remains the
+    fallback. `?protocol=2` selects the compact payloads.
+    """
+    # CORS does not cover WebSockets — browsers send Origin, so check it here
+    origin = websocket.headers.get("origin")
+    if protocol not in PROTOCOL_VERSIONS or (origin is not None and origin not in ALLOWED_ORIGINS):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    session = MuxSession(registry, _start_from_socket, version=protocol)
+    try:
+        await session.run(websocket.receive_text, websocket.send_text)
+    except WebSocketDisconnect:
+        pass
+
+
+# ── Report archive ───────────────────────────────────────────────────────────
+
+@app.get("/api/reports")
+async def list_reports(limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0)):
+    """Archived reports, newest first: `{reports, total, next_offset}` (no section bodies)."""
+    return await get_report_archive().latest(limit, offset)
+
+
+@app.get("/api/reports/search")
+async def search_reports(
+    q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0)
+):
+    """Full-text search over archived reports, best match first, with a snippet per report."""
+    return await get_report_archive().search(q, limit, offset)
+
+
+@app.get("/api/reports/export")
+async def export_reports(fmt: Literal["md", "json"] = Query("md", alias="format"), q: str = ""):
+    """
+    Stream every archived report (or those matching `q`), oldest first, as one
+    Markdown document or a JSON array. Reports are read and sent a page at a
+    time, so large archives export in constant memory.
+    """
+    media_type = "text/markdown; charset=utf-8" if fmt == "md" else "application/json"
+    return StreamingResponse(
+        _export_stream(fmt, q),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="nexus-reports.{fmt}"'},
+    )
+
+
+@app.get("/api/reports/{report_id}")
+async def get_report(report_id: str, fmt: Literal["json", "md"] = Query("json", alias="format")):
+    """An archived report with its sections (report_id is the job's research_id)."""
+    report = await get_report_archive().get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found in the archive.")
+    if fmt == "md":
+        return PlainTextResponse(render_markdown(report), media_type="text/markdown; charset=utf-8")
+    return report
+
+
 # ── Internal helpers ─────────────────────────────────────────────────────────
 
-async def _run_research(research_id: str, query: str, queue: asyncio.Queue) -> None:
-    """Background task: run the agent and push events into the queue."""
-    print(f"[research] Starting: {query!r}")
-    orchestrator = ResearchOrchestrator()
+async def _submit_research(
+    query: str,
+    priority: str,
+    mode: str,
+    bypass_cache: bool,
+    stream: bool = STREAM_RESPONSES,
+    limits: tuple[int, float] | None = None,
+) -> tuple[Job, bool]:
+    """
+    Register a job for `query`: the replay of a cached report, or else a fresh
+    agent run within `limits` (tokens, seconds — agent/budget.py). Returns
+    (job, cached). Raises RegistryFull when the queue is full.
+    """
+    cached = None if bypass_cache else await get_report_cache().lookup(query)
+    if cached is not None:
+        job = await registry.submit(query, _replay_runner(cached), priority=priority, needs_slot=False)
+        return job, True
+    # Run the agent in the background — it will publish events to the job's hub
+    runner = _research_runner(mode, stream, limits or requested_limits(None, None))
+    return await registry.submit(query, runner, priority=priority), False
+
+
+async def _start_from_socket(message: dict[str, Any]) -> tuple[Job, bool]:
+    """A WebSocket start message, validated as a POST /api/research body."""
+    try:
+        body = ResearchRequest.model_validate(message)
+    except ValidationError as exc:
+        raise ValueError("; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())) from None
+    return await _submit_research(
+        body.query, body.priority, body.mode, body.bypass_cache,
+        limits=requested_limits(body.token_budget, body.time_budget_s),
+    )
+
+
+def _research_runner(mode: str, stream: bool = STREAM_RESPONSES, limits: tuple[int, float] | None = None):
+    """Job runner for a research mode (serial | parallel)."""
+    async def run(job: Job) -> None:
+        await _run_research(job, mode, stream, limits)
+
+    return run
+
+
+async def _run_research(
+    job: Job, mode: str = "serial", stream: bool = STREAM_RESPONSES, limits: tuple[int, float] | None = None
+) -> None:
+    """Job runner: run the agent and publish events to the job's hub."""
+    log.info("Starting %s (%s): %r", job.research_id[:8], mode, job.query)
+    debug = log.isEnabledFor(logging.DEBUG)
+    recorded: list[dict[str, Any]] = []
+    archive = get_report_archive()
+    token_budget, time_budget = limits or requested_limits(None, None)
+    finished = False
     try:
-        async for event in orchestrator.run(query):
-            print(f"[research] Event: {event.get('type')} | {str(event)[:120]}")
-            await queue.put(event)
+        if mode == "parallel":
+            orchestrator = ParallelOrchestrator(
+                stream=stream, priority=job.priority, token_budget=token_budget, time_budget=time_budget
+            )
+        else:
+            orchestrator = ResearchOrchestrator(
+                stream=stream, priority=job.priority, token_budget=token_budget, time_budget=time_budget
+            )
+        # aclosing: if the job is cancelled mid-publish, the agent's generators
+        # still unwind now, closing their upstream streams and tool tasks
+        async with aclosing(orchestrator.run(job.query)) as events:
+            async for event in events:
+                if debug:  # only the type — never stringify (possibly large) payloads
+                    log.debug("Event %s: %s", job.research_id[:8], event.get("type"))
+                if event["type"] == "usage":
+                    job.record_usage(event)
+                recorded.append(event)
+                await job.publish(event)
+                if event["type"] in ("report_section", "complete"):
+                    await _archive_event(archive, job, event)
+        finished = True
     except Exception as exc:
-        print(f"[research] UNHANDLED EXCEPTION: {type(exc).__name__}: {exc}")
-        import traceback; traceback.print_exc()
-        await queue.put({"type": "error", "message": str(exc)})
+        log.exception("Unhandled exception in %s", job.research_id[:8])
+        await job.publish({"type": "error", "message": str(exc)})
     finally:
-        print(f"[research] Stream closed for {research_id[:8]}")
-        await queue.put(None)  # sentinel: signals the stream generator to close
+        try:
+            await archive.finish(job.research_id)
+        except Exception:
+            log.exception("Could not finish the archived report for %s", job.research_id[:8])
+        if finished and is_cacheable(recorded):
+            try:
+                await get_report_cache().store(job.query, recorded)
+            except Exception:
+                log.exception("Could not cache the report for %s", job.research_id[:8])
+        # The registry closes the job's stream; subscribers finish once they have caught up
+        log.info("Finished %s", job.research_id[:8])
+
+
+async def _archive_event(archive: ReportArchive, job: Job, event: dict[str, Any]) -> None:
+    """Archive a report section or the final report; an archive error is logged, never the job's."""
+    try:
+        if event["type"] == "report_section":
+            await archive.add_section(job.research_id, job.query, event)
+        else:
+            await archive.complete(job.research_id, event)
+    except Exception:
+        log.exception("Could not archive %s event for %s", event["type"], job.research_id[:8])
+
+
+def _replay_runner(cached: dict[str, Any]):
+    """Job runner that publishes a cached report's recorded events, back to back."""
+    async def replay(job: Job) -> None:
+        log.info("Replaying cached report for %r (similarity %s)", job.query, cached["similarity"])
+        await job.publish({
+            "type": "cache_hit",
+            "matched_query": cached["query"],
+            "similarity": cached["similarity"],
+            "cached_at": cached["created_at"],
+        })
+        for event in cached["events"]:
+            await job.publish(event)
 
+    return replay
 
-async def _event_generator(research_id: str, queue: asyncio.Queue):
+
+async def _export_stream(fmt: str, q: str):
+    """Archived reports as Markdown documents or JSON array items, one chunk per report."""
+    if fmt == "json":
+        yield b"["
+    separator = b""
+    async for report in get_report_archive().export(q):
+        if fmt == "json":
+            yield separator + dumps(report)
+            separator = b","
+        else:
+            yield (render_markdown(report) + "\n---\n\n").encode()
+    if fmt == "json":
+        yield b"]"
+
+
+async def _event_generator(research_id: str, job: Job | None, after: int, encoder: SSEEncoder):
     """
-    Async generator that pulls events from the queue and yields SSE-formatted strings.
-    Sends a heartbeat every 15 seconds to keep the connection alive.
-    Cleans up the queue entry when done.
+    Async generator for one subscriber: replays the job's events after sequence
+    number `after`, then follows live, yielding SSE frames (with IDs) encoded
+    by `encoder`. Sends a heartbeat every 15 seconds to keep the connection alive.
     """
+    global _sse_subscribers
+    subscription = bus.subscribe(research_id, after)
+    if subscription is None:
+        # Evicted between the handler's lookup and the response starting
+        yield encoder.end()
+        return
+    _sse_subscribers += 1
     try:
         while True:
-            try:
-                event: dict | None = await asyncio.wait_for(queue.get(), timeout=15.0)
-            except asyncio.TimeoutError:
-                yield sse_heartbeat()
-                continue
-
-            if event is None:
-                # Sentinel received — research is done
-                yield format_sse({"type": "stream_end"})
-                break
-
-            yield format_sse(event)
-
-            # If the event itself signals completion, close after sending it
-            if event.get("type") in ("complete", "error"):
-                # Drain until sentinel so the background task doesn't block
-                while True:
-                    try:
-                        leftover = await asyncio.wait_for(queue.get(), timeout=2.0)
-                        if leftover is None:
-                            break
-                    except asyncio.TimeoutError:
-                        break
-                yield format_sse({"type": "stream_end"})
+            batch = await subscription.next_batch(timeout=15.0)
+            if batch and encoder.should_coalesce(batch):
+                # Let a burst of streaming deltas go out as one write
+                await asyncio.sleep(encoder.coalesce_seconds)
+                batch += await subscription.next_batch(timeout=0) or []
+            if batch is None:
+                # Research is done and this client has everything
+                yield encoder.end()
                 break
+            if not batch:
+                yield encoder.heartbeat()
+                continue
+            SSE_EVENTS.inc(len(batch))
+            yield encoder.events(batch)
     finally:
-        _queues.pop(research_id, None)
+        _sse_subscribers -= 1
+        subscription.close()
+        if job is not None:
+            registry.subscriber_left(job)  # the TTL (and unwatched grace period) count from here
@@ -0,0 +1,52 @@
+import asyncio
+
+from jobs import archive as archive_module
+from jobs.archive import ReportArchive
+
+
+def section(title: str, content: str) -> dict:
+    return {"type": "report_section", "section_id": title.lower(), "title": title, "content": content, "citations": []}
+
+
+async def archived(archive: ReportArchive, report_id: str, query: str, topic: str) -> None:
+    await archive.add_section(report_id, query, section("Overview", f"All about {topic}."))
+    await archive.add_section(report_id, query, section("Details", f"More on {topic}."))
+    await archive.complete(report_id, {"report_title": topic.title(), "executive_summary": f"{topic} in short"})
+    await archive.finish(report_id)
+
+
+def test_reports_are_stored_searched_and_fetched(tmp_path):
+    async def run():
+        archive = ReportArchive(str(tmp_path / "archive.sqlite3"))
+        await archived(archive, "a", "how do solar panels work", "solar panels")
+        await archived(archive, "b", "what is crispr", "crispr")
+
+        report = await archive.get("a")
+        assert report["state"] == "complete"
+        assert [s["title"] for s in report["sections"]] == ["Overview", "Details"]
+        assert await archive.get("missing") is None
+
+        found = await archive.search("crispr")
+        assert [r["id"] for r in found["reports"]] == ["b"]
+        assert [r["id"] for r in (await archive.latest())["reports"]] == ["b", "a"]
+        assert (await archive.stats())["reports"] == 2
+        archive.close()
+
+    asyncio.run(run())
+
+
+def test_export_walks_every_page(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_module, "EXPORT_PAGE_SIZE", 2)
+
+    async def run():
+        archive = ReportArchive(str(tmp_path / "archive.sqlite3"))
+        topics = ["volcanoes", "glaciers", "tides", "monsoons", "geysers"]
+        for n, topic in enumerate(topics):
+            await archived(archive, f"r{n}", f"tell me about {topic}", topic)
+        exported = [report["id"] async for report in archive.export()]
+        assert exported == [f"r{n}" for n in range(5)]
+        assert [report["id"] async for report in archive.export("monsoons")] == ["r3"]
+        assert [report async for report in archive.export("!!")] == []
+        archive.close()
+
+    asyncio.run(run())
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from jobs.bus import MemoryEventBus, RedisEventBus, SqliteEventBus
+
+
+def test_subscribe_to_unknown_job_returns_none():
+    async def run():
+        bus = MemoryEventBus()
+        assert bus.subscribe("missing") is None
+        await bus.create("job")
+        await bus.discard("job")
+        assert bus.subscribe("job") is None
+
+    asyncio.run(run())
+
+
+def test_discard_ends_a_waiting_subscriber():
+    async def run():
+        bus = MemoryEventBus()
+        await bus.create("job")
+        await bus.publish("job", {"type": "agent_thinking"})
+        subscription = bus.subscribe("job")
+        assert [seq for seq, _ in await subscription.next_batch(timeout=0)] == [1]
+
+        waiting = asyncio.create_task(subscription.next_batch(timeout=60))
+        await asyncio.sleep(0)
+        await bus.discard("job")
+        assert await asyncio.wait_for(waiting, timeout=1) is None
+
+    asyncio.run(run())
+
+
+def test_discard_ends_a_subscriber_that_had_not_caught_up():
+    async def run():
+        bus = MemoryEventBus()
+        await bus.create("job")
+        subscription = bus.subscribe("job")
+        for _ in range(3):
+            await bus.publish("job", {"type": "agent_thinking"})
+        await bus.discard("job")
+        batches = [await asyncio.wait_for(subscription.next_batch(timeout=60), timeout=1) for _ in range(2)]
+        assert batches[-1] is None
+
+    asyncio.run(run())
+
+
+def test_sqlite_bus_streams_events_until_closed(tmp_path):
+    async def run():
+        bus = SqliteEventBus(str(tmp_path / "events.sqlite3"), poll_seconds=0.01)
+        await bus.start()
+        await bus.create("job")
+        subscription = bus.subscribe("job")
+        reader = asyncio.create_task(read_all(subscription))
+        for n in range(3):
+            await bus.publish("job", {"type": "agent_thinking", "n": n})
+        await bus.close("job")
+        assert [event["n"] for _, event in await asyncio.wait_for(reader, timeout=5)] == [0, 1, 2]
+        assert (await bus.status("job"))["last_event_id"] == 3
+
+        await bus.discard("job")
+        assert await bus.status("job") is None
+        assert await bus.subscribe("job").next_batch(timeout=1) is None
+        await bus.stop()
+
+    asyncio.run(run())
+
+
+async def read_all(subscription) -> list:
+    events = []
+    while (batch := await subscription.next_batch(timeout=5)) is not None:
+        events += batch
+    subscription.close()
+    return events
+
+
+def test_redis_bus_never_recreates_a_discarded_job():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def run():
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        bus = RedisEventBus(client=client)
+        await bus.create("job")
+        subscription = bus.subscribe("job")
+        await bus.publish("job", {"type": "report_section"})
+        assert all([await client.ttl(key) > 0 for key in RedisEventBus._keys("job")])
+
+        await bus.discard("job")
+        assert await subscription.next_batch(timeout=0) is None
+        with pytest.raises(KeyError):
+            await bus.publish("job", {"type": "agent_thinking"})
+        await bus.close("job")
+        assert await client.keys("*") == []
+        assert await bus.status("job") is None
+
+    asyncio.run(run())
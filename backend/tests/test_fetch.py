@@ -0,0 +1,122 @@
+import asyncio
+import ipaddress
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from agent import fetch
+from agent.fetch import LocalFetcher
+
+TEXT = b"A page of plain text, long enough to count as content. " * 10
+
+
+def serve(host: str, redirect_to: str | None = None, charset: str = "utf-8") -> ThreadingHTTPServer:
+    """A page server on `host`, or one that redirects every request to `redirect_to`."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if redirect_to:
+                self.send_response(302)
+                self.send_header("Location", redirect_to)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", f"text/plain; charset={charset}")
+            self.send_header("Content-Length", str(len(TEXT)))
+            self.end_headers()
+            self.wfile.write(TEXT)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def url(server: ThreadingHTTPServer, name: str | None = None) -> str:
+    host, port = server.server_address
+    return f"http://{name or host}:{port}/page"
+
+
+def extract(target: str, allow_private: bool = False) -> dict:
+    async def run():
+        fetcher = LocalFetcher(allow_private=allow_private, min_chars=1, deadline_ms=5000)
+        try:
+            return await fetcher.extract(target)
+        finally:
+            await fetcher.close()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def page():
+    server = serve("127.0.0.1")
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def public_127_0_0_2(monkeypatch):
+    """Treat 127.0.0.2 as a public address, so a page there can redirect elsewhere."""
+    is_public = fetch._is_public
+    monkeypatch.setattr(fetch, "_is_public", lambda a: a == ipaddress.ip_address("127.0.0.2") or is_public(a))
+
+
+def test_private_page_is_fetched_when_allowed(page):
+    assert extract(url(page), allow_private=True)["raw_content"] == TEXT.decode()
+
+
+def test_unknown_charset_falls_back_to_utf8():
+    server = serve("127.0.0.1", charset="x-no-such-codec")
+    try:
+        assert extract(url(server), allow_private=True)["raw_content"] == TEXT.decode()
+    finally:
+        server.shutdown()
+
+
+@pytest.mark.parametrize("target", [
+    "http://127.0.0.1/page",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.1/",
+    "http://[::1]/",
+    "http://[::ffff:127.0.0.1]/",
+])
+def test_private_literal_is_refused(target):
+    assert "non-public" in extract(target)["error"]
+
+
+def test_private_name_is_refused_once_connected(page):
+    # localhost resolves to loopback: refused by the peer check, whatever DNS said earlier
+    assert "non-public" in extract(url(page, "localhost"))["error"]
+
+
+def test_redirect_to_private_address_is_refused(page, public_127_0_0_2):
+    redirector = serve("127.0.0.2", redirect_to=url(page))
+    try:
+        assert "non-public" in extract(url(redirector))["error"]
+    finally:
+        redirector.shutdown()
+
+
+def test_redirect_to_link_local_address_is_refused(public_127_0_0_2):
+    redirector = serve("127.0.0.2", redirect_to="http://169.254.169.254/latest/meta-data/")
+    try:
+        assert "non-public" in extract(url(redirector))["error"]
+    finally:
+        redirector.shutdown()
+
+
+def test_redirect_to_public_address_is_followed(public_127_0_0_2):
+    target = serve("127.0.0.2")
+    redirector = serve("127.0.0.2", redirect_to=url(target))
+    try:
+        item = extract(url(redirector))
+        assert item["raw_content"] == TEXT.decode()
+        assert item["url"] == url(target)
+    finally:
+        redirector.shutdown()
+        target.shutdown()
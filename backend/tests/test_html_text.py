@@ -0,0 +1,33 @@
+from agent.html_text import html_to_text
+
+
+def test_text_and_title_without_page_chrome():
+    title, text = html_to_text(
+        b"<html><head><title>T</title><style>p {}</style></head><body><nav>Menu</nav>"
+        b"<p>First &amp; foremost</p><script>track()</script><p>Second</p><footer>Legal</footer></body></html>"
+    )
+    assert title == "T"
+    assert text == "First & foremost\nSecond"
+
+
+def test_head_without_closing_tag_ends_at_body():
+    assert html_to_text(b"<html><head><title>T</title><body><p>Hello world body text</p>") == (
+        "T", "Hello world body text",
+    )
+
+
+def test_head_without_closing_tag_ends_at_first_body_element():
+    title, text = html_to_text(b"<head><meta charset=utf-8><title>T</title><link rel=x><h1>Heading</h1><p>Text</p>")
+    assert (title, text) == ("T", "Heading\nText")
+
+
+def test_page_wrapped_in_a_form_keeps_its_text():
+    title, text = html_to_text(
+        b"<html><body><form id=aspnetForm method=post><div><h1>Title</h1>"
+        b"<p>Body text inside the form</p><button>Submit</button></div></form></body></html>"
+    )
+    assert text == "Title\nBody text inside the form"
+
+
+def test_unknown_charset_falls_back_to_utf8():
+    assert html_to_text("<p>café</p>".encode(), encoding="x-unknown")[1] == "café"
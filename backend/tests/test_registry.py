@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from jobs.registry import JobRegistry, RegistryFull
+
+
+def hold(gate: asyncio.Event):
+    async def runner(job):
+        await gate.wait()
+    return runner
+
+
+def test_burst_is_limited_to_running_plus_waiting():
+    async def run():
+        registry = JobRegistry(max_running=2, max_waiting=3)
+        gate = asyncio.Event()
+        runner = hold(gate)
+        jobs = [await registry.submit(f"query {i}", runner) for i in range(5)]
+        with pytest.raises(RegistryFull):
+            await registry.submit("one too many", runner)
+        assert registry.stats()["rejected_total"] == 1
+
+        gate.set()
+        await asyncio.gather(*(job.task for job in jobs))
+        await registry.submit("room again", runner)  # finished jobs free their place
+        await registry.stop()
+
+    asyncio.run(run())
+
+
+def test_jobs_beyond_the_slots_are_told_their_position():
+    async def run():
+        registry = JobRegistry(max_running=1, max_waiting=5)
+        gate = asyncio.Event()
+        runner = hold(gate)
+        jobs = [await registry.submit(f"query {i}", runner) for i in range(3)]
+        positions = []
+        for job in jobs:
+            subscription = registry.bus.subscribe(job.research_id, 0)
+            batch = await subscription.next_batch(timeout=0) or []
+            positions.append([event["position"] for _, event in batch if event["type"] == "queued"])
+            subscription.close()
+        assert positions == [[], [1], [2]]
+        gate.set()
+        await asyncio.gather(*(job.task for job in jobs))
+        await registry.stop()
+
+    asyncio.run(run())
+
+
+def test_interactive_jobs_get_free_slots_before_batch_jobs():
+    async def run():
+        registry = JobRegistry(max_running=1, max_waiting=5)
+        gate = asyncio.Event()
+        started = []
+
+        async def runner(job):
+            started.append(job.query)
+            await gate.wait()
+
+        first = await registry.submit("first", runner)
+        await asyncio.sleep(0)
+        batch = [await registry.submit(f"batch {i}", runner, priority="batch") for i in range(2)]
+        interactive = await registry.submit("interactive", runner)
+
+        subscription = registry.bus.subscribe(interactive.research_id, 0)
+        events = await subscription.next_batch(timeout=0) or []
+        assert [e["position"] for _, e in events if e["type"] == "queued"] == [1]
+        subscription.close()
+
+        gate.set()
+        await asyncio.gather(*(job.task for job in [first, *batch, interactive]))
+        assert started == ["first", "interactive", "batch 0", "batch 1"]
+        await registry.stop()
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiting_job_gives_up_its_place():
+    async def run():
+        registry = JobRegistry(max_running=1, max_waiting=5)
+        gate = asyncio.Event()
+        runner = hold(gate)
+        running = await registry.submit("running", runner)
+        waiting = await registry.submit("waiting", runner)
+        await asyncio.sleep(0)
+        await registry.cancel(waiting.research_id)
+        assert waiting.state.value == "cancelled"
+
+        after = await registry.submit("after", runner)
+        gate.set()
+        await asyncio.gather(running.task, after.task)
+        assert after.state.value == "done"
+        assert registry.stats()["queued"] == 0
+        await registry.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from jobs.report_cache import ReportCache, query_terms
+
+EVENTS = [
+    {"type": "report_section", "title": "Overview", "content": "..."},
+    {"type": "complete", "report_title": "Report"},
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ReportCache(str(tmp_path / "reports.sqlite3"))
+    yield cache
+    cache.close()
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("How does CRISPR work?", "how does crispr work"),
+    ("how does CRISPR work", "Explain how CRISPR works?"),
+    ("What are the benefits of solar panels?", "solar panel benefits"),
+    ("Tax rules for small businesses", "tax rule for small business"),
+    ("Which studies link coffee and sleep?", "sleep coffee study link"),
+    ("how does CRISPR work", "How does CRISPR gene editing work?"),
+    ("How does CRISPR gene editing work?", "how does CRISPR work"),
+])
+def test_same_question_is_a_hit(cache, stored, asked):
+    hit = asyncio.run(store_and_lookup(cache, stored, asked))
+    assert hit is not None
+    assert hit["query"] == stored
+    assert hit["events"] == EVENTS
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("history of the ottoman empire", "history of the roman empire"),
+    ("Rust vs Go performance", "Python vs Rust performance"),
+    ("Benefits of solar energy for homes", "Benefits of solar energy for businesses"),
+    ("what is it", "who is it"),
+    ("CRISPR", "CRISPR gene editing"),
+    ("solar energy", "solar energy costs for homes in germany"),
+])
+def test_different_question_is_a_miss(cache, stored, asked):
+    assert asyncio.run(store_and_lookup(cache, stored, asked)) is None
+    assert cache.misses == 1
+
+
+@pytest.mark.parametrize("word, stem", [
+    ("businesses", "business"),
+    ("business", "business"),
+    ("homes", "home"),
+    ("studies", "study"),
+    ("taxes", "tax"),
+    ("matches", "match"),
+    ("virus", "virus"),
+    ("analysis", "analysis"),
+])
+def test_plurals_are_stemmed(word, stem):
+    assert query_terms(word) == {stem}
+
+
+def test_expired_reports_are_not_returned(tmp_path):
+    cache = ReportCache(str(tmp_path / "reports.sqlite3"), ttl=-1)
+    assert asyncio.run(store_and_lookup(cache, "solar panel benefits", "solar panel benefits")) is None
+    cache.close()
+
+
+async def store_and_lookup(cache: ReportCache, stored: str, asked: str):
+    await cache.store(stored, EVENTS)
+    return await cache.lookup(asked)
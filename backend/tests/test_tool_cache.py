@@ -0,0 +1,91 @@
+import asyncio
+
+from agent.cache import ToolCache
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "tools.sqlite3")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return {"results": ["a"]}
+
+    async def run(cache: ToolCache):
+        try:
+            return await cache.get_or_fetch("web_search", {"query": "q"}, 60, fetch)
+        finally:
+            cache.close()
+
+    assert asyncio.run(run(ToolCache(path))) == {"results": ["a"]}
+    cache = ToolCache(path)
+    assert asyncio.run(run(cache)) == {"results": ["a"]}
+    assert len(calls) == 1
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_expired_entries_are_fetched_again(tmp_path):
+    path = str(tmp_path / "tools.sqlite3")
+
+    async def run():
+        cache = ToolCache(path)
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            return {"n": calls}
+
+        await cache.get_or_fetch("extract_page", {"url": "u"}, -1, fetch)
+        assert await cache.get_or_fetch("extract_page", {"url": "u"}, 60, fetch) == {"n": 2}
+        cache.close()
+
+    asyncio.run(run())
+
+
+def test_concurrent_misses_share_one_fetch(tmp_path):
+    async def run():
+        cache = ToolCache(str(tmp_path / "tools.sqlite3"))
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"ok": True}
+
+        results = await asyncio.gather(*(
+            cache.get_or_fetch("web_search", {"query": "same"}, 60, fetch) for _ in range(5)
+        ))
+        assert results == [{"ok": True}] * 5
+        assert calls == 1
+        cache.close()
+
+    asyncio.run(run())
+
+
+def test_abandoned_fetch_is_not_shared_with_a_later_caller(tmp_path):
+    async def run():
+        cache = ToolCache(str(tmp_path / "tools.sqlite3"))
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                try:
+                    await asyncio.sleep(60)
+                except asyncio.CancelledError:
+                    await asyncio.sleep(0.1)  # slow to unwind, as a closing HTTP stream is
+                    raise
+            return {"n": calls}
+
+        abandoned = asyncio.create_task(cache.get_or_fetch("extract_page", {"url": "u"}, 60, fetch))
+        await asyncio.sleep(0.05)
+        abandoned.cancel()
+        await asyncio.gather(abandoned, return_exceptions=True)
+
+        assert await cache.get_or_fetch("extract_page", {"url": "u"}, 60, fetch) == {"n": 2}
+        cache.close()
+
+    asyncio.run(run())
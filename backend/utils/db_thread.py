@@ -0,0 +1,33 @@
+"""
+DbThread — a dedicated thread for one SQLite connection's blocking calls.
+
+The SQLite-backed stores (tool cache, event bus, report cache, report
+archive) each hold one WAL connection. Querying it on the event loop stalls
+every stream in the process while the disk is busy, so a store hands its
+queries to its own thread and awaits the result. One thread per connection
+also serializes its calls, so a transaction is never interleaved with
+another caller's statements.
+"""
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class DbThread:
+    def __init__(self, name: str):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """`fn(*args)` on the store's thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def call(self, fn: Callable[..., T], *args: Any) -> T:
+        """`fn(*args)` on the store's thread, waiting here — for setup and shutdown only."""
+        return self._executor.submit(fn, *args).result()
+
+    def close(self) -> None:
+        """Finish the queued calls and stop the thread."""
+        self._executor.shutdown(wait=True)
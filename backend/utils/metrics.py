@@ -0,0 +1,191 @@
+"""
+In-process metrics in the Prometheus text exposition format (GET /metrics).
+
+A small, dependency-free subset of the Prometheus client model:
+
+  Counter    — monotonically increasing, optional labels
+  Histogram  — cumulative buckets + sum + count, optional labels
+  collector  — a callback returning gauge samples, evaluated at scrape time
+               (queue depth, active jobs, subscribers … read from their owners)
+
+Updates are plain attribute arithmetic on the event loop thread, so recording
+on the hot path costs a dict lookup and an add. Values are per process; with
+several workers, scrape each one.
+"""
+import bisect
+from collections.abc import Callable, Iterable
+from typing import Any
+
+Sample = tuple[str, dict[str, str], float]  # (name, labels, value)
+
+_CLAUDE_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+_TOOL_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+_JOB_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200)
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labels
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float], labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._bounds = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * (len(self._bounds) + 1), [0.0])
+        counts, total = series
+        counts[bisect.bisect_left(self._bounds, value)] += 1
+        total[0] += value
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, (counts, total) in sorted(self._series.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self._bounds, float("inf")), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(round(total[0], 6))}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[tuple[str, Callable[[], Iterable[Sample]]]] = []
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self, name: str, help: str, buckets: Iterable[float], labels: tuple[str, ...] = ()
+    ) -> Histogram:
+        metric = Histogram(name, help, buckets, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_collector(self, help: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        """Register gauges read at scrape time. `collect()` yields (name, labels, value)."""
+        self._collectors.append((help, collect))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for help, collect in self._collectors:
+            by_name: dict[str, list[str]] = {}
+            for name, labels, value in collect():
+                by_name.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for name, samples in by_name.items():
+                lines.extend((f"# HELP {name} {help}", f"# TYPE {name} gauge", *samples))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ── Metrics recorded on the hot path ─────────────────────────────────────────
+
+CLAUDE_CALL_SECONDS = REGISTRY.histogram(
+    "nexus_claude_call_seconds", "Duration of one Claude Messages API call.", _CLAUDE_BUCKETS, ("mode",)
+)
+CLAUDE_FIRST_DELTA_SECONDS = REGISTRY.histogram(
+    "nexus_claude_first_delta_seconds", "Time to the first streamed delta of a Claude call.", _CLAUDE_BUCKETS
+)
+ITERATION_SECONDS = REGISTRY.histogram(
+    "nexus_iteration_seconds", "Duration of one agent loop iteration (Claude call + tools).", _CLAUDE_BUCKETS
+)
+TOOL_CALL_SECONDS = REGISTRY.histogram(
+    "nexus_tool_call_seconds", "Duration of one tool execution.", _TOOL_BUCKETS, ("tool",)
+)
+EXTRACT_SECONDS = REGISTRY.histogram(
+    "nexus_extract_seconds", "Duration of one page extraction, by backend (agent/fetch.py).", _TOOL_BUCKETS, ("backend",)
+)
+TOOL_ERRORS = REGISTRY.counter("nexus_tool_errors_total", "Tool executions that failed.", ("tool",))
+TOKENS = REGISTRY.counter(
+    "nexus_tokens_total", "Claude tokens, from response.usage.", ("type", "model")
+)
+ROUTED_TURNS = REGISTRY.counter(
+    "nexus_claude_turns_total", "Claude calls, by routed step and model.", ("step", "model")
+)
+ROUTE_ESCALATIONS = REGISTRY.counter(
+    "nexus_route_escalations_total", "Research turns asked again of the large model."
+)
+BUDGET_STOPS = REGISTRY.counter("nexus_budget_stops_total", "Agent loops ended by a budget.", ("budget",))
+ITERATIONS = REGISTRY.counter("nexus_iterations_total", "Agent loop iterations.")
+JOBS_FINISHED = REGISTRY.counter("nexus_jobs_finished_total", "Research jobs finished, by final state.", ("state",))
+JOB_SECONDS = REGISTRY.histogram(
+    "nexus_job_seconds", "Run time of a research job (excluding queue time).", _JOB_BUCKETS
+)
+SSE_EVENTS = REGISTRY.counter("nexus_sse_events_total", "Events written to SSE subscribers.")
+WS_EVENTS = REGISTRY.counter("nexus_ws_events_total", "Events written to WebSocket subscribers.")
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+def stats_samples(prefix: str, stats: dict[str, Any], **labels: str) -> list[Sample]:
+    """Numeric fields of a stats() dict as gauge samples named `<prefix>_<field>`."""
+    return [
+        (f"{prefix}_{key}", labels, value)
+        for key, value in stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ]
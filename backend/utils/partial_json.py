@@ -0,0 +1,70 @@
+"""
+Incremental decoding of one string field out of a partial JSON object.
+
+The streaming Messages API delivers tool inputs as `input_json_delta` chunks
+of raw JSON text. PartialStringField is fed those chunks and returns the newly
+decoded characters of a single top-level string value (e.g. write_section's
+"content") as soon as they can be decoded safely.
+"""
+import json
+import re
+
+_HIGH_SURROGATE = re.compile(r"\\u[dD][89abAB][0-9a-fA-F]{2}$")
+
+
+class PartialStringField:
+    def __init__(self, key: str):
+        self._key_pattern = re.compile(r'(?<!\\)"' + re.escape(key) + r'"\s*:\s*"')
+        self._buffer = ""
+        self._start: int | None = None  # index of the first char of the value
+        self._pos = 0                   # next undecoded index in the buffer
+        self.value = ""
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk of raw JSON; return the newly decoded part of the value."""
+        if self.done:
+            return ""
+        self._buffer += chunk
+
+        if self._start is None:
+            match = self._key_pattern.search(self._buffer)
+            if match is None:
+                return ""
+            self._start = self._pos = match.end()
+
+        # Scan forward to the last position that ends on a complete character
+        i = self._pos
+        end = self._pos
+        buf = self._buffer
+        while i < len(buf):
+            ch = buf[i]
+            if ch == "\\":
+                if i + 1 >= len(buf):
+                    break
+                if buf[i + 1] == "u":
+                    if i + 6 > len(buf):
+                        break
+                    i += 6
+                else:
+                    i += 2
+                end = i
+            elif ch == '"':
+                self.done = True
+                break
+            else:
+                i += 1
+                end = i
+
+        segment = buf[self._pos:end]
+        # Hold back a trailing high surrogate until its pair arrives
+        if not self.done and _HIGH_SURROGATE.search(segment):
+            segment = segment[:-6]
+            end -= 6
+        if not segment:
+            return ""
+
+        self._pos = end
+        decoded = json.loads(f'"{segment}"')
+        self.value += decoded
+        return decoded
@@ -2,20 +2,55 @@
 SSE (Server-Sent Events) formatting helpers.
 
 The SSE format is:
+    id: <sequence number>\n      (optional — lets clients resume via Last-Event-ID)
     data: <json payload>\n\n
 
 Each event is a single JSON object on the data line.
+
+Two wire protocols share that framing (so EventSource and Last-Event-ID resume
+work with both); clients pick one per stream with `?protocol=` or the
+X-Nexus-Protocol header:
+
+  1  (default) — every event as produced, stdlib json
+  2            — compact: payloads another event already carries are dropped
+                 (a write_section tool_call refers to its report_section by
+                 `id` instead of repeating the section body), orjson-encoded
+                 bytes when orjson is installed, pre-encoded constant frames,
+                 bursts of streaming deltas arriving within
+                 NEXUS_SSE_COALESCE_MS sent as one write, gzip when the client
+                 accepts it (NEXUS_SSE_GZIP)
 """
 import json
+import os
+import zlib
+from collections.abc import Iterable
 from typing import Any
 
+try:
+    import orjson  # optional, faster: pip install orjson
+except ImportError:
+    orjson = None
+
+PROTOCOL_VERSIONS = (1, 2)
+SSE_COALESCE_MS = float(os.getenv("NEXUS_SSE_COALESCE_MS", "20"))  # protocol 2 only, 0 = off
+SSE_GZIP = os.getenv("NEXUS_SSE_GZIP", "1") != "0"                 # protocol 2 only
+
+# High-rate, low-value-per-event types worth delaying a few ms to batch up.
+# Everything else (tool calls, sections, completion) is flushed at once.
+_COALESCED_EVENTS = frozenset({"thinking_delta", "section_delta"})
+
+_HEARTBEAT_FRAME = b": heartbeat\n\n"
+_STREAM_END_FRAME = b'data: {"type":"stream_end"}\n\n'
+
 
-def format_sse(event: dict[str, Any]) -> str:
+def format_sse(event: dict[str, Any], event_id: int | None = None) -> str:
     """
     Serialize an event dict to the SSE wire format.
-    Returns a string like:  data: {...}\n\n
+    Returns a string like:  id: 7\ndata: {...}\n\n  (id line only if event_id is given)
     """
-    return f"data: {json.dumps(event)}\n\n"
+    if event_id is None:
+        return f"data: {json.dumps(event)}\n\n"
+    return f"id: {event_id}\ndata: {json.dumps(event)}\n\n"
 
 
 def sse_error(message: str) -> str:
@@ -26,3 +61,72 @@ def sse_error(message: str) -> str:
 def sse_heartbeat() -> str:
     """Heartbeat comment to keep the connection alive during long pauses."""
     return ": heartbeat\n\n"
+
+
+# ── Protocol 2 ───────────────────────────────────────────────────────────────
+
+def dumps(event: dict[str, Any]) -> bytes:
+    """Compact JSON bytes (orjson if available)."""
+    if orjson is not None:
+        return orjson.dumps(event)
+    return json.dumps(event, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def compact_event(event: dict[str, Any]) -> dict[str, Any]:
+    """Protocol 2 payload of an event: drop what another event already carries."""
+    if event.get("type") == "tool_call" and event.get("tool") == "write_section" and "id" in event:
+        # The report_section with section_id == id carries content and citations
+        return {**event, "input": {"title": event.get("input", {}).get("title", "")}}
+    return event
+
+
+class SSEEncoder:
+    """Frames one subscriber's events as bytes in the negotiated protocol."""
+
+    def __init__(self, version: int = 1, gzip: bool = False):
+        self.version = version
+        self.coalesce_seconds = SSE_COALESCE_MS / 1000 if version >= 2 else 0.0
+        # One compressor per stream: later frames reuse earlier ones as dictionary
+        self._gzip = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if gzip else None
+
+    @classmethod
+    def negotiate(cls, version: int, accept_encoding: str = "") -> "SSEEncoder":
+        return cls(version, gzip=version >= 2 and SSE_GZIP and "gzip" in accept_encoding.lower())
+
+    def should_coalesce(self, batch: list[tuple[int, dict[str, Any]]]) -> bool:
+        """Wait coalesce_seconds for more events before writing `batch`?"""
+        return bool(self.coalesce_seconds) and all(event.get("type") in _COALESCED_EVENTS for _, event in batch)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {"X-Nexus-Protocol": str(self.version)}
+        if self._gzip is not None:
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+        return headers
+
+    def events(self, batch: Iterable[tuple[int, dict[str, Any]]]) -> bytes:
+        """One write for a batch of (seq, event)."""
+        if self.version == 1:
+            return self._out("".join(format_sse(event, event_id=seq) for seq, event in batch).encode())
+        frames = []
+        for seq, event in batch:
+            frames += (b"id: ", str(seq).encode(), b"\ndata: ", dumps(compact_event(event)), b"\n\n")
+        return self._out(b"".join(frames))
+
+    def heartbeat(self) -> bytes:
+        return self._out(_HEARTBEAT_FRAME)
+
+    def end(self) -> bytes:
+        """The final stream_end frame (and the end of the gzip stream)."""
+        if self.version == 1:
+            return format_sse({"type": "stream_end"}).encode()
+        if self._gzip is None:
+            return _STREAM_END_FRAME
+        return self._gzip.compress(_STREAM_END_FRAME) + self._gzip.flush(zlib.Z_FINISH)
+
+    def _out(self, data: bytes) -> bytes:
+        if self._gzip is None:
+            return data
+        # Sync-flush so the client can decode everything sent so far
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
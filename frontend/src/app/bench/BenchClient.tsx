@@ -0,0 +1,185 @@
+"use client";
+import { useCallback, useState } from "react";
+import { flushSync } from "react-dom";
+import AgentTimeline from "@/components/AgentTimeline";
+import ReportViewer from "@/components/ReportViewer";
+import { applyEvent, useResearchStore } from "@/lib/store";
+import type { AgentEvent } from "@/lib/types";
+
+// A recorded job's SSE events (backend: python -m bench.record_job)
+const RECORDING_URL = "/bench/job-500.json";
+const END_EVENTS = new Set(["complete", "error", "cancelled", "stream_end"]);
+const FEED_EVENTS = new Set(["agent_thinking", "tool_call", "tool_result", "report_section"]);
+const EDGE = 100; // events compared at the start and the end of the run
+
+interface Stats {
+  count: number;
+  mean: number;
+  p50: number;
+  p95: number;
+  p99: number;
+  max: number;
+}
+
+interface BenchResult {
+  events: number;
+  wallMs: number;
+  all: Stats;
+  feed: Stats; // activity feed entries and report sections
+  deltas: Stats; // section_delta (the draft section)
+  firstFeedMs: number; // mean of the first EDGE feed events
+  lastFeedMs: number; // mean of the last EDGE feed events
+}
+
+function stats(values: number[]): Stats {
+  const sorted = [...values].sort((a, b) => a - b);
+  const rank = (p: number) => sorted[Math.max(0, Math.ceil((p / 100) * sorted.length) - 1)] ?? 0;
+  const round = (ms: number) => Math.round(ms * 100) / 100;
+  return {
+    count: sorted.length,
+    mean: round(sorted.reduce((sum, v) => sum + v, 0) / Math.max(1, sorted.length)),
+    p50: round(rank(50)),
+    p95: round(rank(95)),
+    p99: round(rank(99)),
+    max: round(sorted[sorted.length - 1] ?? 0),
+  };
+}
+
+function mean(values: number[]): number {
+  return Math.round((values.reduce((sum, v) => sum + v, 0) / Math.max(1, values.length)) * 100) / 100;
+}
+
+const nextFrame = () => new Promise<void>((resolve) => requestAnimationFrame(() => resolve()));
+
+interface Props {
+  repeat: number;
+}
+
+/**
+ * Render benchmark: replays a recorded job into the store one event per
+ * frame, as a live stream would arrive, and times the synchronous React
+ * render + commit each event causes. With ?repeat=N the recording is played N
+ * times into one job — per-event cost should not grow with the job's length.
+ * Run against a production build (pnpm build && pnpm start).
+ */
+export default function BenchClient({ repeat }: Props) {
+  const [running, setRunning] = useState(false);
+  const [result, setResult] = useState<BenchResult | null>(null);
+  const [error, setError] = useState<string | null>(null);
+
+  const run = useCallback(async () => {
+    setRunning(true);
+    setResult(null);
+    setError(null);
+    try {
+      const res = await fetch(RECORDING_URL);
+      if (!res.ok) throw new Error(`${RECORDING_URL}: HTTP ${res.status}`);
+      const recording: AgentEvent[] = await res.json();
+
+      const store = useResearchStore.getState();
+      store.reset();
+      store.setQuery("Render benchmark");
+      store.setStatus("streaming");
+
+      const all: number[] = [];
+      const feed: number[] = [];
+      const deltas: number[] = [];
+      const started = performance.now();
+      for (let r = 0; r < repeat; r++) {
+        for (const event of recording) {
+          if (r < repeat - 1 && END_EVENTS.has(event.type)) continue;
+          const t0 = performance.now();
+          flushSync(() => {
+            applyEvent(event);
+          });
+          const ms = performance.now() - t0;
+          all.push(ms);
+          if (event.type === "section_delta") deltas.push(ms);
+          else if (FEED_EVENTS.has(event.type)) feed.push(ms);
+          await nextFrame(); // layout, row measurement and paint happen between events
+        }
+      }
+
+      const bench: BenchResult = {
+        events: all.length,
+        wallMs: Math.round(performance.now() - started),
+        all: stats(all),
+        feed: stats(feed),
+        deltas: stats(deltas),
+        firstFeedMs: mean(feed.slice(0, EDGE)),
+        lastFeedMs: mean(feed.slice(-EDGE)),
+      };
+      setResult(bench);
+      (window as unknown as { __nexusBench?: BenchResult }).__nexusBench = bench; // for scripted runs
+      console.table({ all: bench.all, feed: bench.feed, deltas: bench.deltas });
+    } catch (err) {
+      setError(err instanceof Error ? err.message : String(err));
+    } finally {
+      setRunning(false);
+    }
+  }, [repeat]);
+
+  const rows: [string, Stats][] = result
+    ? [["all events", result.all], ["feed + sections", result.feed], ["section deltas", result.deltas]]
+    : [];
+
+  return (
+    <div className="flex flex-col h-screen overflow-hidden">
+      <header className="shrink-0 flex items-center gap-3 px-4 py-3 border-b border-white/5 bg-[#080d18]/80">
+        <span className="text-sm font-bold bg-linear-to-r from-cyan-400 to-blue-400 bg-clip-text text-transparent">
+          Nexus
+        </span>
+        <span className="text-xs text-slate-400">
+          Render benchmark — {RECORDING_URL} × {repeat}
+        </span>
+        <button
+          onClick={run}
+          disabled={running}
+          className="ml-auto px-3 py-1.5 rounded-lg text-xs font-medium bg-cyan-500/10 border border-cyan-500/20
+            text-cyan-300 hover:bg-cyan-500/20 disabled:opacity-50 transition-all duration-200"
+        >
+          {running ? "Running…" : "Run"}
+        </button>
+      </header>
+
+      {error && <p className="shrink-0 px-4 py-2 text-xs text-red-300 font-mono">{error}</p>}
+
+      {result && (
+        <div className="shrink-0 px-4 py-3 border-b border-white/5 text-xs text-slate-300 font-mono space-y-2">
+          <p>
+            {result.events} events in {result.wallMs} ms · render + commit per event (ms) · first {EDGE} feed
+            events {result.firstFeedMs} ms, last {EDGE} {result.lastFeedMs} ms
+          </p>
+          <table className="text-left">
+            <thead className="text-slate-500">
+              <tr>
+                {["", "count", "mean", "p50", "p95", "p99", "max"].map((h) => (
+                  <th key={h} className="pr-6 font-normal">{h}</th>
+                ))}
+              </tr>
+            </thead>
+            <tbody>
+              {rows.map(([label, s]) => (
+                <tr key={label}>
+                  <td className="pr-6 text-slate-500">{label}</td>
+                  {[s.count, s.mean, s.p50, s.p95, s.p99, s.max].map((v, i) => (
+                    <td key={i} className="pr-6">{v}</td>
+                  ))}
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        </div>
+      )}
+
+      <div className="flex flex-1 overflow-hidden divide-x divide-white/5">
+        <div className="w-[38%] overflow-hidden bg-[#080d18]">
+          <AgentTimeline />
+        </div>
+        <div className="flex-1 overflow-hidden bg-[#060b14]">
+          <ReportViewer />
+        </div>
+      </div>
+    </div>
+  );
+}
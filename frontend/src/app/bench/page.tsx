@@ -0,0 +1,10 @@
+import BenchClient from "./BenchClient";
+
+interface Props {
+  searchParams: Promise<{ repeat?: string }>;
+}
+
+export default async function BenchPage({ searchParams }: Props) {
+  const { repeat } = await searchParams;
+  return <BenchClient repeat={Math.max(1, Number(repeat) || 1)} />;
+}
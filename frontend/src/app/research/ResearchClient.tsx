@@ -12,7 +12,9 @@ interface Props {
 
 export default function ResearchClient({ initialQuery }: Props) {
   const { startResearch } = useResearch();
-  const { status, sections, error } = useResearchStore();
+  const status = useResearchStore((s) => s.status);
+  const sectionCount = useResearchStore((s) => s.sectionCount);
+  const error = useResearchStore((s) => s.error);
   const router = useRouter();
   const started = useRef(false);
   const [timelineOpen, setTimelineOpen] = useState(true);
@@ -30,7 +32,7 @@ export default function ResearchClient({ initialQuery }: Props) {
     status === "complete"
       ? 100
       : status === "streaming"
-      ? Math.min(90, (sections.length / totalExpected) * 85 + 5)
+      ? Math.min(90, (sectionCount / totalExpected) * 85 + 5)
       : status === "loading"
       ? 3
       : 0;
@@ -1,18 +1,31 @@
 "use client";
-import { useEffect, useRef } from "react";
+import { memo } from "react";
 import { useResearchStore } from "@/lib/store";
+import { useVirtualList } from "@/lib/useVirtualList";
 import ToolCallCard from "./ToolCallCard";
 
-export default function AgentTimeline() {
-  const { events, status } = useResearchStore();
-  const bottomRef = useRef<HTMLDivElement>(null);
+// One feed entry; it reads only its own event, so it renders once
+const TimelineRow = memo(function TimelineRow({ index }: { index: number }) {
+  const event = useResearchStore((s) => s.events[index]);
+  return event ? <ToolCallCard event={event} /> : null;
+});
 
-  // Auto-scroll to bottom as new events arrive
-  useEffect(() => {
-    bottomRef.current?.scrollIntoView({ behavior: "smooth" });
-  }, [events.length]);
+export default function AgentTimeline() {
+  const status = useResearchStore((s) => s.status);
+  const eventCount = useResearchStore((s) => s.eventCount);
 
-  const displayEvents = events.filter((e) => e.type !== "stream_end");
+  // Only the entries in view are rendered; the list follows new events
+  // while scrolled to the end
+  const { scrollRef, start, end, offsetTop, totalHeight, measure } =
+    useVirtualList<HTMLDivElement>({ count: eventCount, estimateSize: 44 });
+  const rows = [];
+  for (let i = start; i < end; i++) {
+    rows.push(
+      <div key={i} data-index={i} ref={measure} className="pb-3">
+        <TimelineRow index={i} />
+      </div>
+    );
+  }
 
   return (
     <div className="flex flex-col h-full">
@@ -38,17 +51,22 @@ export default function AgentTimeline() {
       </div>
 
       {/* Event list */}
-      <div className="flex-1 overflow-y-auto px-4 py-3 space-y-3 scrollbar-thin scrollbar-track-transparent scrollbar-thumb-white/10">
-        {displayEvents.length === 0 && status === "loading" && (
+      <div
+        ref={scrollRef}
+        className="flex-1 overflow-y-auto px-4 py-3 scrollbar-thin scrollbar-track-transparent scrollbar-thumb-white/10"
+      >
+        {eventCount === 0 && status === "loading" && (
           <div className="flex flex-col items-center justify-center h-32 gap-3">
             <div className="w-8 h-8 rounded-full border-2 border-cyan-500/30 border-t-cyan-500 animate-spin" />
             <p className="text-xs text-slate-500">Starting research...</p>
           </div>
         )}
 
-        {displayEvents.map((event, i) => (
-          <ToolCallCard key={i} event={event} />
-        ))}
+        <div className="relative" style={{ height: totalHeight }}>
+          <div className="absolute inset-x-0 top-0" style={{ transform: `translateY(${offsetTop}px)` }}>
+            {rows}
+          </div>
+        </div>
 
         {/* Streaming cursor */}
         {status === "streaming" && (
@@ -56,8 +74,6 @@ export default function AgentTimeline() {
             <span className="w-1 h-3.5 bg-cyan-400 animate-pulse rounded-sm" />
           </div>
         )}
-
-        <div ref={bottomRef} />
       </div>
     </div>
   );
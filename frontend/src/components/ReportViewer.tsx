@@ -1,5 +1,5 @@
 "use client";
-import { useCallback } from "react";
+import { memo, useCallback, useDeferredValue } from "react";
 import Markdown from "react-markdown";
 import remarkGfm from "remark-gfm";
 import { useResearchStore } from "@/lib/store";
@@ -37,16 +37,88 @@ function buildMarkdown(
   return lines.join("\n");
 }
 
+const REMARK_PLUGINS = [remarkGfm];
+const PROSE_CLASSES = `prose prose-invert prose-sm max-w-none
+  prose-headings:text-slate-200 prose-p:text-slate-300 prose-p:leading-relaxed
+  prose-li:text-slate-300 prose-strong:text-white prose-a:text-cyan-400`;
+
+// Markdown is parsed once per distinct text
+const MarkdownBlock = memo(function MarkdownBlock({ text }: { text: string }) {
+  return <Markdown remarkPlugins={REMARK_PLUGINS}>{text}</Markdown>;
+});
+
+// A finished section never changes, so it renders (and parses) once
+const ReportSection = memo(function ReportSection({ index }: { index: number }) {
+  const sec = useResearchStore((s) => s.sections[index]);
+  if (!sec) return null;
+  return (
+    <div className="rounded-xl border border-white/5 bg-white/[0.02] p-5 space-y-3 animate-fade-in-up">
+      <h2 className="text-base font-semibold text-white">{sec.title}</h2>
+      <div className={`${PROSE_CLASSES}
+        prose-code:text-cyan-300 prose-code:bg-white/5 prose-code:px-1 prose-code:rounded
+        prose-blockquote:border-l-cyan-500 prose-blockquote:text-slate-400`}>
+        <MarkdownBlock text={sec.content} />
+      </div>
+      {sec.citations.length > 0 && (
+        <div className="pt-2 border-t border-white/5">
+          <p className="text-[10px] font-semibold text-slate-500 uppercase tracking-wider mb-2">Sources</p>
+          <div className="flex flex-wrap gap-1.5">
+            {sec.citations.map((c, j) => (
+              <CitationBadge key={j} citation={c} index={j} />
+            ))}
+          </div>
+        </div>
+      )}
+    </div>
+  );
+});
+
+// The draft grows by a delta at a time. Its finished paragraphs are parsed
+// once each; only the paragraph being written is parsed again per delta.
+// Code fences can span blank lines, so a draft with one is parsed whole.
+function draftBlocks(content: string): string[] {
+  return content.includes("```") ? [content] : content.split(/\n{2,}/);
+}
+
+// The section Claude is still writing
+function DraftSectionView() {
+  const draft = useResearchStore((s) => s.draftSection);
+  const streaming = useResearchStore((s) => s.status === "streaming");
+  // Under a burst of deltas React may skip intermediate drafts
+  const content = useDeferredValue(draft?.content ?? "");
+  if (!draft || !streaming) return null;
+  return (
+    <div className="rounded-xl border border-cyan-500/10 bg-white/[0.02] p-5 space-y-3">
+      <h2 className="text-base font-semibold text-white">{draft.title}</h2>
+      <div className={PROSE_CLASSES}>
+        {draftBlocks(content).map((block, i) => (
+          <MarkdownBlock key={i} text={block} />
+        ))}
+      </div>
+      <span className="inline-block w-1 h-3.5 bg-cyan-400 animate-pulse rounded-sm" />
+    </div>
+  );
+}
+
+function currentMarkdown(): { md: string; title: string } {
+  const { reportTitle, executiveSummary, sections } = useResearchStore.getState();
+  return { md: buildMarkdown(reportTitle, executiveSummary, sections), title: reportTitle };
+}
+
 export default function ReportViewer() {
-  const { sections, status, executiveSummary, reportTitle } = useResearchStore();
+  const sectionCount = useResearchStore((s) => s.sectionCount);
+  const hasDraft = useResearchStore((s) => s.draftSection !== null);
+  const status = useResearchStore((s) => s.status);
+  const executiveSummary = useResearchStore((s) => s.executiveSummary);
+  const reportTitle = useResearchStore((s) => s.reportTitle);
 
+  // Read the report when clicked — the viewer does not re-render per section for these
   const handleCopy = useCallback(() => {
-    const md = buildMarkdown(reportTitle, executiveSummary, sections);
-    navigator.clipboard.writeText(md).catch(() => {});
-  }, [reportTitle, executiveSummary, sections]);
+    navigator.clipboard.writeText(currentMarkdown().md).catch(() => {});
+  }, []);
 
   const handleDownload = useCallback(() => {
-    const md = buildMarkdown(reportTitle, executiveSummary, sections);
+    const { md, title: reportTitle } = currentMarkdown();
     const blob = new Blob([md], { type: "text/markdown" });
     const url = URL.createObjectURL(blob);
     const a = document.createElement("a");
@@ -54,7 +126,12 @@ export default function ReportViewer() {
     a.download = `${reportTitle.replace(/[^a-z0-9]/gi, "-").toLowerCase() || "research-report"}.md`;
     a.click();
     URL.revokeObjectURL(url);
-  }, [reportTitle, executiveSummary, sections]);
+  }, []);
+
+  const sections = [];
+  for (let i = 0; i < sectionCount; i++) {
+    sections.push(<ReportSection key={i} index={i} />);
+  }
 
   return (
     <div className="flex flex-col h-full">
@@ -66,7 +143,7 @@ export default function ReportViewer() {
             Research Report
           </h2>
         </div>
-        {sections.length > 0 && (
+        {sectionCount > 0 && (
           <div className="flex gap-2 shrink-0">
             <button
               onClick={handleCopy}
@@ -92,7 +169,7 @@ export default function ReportViewer() {
       <div className="flex-1 overflow-y-auto px-5 py-4 space-y-6 scrollbar-thin scrollbar-track-transparent scrollbar-thumb-white/10">
 
         {/* Empty state */}
-        {sections.length === 0 && status !== "complete" && (
+        {sectionCount === 0 && !hasDraft && status !== "complete" && (
           <div className="flex flex-col items-center justify-center h-48 gap-4 text-center">
             {status === "idle" ? (
               <>
@@ -128,38 +205,17 @@ export default function ReportViewer() {
         )}
 
         {/* Report title */}
-        {(reportTitle && sections.length > 0) && (
+        {(reportTitle && sectionCount > 0) && (
           <h1 className="text-xl font-bold text-white leading-snug animate-fade-in-up">
             {reportTitle}
           </h1>
         )}
 
         {/* Sections */}
-        {sections.map((sec, i) => (
-          <div
-            key={i}
-            className="rounded-xl border border-white/5 bg-white/[0.02] p-5 space-y-3 animate-fade-in-up"
-          >
-            <h2 className="text-base font-semibold text-white">{sec.title}</h2>
-            <div className="prose prose-invert prose-sm max-w-none
-              prose-headings:text-slate-200 prose-p:text-slate-300 prose-p:leading-relaxed
-              prose-li:text-slate-300 prose-strong:text-white prose-a:text-cyan-400
-              prose-code:text-cyan-300 prose-code:bg-white/5 prose-code:px-1 prose-code:rounded
-              prose-blockquote:border-l-cyan-500 prose-blockquote:text-slate-400">
-              <Markdown remarkPlugins={[remarkGfm]}>{sec.content}</Markdown>
-            </div>
-            {sec.citations.length > 0 && (
-              <div className="pt-2 border-t border-white/5">
-                <p className="text-[10px] font-semibold text-slate-500 uppercase tracking-wider mb-2">Sources</p>
-                <div className="flex flex-wrap gap-1.5">
-                  {sec.citations.map((c, j) => (
-                    <CitationBadge key={j} citation={c} index={j} />
-                  ))}
-                </div>
-              </div>
-            )}
-          </div>
-        ))}
+        {sections}
+
+        {/* Section Claude is still writing */}
+        <DraftSectionView />
 
         {/* Bottom padding */}
         <div className="h-4" />
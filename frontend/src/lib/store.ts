@@ -1,5 +1,12 @@
 import { create } from "zustand";
-import type { AgentEvent, ReportSectionEvent } from "./types";
+import type { AgentEvent, ReportSectionEvent, SectionDeltaEvent } from "./types";
+
+// A section Claude is still writing — replaced by the final report_section
+export interface DraftSection {
+  id: string;
+  title: string;
+  content: string;
+}
 
 export type ResearchStatus =
   | "idle"
@@ -8,12 +15,27 @@ export type ResearchStatus =
   | "complete"
   | "error";
 
+// Event types the activity feed shows (see ToolCallCard); the rest are not stored
+const TIMELINE_EVENTS = new Set<AgentEvent["type"]>([
+  "agent_thinking",
+  "tool_call",
+  "tool_result",
+  "error",
+]);
+
+// `events` and `sections` are append-only logs: adding to one pushes in place
+// and bumps its count, so an append costs the same however long the job is.
+// Subscribe to the counts (or to one index, `s.events[i]`), never to the
+// arrays themselves — their identity only changes on reset().
 interface ResearchState {
   query: string;
   researchId: string | null;
   status: ResearchStatus;
   events: AgentEvent[];
+  eventCount: number;
   sections: ReportSectionEvent[];
+  sectionCount: number;
+  draftSection: DraftSection | null;
   executiveSummary: string;
   reportTitle: string;
   error: string | null;
@@ -23,6 +45,7 @@ interface ResearchState {
   setStatus: (s: ResearchStatus) => void;
   addEvent: (e: AgentEvent) => void;
   addSection: (s: ReportSectionEvent) => void;
+  appendSectionDelta: (d: SectionDeltaEvent) => void;
   setComplete: (title: string, summary: string) => void;
   setError: (msg: string) => void;
   reset: () => void;
@@ -33,7 +56,10 @@ export const useResearchStore = create<ResearchState>()((set) => ({
   researchId: null,
   status: "idle",
   events: [],
+  eventCount: 0,
   sections: [],
+  sectionCount: 0,
+  draftSection: null,
   executiveSummary: "",
   reportTitle: "",
   error: null,
@@ -41,8 +67,25 @@ export const useResearchStore = create<ResearchState>()((set) => ({
   setQuery: (query) => set({ query }),
   setResearchId: (researchId) => set({ researchId }),
   setStatus: (status) => set({ status }),
-  addEvent: (e) => set((s) => ({ events: [...s.events, e] })),
-  addSection: (section) => set((s) => ({ sections: [...s.sections, section] })),
+  addEvent: (e) => {
+    if (!TIMELINE_EVENTS.has(e.type)) return;
+    set((s) => {
+      s.events.push(e);
+      return { eventCount: s.events.length };
+    });
+  },
+  addSection: (section) =>
+    set((s) => {
+      s.sections.push(section);
+      return { sectionCount: s.sections.length, draftSection: null };
+    }),
+  appendSectionDelta: (d) =>
+    set((s) => ({
+      draftSection:
+        s.draftSection?.id === d.section_id
+          ? { ...s.draftSection, title: d.title, content: s.draftSection.content + d.delta }
+          : { id: d.section_id, title: d.title, content: d.delta },
+    })),
   setComplete: (reportTitle, executiveSummary) =>
     set({ reportTitle, executiveSummary, status: "complete" }),
   setError: (error) => set({ error, status: "error" }),
@@ -51,9 +94,48 @@ export const useResearchStore = create<ResearchState>()((set) => ({
       researchId: null,
       status: "idle",
       events: [],
+      eventCount: 0,
       sections: [],
+      sectionCount: 0,
+      draftSection: null,
       executiveSummary: "",
       reportTitle: "",
       error: null,
     }),
 }));
+
+/**
+ * Apply one SSE event to the store. Returns true once the stream is over
+ * (complete, error, cancelled or stream_end) and can be closed.
+ */
+export function applyEvent(event: AgentEvent): boolean {
+  const store = useResearchStore.getState();
+
+  // Streaming deltas feed the draft section, not the activity feed
+  if (event.type === "section_delta") {
+    store.appendSectionDelta(event);
+    return false;
+  }
+  if (event.type === "thinking_delta") return false;
+
+  store.addEvent(event);
+
+  if (event.type === "report_section") {
+    store.addSection(event);
+  } else if (event.type === "complete") {
+    store.setComplete(event.report_title, event.executive_summary);
+    return true;
+  } else if (event.type === "error") {
+    store.setError(event.message);
+    return true;
+  } else if (event.type === "cancelled") {
+    store.setError("Research was cancelled.");
+    return true;
+  } else if (event.type === "stream_end") {
+    if (useResearchStore.getState().status !== "complete") {
+      store.setStatus("complete");
+    }
+    return true;
+  }
+  return false;
+}
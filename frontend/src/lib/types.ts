@@ -13,6 +13,9 @@ export interface AgentThinkingEvent {
 export interface ToolCallEvent {
   type: "tool_call";
   tool: string;
+  id?: string;
+  // Protocol 2: write_section calls carry only { title } — the body is in the
+  // report_section whose section_id equals this id
   input: Record<string, unknown>;
 }
 
@@ -24,11 +27,25 @@ export interface ToolResultEvent {
 
 export interface ReportSectionEvent {
   type: "report_section";
+  section_id?: string;
   title: string;
   content: string;
   citations: Citation[];
 }
 
+// Incremental output while Claude is still generating (streaming mode)
+export interface ThinkingDeltaEvent {
+  type: "thinking_delta";
+  delta: string;
+}
+
+export interface SectionDeltaEvent {
+  type: "section_delta";
+  section_id: string;
+  title: string;
+  delta: string;
+}
+
 export interface CompleteEvent {
   type: "complete";
   report_title: string;
@@ -40,6 +57,11 @@ export interface ErrorEvent {
   message: string;
 }
 
+export interface CancelledEvent {
+  type: "cancelled";
+  reason: string;
+}
+
 export interface StreamEndEvent {
   type: "stream_end";
 }
@@ -49,6 +71,9 @@ export type AgentEvent =
   | ToolCallEvent
   | ToolResultEvent
   | ReportSectionEvent
+  | ThinkingDeltaEvent
+  | SectionDeltaEvent
   | CompleteEvent
   | ErrorEvent
+  | CancelledEvent
   | StreamEndEvent;
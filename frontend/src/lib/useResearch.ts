@@ -1,19 +1,28 @@
 "use client";
 import { useCallback, useRef } from "react";
-import { useResearchStore } from "./store";
-import type { AgentEvent, ReportSectionEvent } from "./types";
+import { applyEvent, useResearchStore } from "./store";
+import type { AgentEvent } from "./types";
 
 const BACKEND_URL =
   process.env.NEXT_PUBLIC_BACKEND_URL || "http://localhost:8000";
 
+// Reads and writes the store through getState(), without subscribing: the
+// component using this hook does not re-render on every event.
 export function useResearch() {
-  const store = useResearchStore();
   const esRef = useRef<EventSource | null>(null);
 
   const startResearch = useCallback(
     async (query: string) => {
-      // Close any existing stream
+      const store = useResearchStore.getState();
+
+      // Close any existing stream, and stop its job if it is still running
       esRef.current?.close();
+      if (store.researchId && store.status === "streaming") {
+        fetch(`${BACKEND_URL}/api/research/${store.researchId}`, {
+          method: "DELETE",
+          keepalive: true,
+        }).catch(() => {});
+      }
 
       store.reset();
       store.setQuery(query);
@@ -38,40 +47,29 @@ export function useResearch() {
         store.setResearchId(researchId);
         store.setStatus("streaming");
 
-        // Open SSE stream
+        // Open SSE stream (compact wire protocol, see backend/utils/streaming.py)
         const es = new EventSource(
-          `${BACKEND_URL}/api/research/${researchId}/stream`
+          `${BACKEND_URL}/api/research/${researchId}/stream?protocol=2`
         );
         esRef.current = es;
 
         es.onmessage = (e: MessageEvent) => {
           try {
             const event: AgentEvent = JSON.parse(e.data as string);
-            store.addEvent(event);
-
-            if (event.type === "report_section") {
-              store.addSection(event as ReportSectionEvent);
-            } else if (event.type === "complete") {
-              store.setComplete(event.report_title, event.executive_summary);
-              es.close();
-            } else if (event.type === "error") {
-              store.setError(event.message);
-              es.close();
-            } else if (event.type === "stream_end") {
-              if (store.status !== "complete") {
-                store.setStatus("complete");
-              }
-              es.close();
-            }
+            if (applyEvent(event)) es.close();
           } catch {
             // skip parse errors
           }
         };
 
         es.onerror = () => {
+          // The browser reconnects on its own and sends Last-Event-ID, so the
+          // backend replays only what was missed. Give up only once it stops.
+          if (es.readyState === EventSource.CONNECTING) return;
+          const { status } = useResearchStore.getState();
           if (
-            store.status !== "complete" &&
-            store.status !== "error"
+            status !== "complete" &&
+            status !== "error"
           ) {
             store.setError("Connection to research stream lost.");
           }
@@ -83,7 +81,7 @@ export function useResearch() {
         );
       }
     },
-    [store]
+    []
   );
 
   return { startResearch };
@@ -0,0 +1,143 @@
+"use client";
+import { useCallback, useEffect, useLayoutEffect, useRef, useState, type RefObject } from "react";
+
+interface VirtualListOptions {
+  count: number;
+  estimateSize: number; // px per row until it has been measured
+  overscan?: number; // rows rendered beyond each edge of the viewport
+  stickToBottom?: boolean; // follow new rows while scrolled to the end
+}
+
+export interface VirtualList<T extends HTMLElement> {
+  scrollRef: RefObject<T | null>;
+  start: number; // first rendered row
+  end: number; // one past the last rendered row
+  offsetTop: number; // px above the first rendered row
+  totalHeight: number;
+  measure: (el: HTMLElement | null) => (() => void) | undefined; // ref for each row (needs data-index)
+}
+
+const BOTTOM_SLACK_PX = 32;
+
+// offsets[i] is the top of row i; offsets[count] is the total height
+function firstRowBelow(offsets: number[], count: number, y: number): number {
+  let lo = 0;
+  let hi = count;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (offsets[mid + 1] <= y) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+/**
+ * Windowed rendering for a list that only grows at the end (or is cleared):
+ * only the rows in view (plus `overscan`) are rendered. Rows have variable
+ * heights — each is measured once mounted — and are positioned from a
+ * prefix sum of their heights, which an append extends at the tail, so a new
+ * row costs the same however long the list is.
+ */
+export function useVirtualList<T extends HTMLElement>({
+  count,
+  estimateSize,
+  overscan = 6,
+  stickToBottom = true,
+}: VirtualListOptions): VirtualList<T> {
+  const scrollRef = useRef<T>(null);
+  const sizes = useRef<number[]>([]);
+  const offsets = useRef<number[]>([0]);
+  const atBottom = useRef(true);
+  const observer = useRef<ResizeObserver | null>(null);
+  const [viewport, setViewport] = useState({ top: 0, height: 0 });
+  const [layoutVersion, setLayoutVersion] = useState(0);
+
+  // Extend the prefix sum for new rows; start over when the list was cleared
+  if (sizes.current.length > count) {
+    sizes.current = [];
+    offsets.current = [0];
+  }
+  for (let i = sizes.current.length; i < count; i++) {
+    sizes.current.push(estimateSize);
+    offsets.current[i + 1] = offsets.current[i] + estimateSize;
+  }
+
+  const getObserver = useCallback(() => {
+    if (!observer.current) {
+      observer.current = new ResizeObserver((entries) => {
+        let first = Infinity;
+        for (const entry of entries) {
+          const el = entry.target as HTMLElement;
+          const index = Number(el.dataset.index);
+          const size = el.offsetHeight;
+          if (index < sizes.current.length && sizes.current[index] !== size) {
+            sizes.current[index] = size;
+            first = Math.min(first, index);
+          }
+        }
+        if (first === Infinity) return;
+        // Rows are measured as they mount at the tail, so this is usually short
+        for (let i = first; i < sizes.current.length; i++) {
+          offsets.current[i + 1] = offsets.current[i] + sizes.current[i];
+        }
+        setLayoutVersion((v) => v + 1);
+      });
+    }
+    return observer.current;
+  }, []);
+
+  const measure = useCallback(
+    (el: HTMLElement | null) => {
+      if (!el) return undefined;
+      const ro = getObserver();
+      ro.observe(el);
+      return () => ro.unobserve(el);
+    },
+    [getObserver]
+  );
+
+  useEffect(() => () => observer.current?.disconnect(), []);
+
+  // Track the viewport: scroll position and the container's own size
+  useLayoutEffect(() => {
+    const el = scrollRef.current;
+    if (!el) return;
+    const update = () => {
+      atBottom.current = el.scrollHeight - el.scrollTop - el.clientHeight < BOTTOM_SLACK_PX;
+      setViewport((v) =>
+        v.top === el.scrollTop && v.height === el.clientHeight
+          ? v
+          : { top: el.scrollTop, height: el.clientHeight }
+      );
+    };
+    update();
+    const resize = new ResizeObserver(update);
+    resize.observe(el);
+    el.addEventListener("scroll", update, { passive: true });
+    return () => {
+      resize.disconnect();
+      el.removeEventListener("scroll", update);
+    };
+  }, []);
+
+  // Follow the end of the list as it grows, unless the reader scrolled up
+  useLayoutEffect(() => {
+    const el = scrollRef.current;
+    if (el && stickToBottom && atBottom.current) {
+      el.scrollTop = el.scrollHeight;
+    }
+  }, [count, layoutVersion, stickToBottom]);
+
+  const totalHeight = offsets.current[count];
+  const start = Math.max(0, firstRowBelow(offsets.current, count, viewport.top) - overscan);
+  const end = Math.min(count, firstRowBelow(offsets.current, count, viewport.top + viewport.height) + 1 + overscan);
+
+  return {
+    scrollRef,
+    start,
+    end,
+    offsetTop: offsets.current[start],
+    totalHeight,
+    measure,
+  };
+}